@@ -0,0 +1,234 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class UserActivityBuffer:
+    """
+    使用者操作紀錄的非同步寫入緩衝區
+    請求端只將紀錄放入有界佇列，由背景執行緒在達到 batch_size 或等待 flush_interval 秒後以 bulk_create 批次寫入。
+    進程正常結束時 (atexit) 會先寫完佇列中剩餘的紀錄；佇列已滿時由呼叫端改為同步寫入，重試後仍無法寫入的紀錄會完整輸出到錯誤日誌
+    """
+
+    # 寫入失敗時重試次數與間隔秒數
+    MAX_RETRIES = 3
+    RETRY_DELAY = 1.0
+
+    def __init__(self, queue_size=None, batch_size=None, flush_interval=None):
+        self.queue = queue.Queue(maxsize=queue_size or settings.USER_ACTIVITY_QUEUE_SIZE)
+        self.batch_size = batch_size or settings.USER_ACTIVITY_BATCH_SIZE
+        self.flush_interval = (flush_interval if flush_interval is not None
+                               else settings.USER_ACTIVITY_FLUSH_SECONDS)
+
+        self._stop_event = threading.Event()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._counters = {
+            'received': 0,
+            'written': 0,
+            'overflow': 0,
+            'batches': 0,
+            'retries': 0,
+            'lost': 0,
+        }
+        self._last_flush_lag = 0.0
+        self._max_flush_lag = 0.0
+        self._last_batch_seconds = 0.0
+
+    # ---- 生命週期 ----
+
+    def start(self):
+        """啟動背景寫入執行緒，並在進程結束時寫完剩餘紀錄"""
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._stop_event.clear()
+            self._worker = threading.Thread(target=self._run, name='user-activity-flusher', daemon=True)
+            self._worker.start()
+        atexit.register(self.stop)
+        logger.info("User activity buffer started")
+
+    def stop(self, timeout=10.0):
+        """停止背景執行緒，佇列中剩餘的紀錄會先寫入"""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        self._stop_event.set()
+        worker.join(timeout)
+        if worker.is_alive():
+            logger.warning(f"User activity flusher did not stop in {timeout}s, "
+                           f"{self.queue.qsize()} entries still pending")
+            return
+        # 執行緒結束後才放入的紀錄 (stop 與 submit 競爭) 在此寫完
+        while True:
+            batch = self._drain()
+            if not batch:
+                break
+            self.flush(batch)
+        close_old_connections()
+        atexit.unregister(self.stop)
+        logger.info("User activity buffer stopped")
+
+    @property
+    def running(self):
+        return self._worker is not None
+
+    # ---- 生產端 ----
+
+    def submit(self, entry):
+        """
+        放入一筆未儲存的 LogUserActivity，不會阻塞請求
+        佇列已滿時回傳 False，由呼叫端同步寫入
+        """
+        if not self.running:
+            self.start()
+        try:
+            self.queue.put_nowait((time.monotonic(), entry))
+        except queue.Full:
+            overflow = self._increment('overflow')
+            if overflow == 1 or overflow % 1000 == 0:
+                logger.warning(f"User activity buffer is full, {overflow} entries written synchronously so far")
+            return False
+        self._increment('received')
+        return True
+
+    def stats(self):
+        """取得計數器、佇列深度與寫入延遲 (最舊一筆待寫入紀錄的等待秒數、最近一批的延遲)"""
+        with self.queue.mutex:
+            oldest = self.queue.queue[0][0] if self.queue.queue else None
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update({
+            'queue_depth': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'running': self.running,
+            'lag_seconds': round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            'last_flush_lag_ms': round(self._last_flush_lag * 1000, 3),
+            'max_flush_lag_ms': round(self._max_flush_lag * 1000, 3),
+            'last_batch_ms': round(self._last_batch_seconds * 1000, 3),
+        })
+        return stats
+
+    # ---- 消費端 ----
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self.flush(batch)
+            elif self._stop_event.is_set():
+                break
+        close_old_connections()
+
+    def _next_batch(self):
+        """取出一批紀錄：等待第一筆，之後在 flush_interval 內盡量湊滿 batch_size；停止時不等待"""
+        if self._stop_event.is_set():
+            return self._drain()
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval or 0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                batch.extend(self._drain(self.batch_size - len(batch)))
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit=None):
+        """不等待地取出佇列中的紀錄"""
+        batch = []
+        limit = limit or self.batch_size
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self, batch):
+        """
+        寫入一批 (enqueued_at, LogUserActivity)，失敗時重試，仍失敗則將紀錄內容寫入錯誤日誌
+        :return: 寫入的筆數
+        """
+        from .models import LogUserActivity
+
+        started = time.perf_counter()
+        lag = time.monotonic() - min(enqueued_at for enqueued_at, _ in batch)
+        entries = [entry for _, entry in batch]
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                LogUserActivity.objects.bulk_create(entries, batch_size=self.batch_size)
+                break
+            except IntegrityError:
+                # 使用者已在紀錄寫入前刪除，依 SET_NULL 語意清除關聯後立即重試
+                self._clear_missing_users(entries)
+                continue
+            except Exception as e:
+                logger.error(f"Error writing user activity batch (attempt {attempt + 1}): {e}")
+            finally:
+                close_old_connections()
+            if attempt < self.MAX_RETRIES:
+                self._increment('retries')
+                if not self._stop_event.is_set():
+                    time.sleep(self.RETRY_DELAY)
+        else:
+            self._increment('lost', len(entries))
+            for entry in entries:
+                logger.error(
+                    f"Lost user activity: user={entry.user_id} function={entry.function} action={entry.action} "
+                    f"status={entry.status} ip={entry.ip_address} timestamp={entry.timestamp.isoformat()}"
+                )
+            return 0
+
+        with self._lock:
+            self._counters['written'] += len(entries)
+            self._counters['batches'] += 1
+            self._last_flush_lag = lag
+            self._max_flush_lag = max(self._max_flush_lag, lag)
+        self._last_batch_seconds = time.perf_counter() - started
+        return len(entries)
+
+    @staticmethod
+    def _clear_missing_users(entries):
+        from django.contrib.auth import get_user_model
+
+        user_ids = {entry.user_id for entry in entries if entry.user_id is not None}
+        existing = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        for entry in entries:
+            if entry.user_id is not None and entry.user_id not in existing:
+                entry.user_id = None
+
+    def _increment(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+            return self._counters[counter]
+
+
+# 全域緩衝區實例 (每個進程一個，第一次寫入紀錄時啟動)
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_activity_buffer():
+    """取得使用者操作紀錄緩衝區實例"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = UserActivityBuffer()
+    return _buffer
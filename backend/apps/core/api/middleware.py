@@ -0,0 +1,37 @@
+from urllib.parse import parse_qs
+
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+
+
+@database_sync_to_async
+def get_jwt_user(raw_token):
+    """以 Simple JWT 驗證 access token，無效或使用者停用時回傳 AnonymousUser"""
+    from django.contrib.auth.models import AnonymousUser
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return AnonymousUser()
+
+
+class JWTQueryAuthMiddleware(BaseMiddleware):
+    """
+    WebSocket 無法自訂 Authorization 標頭，前端 (JWT) 以 ?token=<access token> 帶入；
+    有 token 時以其使用者取代 session 驗證的 scope['user']
+    """
+
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+        if token:
+            scope = dict(scope, user=await get_jwt_user(token[0]))
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    """session 驗證 (AuthMiddlewareStack) 之後再套用 query token 驗證"""
+    return AuthMiddlewareStack(JWTQueryAuthMiddleware(inner))
@@ -1,27 +1,32 @@
 import os
+import re
 import csv
 import docker
 import pandas as pd
 import logging
 
 from io import BytesIO, StringIO
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import islice
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.contrib.auth.models import Group, Permission
-from django.db import transaction
-from django.db.models import Q
+from django.db.models import CharField, F, Func, Q, Value
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from django.conf import settings
-from django.http import FileResponse, StreamingHttpResponse
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
 from django.core.files.uploadedfile import UploadedFile
 
 from rest_framework import viewsets, generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import action
 
@@ -33,7 +38,9 @@ from drf_spectacular.utils import extend_schema, extend_schema_view
 
 from .. import models
 from . import serializers
-from ..services import log_user_activity
+from ..services import log_user_activity, get_user_navigations, get_translation_bundle, \
+    sync_translations, is_not_modified, stream_sync_iterator
+from ..activity import get_activity_buffer
 from .tasks import backup_database, restore_database
 
 # 設定日誌記錄器
@@ -310,7 +317,8 @@ class NavigationViewSet(AutoPrefetchViewSetMixin, viewsets.ModelViewSet):
         # qs = self.get_queryset()
         # seriailzer = self.get_serializer(qs, many=True)
 
-        navigations = self.get_user_navigations(request.user)
+        # 導航樹依使用者權限集合預先計算並快取
+        navigations = get_user_navigations(request.user)
 
         if navigations is None:
             return Response(
@@ -324,54 +332,6 @@ class NavigationViewSet(AutoPrefetchViewSetMixin, viewsets.ModelViewSet):
         # 包裝前端 Navigation 元件需要的格式
         return Response({'compact': navigations})
 
-    def get_user_navigations(self, user):
-
-        def filter_navigation(navigation):
-            """
-            遞歸過濾導航結構，對type為collapsable的節點不檢查權限，僅需顯示其有權限的子節點。
-            """
-            if navigation.type in ['collapsable', 'group', 'aside']:
-                # 遞歸過濾子節點，保留有權限的子節點
-                children_with_permissions = [
-                    filter_navigation(child) for child in navigation.get_children()
-                    if child in (allowed_navigations or child.type in ['collapsable', 'group', 'aside'])
-                ]
-                children_with_permissions = [child for child in children_with_permissions if child is not None]
-
-                # 僅當存在有權限的子節點時顯示此collapsable節點
-                if children_with_permissions:
-                    navigation_data = serializers.NavigationSerializer(navigation).data
-                    navigation_data['children'] = children_with_permissions
-                    return navigation_data
-            elif navigation.type == 'basic' and navigation in allowed_navigations:
-                # 返回type為basic且用戶有權限的導航
-                return serializers.NavigationSerializer(navigation).data
-            return None
-
-        # 獲取用戶的權限
-        allowed_navigations = models.Navigation.objects.filter(
-            is_active=True).distinct()
-
-        # 如果是超級用戶，直接返回所有活躍導航項目
-        if not user.is_superuser:
-            # 篩選出用戶有權限的導航項目
-            allowed_navigations = [
-                navigation for navigation in allowed_navigations
-                if any(user.has_perm(f"{perm.content_type.app_label}.{perm.codename}") for perm in navigation.permissions.all())
-            ]
-
-        # 如果沒有可訪問的導航
-        if not allowed_navigations:
-            return None
-
-        # 處理所有根節點
-        root_navigations = models.Navigation.objects.filter(
-            parent__isnull=True, is_active=True).order_by('order')
-        filtered_navigations = [filter_navigation(nav) for nav in root_navigations]
-
-        # 移除None值，僅保留有權限的導航項目
-        return [nav for nav in filtered_navigations if nav is not None]
-
 
 class LocaleViewSet(AutoPrefetchViewSetMixin, viewsets.ModelViewSet):
     queryset = models.Locale.objects.filter(is_active=True,).order_by('id')
@@ -405,14 +365,25 @@ class TranslationViewSet(AutoPrefetchViewSetMixin, viewsets.ModelViewSet):
     def list(self, request):
         try:
             lang = request.GET.get('lang', 'en').lower()
-            qs = models.Translation.objects.filter(locale__lang=lang, locale__is_active=True)
-            if not qs.exists():
+            # 預先編譯並壓縮的翻譯包，ETag 相符時回傳 304
+            bundle = get_translation_bundle(lang)
+            if bundle is None:
                 return Response(
                     {"message": f"沒有找到語言 {lang} 的翻譯資料"},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            translations = {t.key: t.value for t in qs}
-            return Response(translations)
+
+            if is_not_modified(request, bundle['etag']):
+                response = HttpResponseNotModified()
+            elif re.search(r'\bgzip\b', request.headers.get('Accept-Encoding', '')):
+                response = HttpResponse(bundle['gzip'], content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(bundle['content'], content_type='application/json')
+            response['ETag'] = bundle['etag']
+            patch_vary_headers(response, ('Accept-Encoding',))
+            patch_cache_control(response, public=True, no_cache=True)
+            return response
         except Exception as e:
             logger.error(f"Error retrieving translations for lang {lang}: {str(e)}", exc_info=True)
             return Response(
@@ -541,38 +512,23 @@ class TranslationViewSet(AutoPrefetchViewSetMixin, viewsets.ModelViewSet):
                 value_name='value'
             ).dropna(subset=['value'])
 
-            # 準備新記錄
-            new_translations = []
-            errors = []
             melted['value'] = melted['value'].astype(str).str.strip()
-            for _, row in melted.iterrows():
-                key = row['key']
-                lang = row['lang']
-                value = row['value']
-                if lang not in locale_map:
-                    errors.append(f"無效語系 {lang} 在鍵 {key}")
-                    continue
-                new_translations.append(
-                    models.Translation(
-                        locale=locale_map[lang],
-                        key=key,
-                        value=value
-                    )
-                )
+            lang_ids = {lang: locale.id for lang, locale in locale_map.items()}
+            entries = {
+                (key, lang_ids[lang]): value
+                for key, lang, value in zip(melted['key'], melted['lang'], melted['value'])
+            }
 
-            if errors:
-                return Response(
-                    {"error": "Excel 檔案包含無效資料", "details": errors},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # 刪除並創建
-            with transaction.atomic():
-                models.Translation.objects.filter(locale__is_active=True).delete()
-                models.Translation.objects.bulk_create(new_translations, batch_size=1000)
+            # 與現有資料比對，只寫入新增、變更與刪除的翻譯
+            summary = sync_translations(entries, list(lang_ids.values()))
 
             return Response(
-                {"message": f"成功同步 {len(new_translations)} 筆翻譯資料", "count": len(new_translations)},
+                {
+                    "message": f"成功同步 {len(entries)} 筆翻譯資料"
+                               f"（新增 {summary['created']}、更新 {summary['updated']}、刪除 {summary['deleted']}）",
+                    "count": len(entries),
+                    **summary
+                },
                 status=status.HTTP_200_OK
             )
 
@@ -628,15 +584,31 @@ class LogUserActivityViewSet(AutoPrefetchViewSetMixin, viewsets.ReadOnlyModelVie
     serializer_class = serializers.LogUserActivitySerializer
     pagination_class = StandardResultsSetPagination
 
+    # 匯出時每次自伺服器端游標讀取並輸出的筆數
+    EXPORT_CHUNK_SIZE = 5000
+
     def get_queryset(self):
         queryset = super().get_queryset()
         search = self.request.query_params.get('search', None)
+        start = self.request.query_params.get('start', None)
+        end = self.request.query_params.get('end', None)
+
+        # 時間區間 (走 timestamp 索引)；end 只給日期時包含當天
+        if start:
+            queryset = queryset.filter(timestamp__gte=self._parse_time(start, 'start'))
+        if end:
+            queryset = queryset.filter(timestamp__lt=self._parse_time(end, 'end', end_of_day=True))
 
         if search:
+            # 先查出符合的使用者 id：跨資料表的 OR 條件無法使用索引，改為 user_id IN (...) 後
+            # 各條件皆可由 user_id 索引或 trigram 索引取得，再以 BitmapOr 合併
+            user_ids = list(get_user_model().objects.filter(
+                Q(username__icontains=search) | Q(email__icontains=search)
+            ).values_list('id', flat=True))
+
             # 模糊查詢所有欄位
             queryset = queryset.filter(
-                Q(user__username__icontains=search) |
-                Q(user__email__icontains=search) |
+                Q(user_id__in=user_ids) |
                 Q(function__icontains=search) |
                 Q(action__icontains=search) |
                 Q(status__icontains=search) |
@@ -645,46 +617,61 @@ class LogUserActivityViewSet(AutoPrefetchViewSetMixin, viewsets.ReadOnlyModelVie
 
         return queryset
 
+    @staticmethod
+    def _parse_time(value, param, end_of_day=False):
+        """解析 ISO 日期或日期時間，未帶時區時視為本地時間；end_of_day 時純日期回傳隔天 00:00"""
+        try:
+            parsed = parse_datetime(value)
+            date = parse_date(value) if parsed is None else None
+        except ValueError:
+            parsed = date = None
+        if parsed is None:
+            if date is None:
+                raise ValidationError({param: f"無效的日期時間格式：{value}"})
+            if end_of_day:
+                date += timedelta(days=1)
+            parsed = datetime.combine(date, datetime.min.time())
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def _export_chunks(self, queryset):
+        """
+        以伺服器端游標讀取匯出資料，每次產生 EXPORT_CHUNK_SIZE 筆
+        欄位 (帳號、名稱、功能、動作、狀態、時間、IP) 皆在資料庫端轉為字串並 JOIN 使用者，不建立 model 實例；
+        連線時區為 UTC，時間格式與原本 timestamp.strftime('%Y/%m/%d %H:%M:%S') 相同
+        """
+        rows = queryset.annotate(
+            export_email=Coalesce('user__email', Value('')),
+            export_username=Coalesce('user__username', Value('')),
+            export_time=Func(F('timestamp'), Value('YYYY/MM/DD HH24:MI:SS'), function='to_char',
+                             output_field=CharField()),
+            export_ip=Coalesce(Func(F('ip_address'), function='HOST', output_field=CharField()), Value('')),
+        ).values_list(
+            'export_email', 'export_username', 'function', 'action', 'status', 'export_time', 'export_ip'
+        ).iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+        while chunk := list(islice(rows, self.EXPORT_CHUNK_SIZE)):
+            yield chunk
+
     def _generate_csv_rows(self, queryset, headers):
-        """生成 CSV 行的生成器"""
-        # CSV 標題
+        """生成 CSV 的生成器（每次輸出一批資料）"""
         output = StringIO()
         writer = csv.writer(output)
         writer.writerow(headers)
         yield '\ufeff' + output.getvalue()  # BOM + 標題
-        output.truncate(0)
-        output.seek(0)
-
-        # 數據行
-        for log in queryset.iterator(chunk_size=100):
-            writer = csv.writer(output)
-            writer.writerow([
-                log.user.email if log.user else '',
-                log.user.username if log.user else '',
-                log.function,
-                log.action,
-                log.status,
-                log.timestamp.strftime('%Y/%m/%d %H:%M:%S'),
-                log.ip_address or ''
-            ])
-            yield output.getvalue()
-            output.truncate(0)
+
+        for chunk in self._export_chunks(queryset):
             output.seek(0)
+            output.truncate(0)
+            writer.writerows(chunk)
+            yield output.getvalue()
 
     def _generate_txt_rows(self, queryset, headers):
-        """生成 TXT 行的生成器（Tab 分隔）"""
-        # TXT 標題
+        """生成 TXT 的生成器（Tab 分隔，每次輸出一批資料）"""
         yield '\t'.join(headers) + '\n'
 
-        # 數據行
-        for log in queryset.iterator(chunk_size=100):
-            yield f"{log.user.email if log.user else ''}\t" \
-                  f"{log.user.username if log.user else ''}\t" \
-                  f"{log.function}\t" \
-                  f"{log.action}\t" \
-                  f"{log.status}\t" \
-                  f"{log.timestamp.strftime('%Y/%m/%d %H:%M:%S')}\t" \
-                  f"{log.ip_address or ''}\n"
+        for chunk in self._export_chunks(queryset):
+            yield ''.join('\t'.join(row) + '\n' for row in chunk)
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
@@ -698,7 +685,7 @@ class LogUserActivityViewSet(AutoPrefetchViewSetMixin, viewsets.ReadOnlyModelVie
 
         queryset = self.get_queryset()
         response = StreamingHttpResponse(
-            self._generate_csv_rows(queryset, headers),
+            stream_sync_iterator(self._generate_csv_rows(queryset, headers)),
             content_type='text/csv; charset=utf-8'
         )
         filename = f"user_activity_log_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv"
@@ -717,13 +704,18 @@ class LogUserActivityViewSet(AutoPrefetchViewSetMixin, viewsets.ReadOnlyModelVie
 
         queryset = self.get_queryset()
         response = StreamingHttpResponse(
-            self._generate_txt_rows(queryset, headers),
+            stream_sync_iterator(self._generate_txt_rows(queryset, headers)),
             content_type='text/plain; charset=utf-8'
         )
         filename = f"user_activity_log_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
+    @action(detail=False, methods=['get'])
+    def buffer_stats(self, request):
+        """取得本進程操作紀錄緩衝區的佇列深度、寫入延遲與計數器"""
+        return Response(get_activity_buffer().stats())
+
 
 class DockerLogsView(APIView):
     def get(self, request, container_name):
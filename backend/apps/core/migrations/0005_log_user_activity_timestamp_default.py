@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_translation_core_transl_key_005785_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loguseractivity',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='執行時間'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:42
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_log_user_activity_timestamp_default'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:42
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # core_log_user_activity 持續寫入且不斷成長，以 CREATE INDEX CONCURRENTLY 建立索引，不阻擋寫入（不可包在交易中）
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_log_user_activity_trigram_extension'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='loguseractivity',
+            index=models.Index(fields=['-timestamp'], name='idx_log_activity_ts_desc'),
+        ),
+        AddIndexConcurrently(
+            model_name='loguseractivity',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('function'), name='gin_trgm_ops'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('action'), name='gin_trgm_ops'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('status'), name='gin_trgm_ops'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(models.Func(models.F('ip_address'), function='HOST')), name='gin_trgm_ops'), name='idx_log_activity_search_trgm'),
+        ),
+    ]
@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.models import F, Func
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.utils import timezone
 from django.contrib.auth.models import Permission, Group
 from mptt.models import MPTTModel, TreeForeignKey
 
@@ -111,9 +115,22 @@ class LogUserActivity(models.Model):
     user = models.ForeignKey(to='account.User', on_delete=models.SET_NULL, null=True, blank=True, verbose_name='使用者帳號')
     function = models.CharField(max_length=255, verbose_name='系統功能名稱')
     action = models.TextField(verbose_name='執行動作')
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name='執行時間')
+    # 紀錄以批次寫入，時間需取事件發生時而非寫入時，故不使用 auto_now_add
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, verbose_name='執行時間')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='SUCCESS', verbose_name='狀態')
     ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name='IP 位址')
 
     class Meta:
         db_table = "core_log_user_activity"
+        indexes = [
+            # 列表預設依時間倒序分頁，時間區間查詢與匯出亦使用此索引 (btree 可雙向掃描)
+            models.Index(fields=['-timestamp'], name='idx_log_activity_ts_desc'),
+            # 關鍵字搜尋 (icontains 產生 UPPER(欄位) LIKE UPPER(...))
+            GinIndex(
+                OpClass(Upper('function'), name='gin_trgm_ops'),
+                OpClass(Upper('action'), name='gin_trgm_ops'),
+                OpClass(Upper('status'), name='gin_trgm_ops'),
+                OpClass(Upper(Func(F('ip_address'), function='HOST')), name='gin_trgm_ops'),
+                name='idx_log_activity_search_trgm'
+            ),
+        ]
@@ -1,11 +1,396 @@
+import gzip
+import hashlib
+import json
+import logging
+import uuid
+
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
 from . import models
+from .activity import get_activity_buffer
+
+logger = logging.getLogger(__name__)
 
 
 def log_user_activity(user, function, action, status, ip_address):
-    models.LogUserActivity.objects.create(
-        user=user,
+    """
+    記錄使用者操作
+    預設放入緩衝區由背景執行緒批次寫入，不佔用請求時間；USER_ACTIVITY_LOG_ASYNC 關閉或緩衝區已滿時同步寫入
+    """
+    entry = models.LogUserActivity(
+        user_id=user.pk if user is not None else None,
         function=function,
         action=action,
         status=status,
-        ip_address=ip_address
+        ip_address=ip_address,
+        timestamp=timezone.now()
     )
+    if settings.USER_ACTIVITY_LOG_ASYNC and get_activity_buffer().submit(entry):
+        return
+    entry.save()
+
+
+async def stream_sync_iterator(iterator):
+    """
+    將同步產生器包成非同步產生器逐塊輸出
+    ASGI (daphne) 下 StreamingHttpResponse 會先把同步 iterator 全部讀入記憶體，
+    改由 sync_to_async 逐次取值才能真正串流；thread_sensitive 確保資料庫 cursor 在同一執行緒
+    """
+    iterator = iter(iterator)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while (chunk := await next_chunk(iterator, done)) is not done:
+        yield chunk
+
+
+# get_cached_payload 的預設 TTL：即使漏掉失效，資料最多保留一天
+PAYLOAD_CACHE_TTL = 86400
+
+
+def get_cached_payload(key, builder, timeout=PAYLOAD_CACHE_TTL):
+    """
+    讀取快取的資料，不存在時以 builder() 產生後寫入
+    資料存放在 {key}:{版本號}，版本號在 builder() 之前讀取：產生期間若已失效（更換版本），
+    結果寫入舊版本的 key 不會再被讀取，不會蓋掉新資料
+    etag 為資料 JSON 的 md5，資料不變時 etag 不變；快取服務異常時直接回傳重新產生的資料
+    :return: (etag, data)
+    """
+    try:
+        data_key = f'{key}:{get_cache_version(f"{key}:version")}'
+        cached = cache.get(data_key)
+        if cached is not None:
+            return cached['etag'], cached['data']
+    except Exception as e:
+        logger.warning(f"Failed to read cache {key}: {e}")
+        data_key = None
+
+    data = builder()
+    etag = _payload_etag(data)
+    if data_key:
+        try:
+            cache.set(data_key, {'etag': etag, 'data': data}, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Failed to write cache {key}: {e}")
+    return etag, data
+
+
+def set_cached_payload(key, data, timeout=PAYLOAD_CACHE_TTL):
+    """更換版本後寫入新產生的資料並回傳 etag（舊版本上仍在產生中的結果不會覆蓋）"""
+    etag = _payload_etag(data)
+    try:
+        version_key = f'{key}:version'
+        bump_cache_version(version_key)
+        cache.set(f'{key}:{get_cache_version(version_key)}', {'etag': etag, 'data': data}, timeout=timeout)
+    except Exception as e:
+        logger.warning(f"Failed to write cache {key}: {e}")
+    return etag
+
+
+def invalidate_cached_payload(*keys):
+    """更換 get_cached_payload 快取的版本號，舊資料由 TTL 自然過期"""
+    for key in keys:
+        try:
+            bump_cache_version(f'{key}:version')
+        except Exception as e:
+            logger.error(f"Failed to invalidate cache {key}: {e}")
+
+
+def _payload_etag(data):
+    """資料 JSON 的 md5"""
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def is_not_modified(request, etag):
+    """If-None-Match 是否與 etag 相符（弱比較）"""
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    etag = etag.removeprefix('W/')
+    return any(tag.removeprefix('W/') == etag for tag in parse_etags(if_none_match))
+
+
+def etag_response(request, etag, data):
+    """
+    回傳帶 ETag 的 Response，If-None-Match 相符時回傳 304
+    Cache-Control: no-cache 讓瀏覽器每次以 ETag 重新驗證
+    """
+    etag = quote_etag(etag)
+    if is_not_modified(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data, status=status.HTTP_200_OK)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def get_cache_version(version_key):
+    """取得快取版本號（不存在時建立），資料 key 帶入版本號即可整批失效"""
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(version_key)
+    return version
+
+
+def bump_cache_version(version_key):
+    """更換快取版本號，舊版本的 key 不再被讀取並由 TTL 自然過期"""
+    cache.set(version_key, uuid.uuid4().hex, timeout=None)
+
+
+NAVIGATION_CACHE_PREFIX = 'core:navigation'
+# 導航 / 群組 / 權限異動時更換版本，舊版本的 key 由 TTL 自然過期
+NAVIGATION_VERSION_KEY = f'{NAVIGATION_CACHE_PREFIX}:version'
+NAVIGATION_CACHE_TTL = 86400
+# 不檢查自身權限，只要有可顯示的子節點就顯示
+NAVIGATION_CONTAINER_TYPES = ('collapsable', 'group', 'aside')
+
+
+def get_permission_set_hash(user):
+    """使用者權限集合的雜湊，權限相同的使用者共用同一份導航樹"""
+    if user.is_superuser:
+        return 'superuser'
+    permissions = '\n'.join(sorted(user.get_all_permissions()))
+    return hashlib.md5(permissions.encode('utf-8')).hexdigest()
+
+
+def build_navigation_tree(permissions, is_superuser=False):
+    """
+    以兩次查詢建立使用者可見的導航樹（輸出同 NavigationSerializer）
+    - 啟用且具備任一所需權限的導航可見（超級使用者全部可見）
+    - collapsable / group / aside 只要有可見的子節點就顯示
+    - basic 需自身可見
+    :param permissions: 使用者權限集合 {'app_label.codename'}
+    :return: 導航樹，沒有任何可見導航時為 None
+    """
+    navigations = list(models.Navigation.objects.order_by('tree_id', 'lft').values())
+    required = defaultdict(set)
+    for navigation_id, permission_id, app_label, codename in models.Navigation.permissions.through.objects.values_list(
+        'navigation_id', 'permission_id', 'permission__content_type__app_label', 'permission__codename'
+    ):
+        required[navigation_id].add((permission_id, f'{app_label}.{codename}'))
+
+    allowed = {
+        navigation['id'] for navigation in navigations
+        if navigation['is_active'] and (
+            is_superuser or any(codename in permissions for _, codename in required[navigation['id']])
+        )
+    }
+    if not allowed:
+        return None
+
+    children_of = defaultdict(list)
+    for navigation in navigations:
+        children_of[navigation['parent_id']].append(navigation)
+
+    def node(navigation):
+        data = {key: value for key, value in navigation.items() if key != 'parent_id'}
+        data['parent'] = navigation['parent_id']
+        data['permissions'] = sorted(permission_id for permission_id, _ in required[navigation['id']])
+        return data
+
+    def subtree(navigation):
+        data = node(navigation)
+        children = [subtree(child) for child in children_of[navigation['id']]]
+        if children:
+            data['children'] = children
+        return data
+
+    def filter_navigation(navigation):
+        if navigation['type'] in NAVIGATION_CONTAINER_TYPES:
+            children = [
+                filter_navigation(child) for child in children_of[navigation['id']]
+                if child['id'] in allowed
+            ]
+            children = [child for child in children if child is not None]
+            if children:
+                data = node(navigation)
+                data['children'] = children
+                return data
+        elif navigation['type'] == 'basic' and navigation['id'] in allowed:
+            return subtree(navigation)
+        return None
+
+    roots = sorted(
+        (navigation for navigation in children_of[None] if navigation['is_active']),
+        key=lambda navigation: navigation['order']
+    )
+    return [data for data in map(filter_navigation, roots) if data is not None]
+
+
+def get_user_navigations(user):
+    """
+    取得使用者的導航樹：使用者 → 權限集合雜湊 → 導航樹 皆快取，命中時不查詢資料庫
+    :return: 導航樹，沒有任何可見導航時為 None
+    """
+    try:
+        version = get_cache_version(NAVIGATION_VERSION_KEY)
+        user_key = f'{NAVIGATION_CACHE_PREFIX}:{version}:user:{user.pk}'
+        permission_hash = cache.get(user_key)
+        if permission_hash is None:
+            permission_hash = get_permission_set_hash(user)
+            cache.set(user_key, permission_hash, timeout=NAVIGATION_CACHE_TTL)
+
+        tree_key = f'{NAVIGATION_CACHE_PREFIX}:{version}:tree:{permission_hash}'
+        cached = cache.get(tree_key)
+        if cached is not None:
+            return cached['tree']
+    except Exception as e:
+        logger.warning(f"Failed to read navigation cache: {e}")
+        tree_key = None
+
+    permissions = set() if user.is_superuser else user.get_all_permissions()
+    tree = build_navigation_tree(permissions, user.is_superuser)
+
+    if tree_key:
+        try:
+            cache.set(tree_key, {'tree': tree}, timeout=NAVIGATION_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to write navigation cache: {e}")
+    return tree
+
+
+def invalidate_navigation_cache():
+    """導航、群組權限或權限定義異動時清除所有導航樹"""
+    try:
+        bump_cache_version(NAVIGATION_VERSION_KEY)
+    except Exception as e:
+        logger.error(f"Failed to invalidate navigation cache: {e}")
+
+
+def invalidate_user_navigation(*user_ids):
+    """使用者的群組 / 權限 / 超級使用者身分異動時清除其權限集合雜湊"""
+    try:
+        version = get_cache_version(NAVIGATION_VERSION_KEY)
+        cache.delete_many([f'{NAVIGATION_CACHE_PREFIX}:{version}:user:{user_id}' for user_id in user_ids])
+    except Exception as e:
+        logger.error(f"Failed to invalidate user navigation cache: {e}")
+
+
+TRANSLATION_CACHE_PREFIX = 'core:translations'
+# 翻譯或語系異動時更換版本
+TRANSLATION_VERSION_KEY = f'{TRANSLATION_CACHE_PREFIX}:version'
+TRANSLATION_CACHE_TTL = 86400
+
+
+def build_translation_bundle(lang):
+    """
+    將語系的翻譯編譯為 JSON 與預先 gzip 壓縮的內容
+    etag 為內容雜湊（弱 ETag，未壓縮與 gzip 兩種編碼共用）
+    :return: {'etag', 'content', 'gzip'}，沒有翻譯資料時為 None
+    """
+    translations = dict(
+        models.Translation.objects.filter(
+            locale__lang=lang,
+            locale__is_active=True
+        ).order_by('key').values_list('key', 'value')
+    )
+    if not translations:
+        return None
+
+    content = json.dumps(translations, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {
+        'etag': f'W/"{hashlib.md5(content).hexdigest()}"',
+        'content': content,
+        'gzip': gzip.compress(content, mtime=0),
+    }
+
+
+def get_translation_bundle(lang):
+    """
+    讀取語系翻譯包（快取，翻譯寫入或 Excel 匯入時失效）
+    :return: 同 build_translation_bundle
+    """
+    try:
+        key = f'{TRANSLATION_CACHE_PREFIX}:{get_cache_version(TRANSLATION_VERSION_KEY)}:{lang}'
+        cached = cache.get(key)
+        if cached is not None:
+            return cached['bundle']
+    except Exception as e:
+        logger.warning(f"Failed to read translation cache: {e}")
+        key = None
+
+    bundle = build_translation_bundle(lang)
+    if key:
+        try:
+            cache.set(key, {'bundle': bundle}, timeout=TRANSLATION_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to write translation cache: {e}")
+    return bundle
+
+
+def invalidate_translation_bundles():
+    """清除所有語系的翻譯包"""
+    try:
+        bump_cache_version(TRANSLATION_VERSION_KEY)
+    except Exception as e:
+        logger.error(f"Failed to invalidate translation cache: {e}")
+
+
+def sync_translations(entries, locale_ids):
+    """
+    將上傳的翻譯與資料庫中的 (key, locale) 比對後，只寫入有差異的資料
+    entries 中沒有的 key 視為刪除（僅限 locale_ids 範圍內的語系）
+    :param entries: {(key, locale_id): value}
+    :param locale_ids: 同步範圍的語系 id
+    :return: {'created', 'updated', 'deleted', 'unchanged'} 筆數
+    """
+    existing = {
+        (key, locale_id): (pk, value)
+        for pk, key, locale_id, value in models.Translation.objects.filter(
+            locale_id__in=locale_ids
+        ).values_list('id', 'key', 'locale_id', 'value').iterator(chunk_size=5000)
+    }
+
+    to_create = []
+    to_update = []
+    unchanged = 0
+    for (key, locale_id), value in entries.items():
+        current = existing.pop((key, locale_id), None)
+        if current is None:
+            to_create.append(models.Translation(key=key, locale_id=locale_id, value=value))
+        elif current[1] != value:
+            to_update.append(models.Translation(id=current[0], key=key, locale_id=locale_id, value=value))
+        else:
+            unchanged += 1
+    # 比對後剩下的即為 Excel 中已移除的翻譯
+    to_delete = [pk for pk, _ in existing.values()]
+
+    if to_create or to_update or to_delete:
+        with transaction.atomic():
+            if to_delete:
+                # 以單一 DELETE 刪除 (Translation 無關聯需串聯刪除)，不逐筆觸發 post_delete
+                for i in range(0, len(to_delete), 1000):
+                    queryset = models.Translation.objects.filter(id__in=to_delete[i:i + 1000])
+                    queryset._raw_delete(queryset.db)
+            # 比對後至寫入前可能有其他請求新增相同 key，以 ON CONFLICT 更新避免違反唯一限制
+            models.Translation.objects.bulk_create(
+                to_create,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['key', 'locale'],
+                update_fields=['value']
+            )
+            models.Translation.objects.bulk_update(to_update, ['value'], batch_size=1000)
+            # bulk_create / bulk_update / _raw_delete 不觸發 signal，需自行清除翻譯包 (每次同步一次)
+            transaction.on_commit(invalidate_translation_bundles)
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+        'unchanged': unchanged,
+    }
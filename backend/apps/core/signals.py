@@ -1,7 +1,13 @@
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
 from . import models
+from .services import invalidate_navigation_cache, invalidate_user_navigation, invalidate_translation_bundles
+
+User = get_user_model()
 
 
 # @receiver(post_save, sender=models.AutodeskCredentials)
@@ -18,3 +24,46 @@ def create_aps_credentials(sender, instance, created, **kwargs):
             client_id="your_client_id",  # 預設值
             client_secret="your_client_secret",  # 預設值
         )
+
+
+@receiver(post_save, sender=models.Navigation)
+@receiver(post_delete, sender=models.Navigation)
+@receiver(m2m_changed, sender=models.Navigation.permissions.through)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=Group)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_navigation_trees(sender, action='post_', **kwargs):
+    """導航、群組權限或權限定義異動時清除所有導航樹快取"""
+    if action.startswith('post_'):
+        transaction.on_commit(invalidate_navigation_cache)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_member_navigation(sender, instance, action, reverse, pk_set, **kwargs):
+    """使用者的群組或個別權限異動時清除其權限集合"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        transaction.on_commit(lambda: invalidate_user_navigation(instance.pk))
+    elif pk_set:
+        transaction.on_commit(lambda: invalidate_user_navigation(*pk_set))
+    else:
+        # 由群組 / 權限端 clear() 時不提供使用者清單
+        transaction.on_commit(invalidate_navigation_cache)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_navigation_on_save(sender, instance, **kwargs):
+    """is_superuser / is_active 可能異動"""
+    transaction.on_commit(lambda: invalidate_user_navigation(instance.pk))
+
+
+@receiver(post_save, sender=models.Translation)
+@receiver(post_delete, sender=models.Translation)
+@receiver(post_save, sender=models.Locale)
+@receiver(post_delete, sender=models.Locale)
+def invalidate_translation_cache(sender, **kwargs):
+    """翻譯或語系異動時清除翻譯包"""
+    transaction.on_commit(invalidate_translation_bundles)
@@ -60,3 +60,9 @@ class BimObjectAdmin(admin.ModelAdmin):
 class BimCobieAdmin(admin.ModelAdmin):
     list_display = ('name', 'description', 'status', 'is_active',)
     search_fields = ('name', 'description')
+
+
+@admin.register(models.BimCobieValue)
+class BimCobieValueAdmin(admin.ModelAdmin):
+    list_display = ('bim_model', 'display_name', 'value', 'count',)
+    search_fields = ('display_name', 'value')
@@ -16,8 +16,9 @@ from asgiref.sync import async_to_sync
 from celery import shared_task
 from celery.utils.log import get_task_logger
 
-from ..aps_toolkit import Auth, Bucket, Derivative, SVFReader, DbReader
-from ..services import get_aps_urn
+from ..aps_toolkit import Auth, Bucket, Derivative, SVFReader, DbReader, PropReader
+from ..services import get_aps_urn, refresh_cobie_values, rebuild_region_tree, \
+    invalidate_condition_tree
 from .. import models
 
 logger = get_task_logger(__name__)
@@ -188,6 +189,14 @@ def process_translation(urn, token, file_name, object_data, send_progress, is_re
         send_progress('error', f"No .svf file found in {svf_dir}.")
         raise Exception(f"No .svf file found in {svf_dir}.")
 
+    # 建立屬性資料庫的二進位快取（每個版本只建立一次，之後以 mmap 讀取）
+    send_progress('build-prop-cache', 'Building property cache...')
+    try:
+        PropReader.read_from_svf_path(selected_svf_path)
+        send_progress('build-prop-cache', 'Property cache completed.')
+    except Exception as e:
+        logger.warning(f"Failed to build property cache for {svf_name}: {str(e)}")
+
     # Download SQLite
     send_progress('download-sqlite', 'Downloading SQLite to server...')
     db = DbReader(urn, token, object_data['objectKey'], send_progress)
@@ -432,6 +441,7 @@ def _process_categories_and_objects(sqlite_path, bim_model_id, file_name, send_p
         if new_categories:
             models.BimCategory.objects.bulk_create(new_categories)
             send_progress('process-bimcategory', f'Created {len(new_categories)} new BimCategory records.')
+        transaction.on_commit(invalidate_condition_tree)
 
     # Step 3.5: Update BimRegion
     send_progress('extract-bimregion', 'Extracting BimRegion from SQLite...')
@@ -533,6 +543,10 @@ def _process_categories_and_objects(sqlite_path, bim_model_id, file_name, send_p
                     raise
             send_progress('process-bimregion', f'Created {len(new_bim_regions)} BimRegion records.')
 
+    # 重建區域樹（BimRegionViewSet.list 直接讀取）
+    rebuild_region_tree()
+    send_progress('process-bimregion', 'Region tree rebuilt.')
+
     # Step 3.6: Update BimObjectHierarchy and prepare root_dbid mapping
     new_hierarchies = []
     hierarchy_dict = {}  # entity_id -> parent_id
@@ -659,6 +673,10 @@ def _process_categories_and_objects(sqlite_path, bim_model_id, file_name, send_p
         progress = min((i + len(batch)) / total * 100, 100)
         send_progress('process-bimobject', f'Inserted {i + len(batch)} of {total} records ({progress:.1f}%)')
 
+    # 更新 COBie 屬性值字典（distinct_name_value / distinct_name 由此產生）
+    cobie_values_count = refresh_cobie_values(bim_model.id)
+    send_progress('process-bimobject', f'Updated {cobie_values_count} COBie dictionary records.')
+
     bim_model.last_processed_version = bim_model.version
     bim_model.save()
     # else:
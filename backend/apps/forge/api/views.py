@@ -16,6 +16,7 @@ from django.core.files.base import ContentFile
 from django.db.models import Subquery, OuterRef, Prefetch, Q, F, Value, CharField
 from django.http import FileResponse, StreamingHttpResponse
 from django.utils.encoding import smart_str
+from django.utils.http import content_disposition_header
 
 from django.db import connection, transaction
 from django.contrib.postgres.aggregates import ArrayAgg, JSONBAgg
@@ -40,11 +41,12 @@ from django_auto_prefetching import AutoPrefetchViewSetMixin
 from drf_spectacular.utils import extend_schema
 
 from apps.forge.api.tasks import bim_data_import, bim_update_categories
-from apps.forge.services import check_redis, get_aps_credentials, get_aps_bucket
+from apps.forge.services import check_redis, get_aps_credentials, get_aps_bucket, get_cobie_name_values, get_cobie_names, \
+    get_region_tree, get_condition_tree
 
 from ..aps_toolkit import Auth, Bucket, Derivative, PropReader
 
-from apps.core.services import log_user_activity
+from apps.core.services import log_user_activity, etag_response, stream_sync_iterator
 
 from . import serializers
 from .. import models
@@ -531,9 +533,12 @@ class BimConditionViewSet(viewsets.ReadOnlyModelViewSet):
     )
 
     def list(self, request, *args, **kwargs):
-        root_nodes = self.get_queryset().filter(level=0)
-        serializer = self.get_serializer(root_nodes, many=True)
-        return Response(serializer.data)
+        """
+        條件樹以兩次查詢在記憶體中組成並快取（匯入分類或條件異動時清除）
+        支援 ETag / If-None-Match
+        """
+        etag, tree = get_condition_tree()
+        return etag_response(request, etag, tree)
 
 
 class BimRegionViewSet(viewsets.ReadOnlyModelViewSet):
@@ -547,59 +552,12 @@ class BimRegionViewSet(viewsets.ReadOnlyModelViewSet):
 
     # 樹狀結構:分區(zone)->空間/系統(role)->樓層(level)
     def list(self, request, *args, **kwargs):
-        # 查詢所有 BimRegion 記錄，不過濾
-        queryset = self.get_queryset().order_by('zone__id', 'role__code', 'level')
-
-        # 按 zone_id 分組
-        zone_groups = {}
-        for region in queryset:
-            zone = region.zone
-            role = region.role
-            zone_key = zone.id
-            role_key = region.role_id
-
-            # 初始化區域層
-            if zone_key not in zone_groups:
-                zone_groups[zone_key] = {
-                    'label': f'{zone.description} ({zone.code})',
-                    'id': zone.id,
-                    'code': zone.code,
-                    'children': {}
-                }
-
-            # 初始化角色層
-            if role_key not in zone_groups[zone_key]['children']:
-                print(role)
-                zone_groups[zone_key]['children'][role_key] = {
-                    'label': f'{role.description} ({role.code})',
-                    'id': role.id,
-                    'code': role.code,
-                    'children': []
-                }
-
-            # 添加樓層，過濾包含 'XX' 的 level
-            if 'XX' not in region.level:
-                zone_groups[zone_key]['children'][role_key]['children'].append({
-                    'label': region.level,
-                    'id': region.id
-                })
-
-        # 構建三層結構
-        tree_data = []
-        for zone_id in sorted(zone_groups.keys()):
-            zone_data = zone_groups[zone_id]
-            roles_data = []
-            for role_id in sorted(zone_groups[zone_id]['children'].keys(), key=lambda x: x or float('inf')):
-                role_data = zone_groups[zone_id]['children'][role_id]
-                # 移除重複樓層
-                unique_levels = {level['id']: level for level in role_data['children']}.values()
-                role_data['children'] = sorted(unique_levels, key=lambda x: x['id'])
-                # 只添加有角色資料的 role（即使 children 為空）
-                roles_data.append(role_data)
-            zone_data['children'] = roles_data
-            tree_data.append(zone_data)
-
-        return Response(tree_data)
+        """
+        區域樹於匯入時實體化（Redis + forge_bim_region_tree），此處只讀取快取
+        支援 ETag / If-None-Match
+        """
+        etag, tree_data = get_region_tree()
+        return etag_response(request, etag, tree_data)
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -1634,14 +1592,30 @@ class BimObjectViewSet(AutoPrefetchViewSetMixin, viewsets.ReadOnlyModelViewSet):
         return results
 
 
+def _read_file_chunks(file, chunk_size=64 * 1024):
+    """逐塊讀取檔案，讀完後關閉（暫存檔隨之刪除）"""
+    try:
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+
 class BimCobieObjectViewSet(AutoPrefetchViewSetMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsAuthenticated,)
     queryset = models.BimObject.objects.all()
 
+    COBIE_PREFIX = 'COBie.'
+    # 資料庫 server-side cursor 每次取回的筆數
+    CHUNK_SIZE = 5000
+    # JSON 串流每個 chunk 包含的資料列數
+    ROWS_PER_CHUNK = 500
+
     def list(self, request, *args, **kwargs):
         """
-        獲取 COBie 數據（JSON 格式，用於前端生成多 sheet Excel）
-        需要提供 file_name 查詢參數
+        匯出 COBie 數據，每個元件在每個 COBie sheet 各一列（屬性為欄位）
+        需要提供 file_name 查詢參數；output=xlsx 時直接回傳多 sheet Excel，
+        否則串流 JSON：[{sheet, model, dbid, values: {屬性: 值}}]
         """
         try:
             file_name = request.query_params.get('file_name', None)
@@ -1652,27 +1626,26 @@ class BimCobieObjectViewSet(AutoPrefetchViewSetMixin, viewsets.ReadOnlyModelView
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # 構建查詢：先找出符合 file_name 的 BimModel IDs
-            bim_model_ids = models.BimModel.objects.filter(
+            # 構建查詢：先找出符合 file_name 的 BimModel
+            bim_models = dict(models.BimModel.objects.filter(
                 name__icontains=file_name
-            ).values_list('id', flat=True)
+            ).values_list('id', 'name'))
 
-            if not bim_model_ids:
+            if not bim_models:
                 return Response(
                     {"error": "沒有找到匹配 file_name 的 BimModel"},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # 查詢 BimObject，確保 display_name 包含 COBie，並按 dbid 排序
-            queryset = models.BimObject.objects.filter(
-                display_name__icontains='COBie',
-                bim_model_id__in=bim_model_ids
-            ).order_by('dbid', 'display_name').values(
-                'dbid', 'display_name', 'value'
-            )
+            if request.query_params.get('output') == 'xlsx':
+                return self._xlsx_response(file_name, bim_models)
 
-            data = list(queryset)
-            return Response(data, status=status.HTTP_200_OK)
+            response = StreamingHttpResponse(
+                stream_sync_iterator(self._json_chunks(bim_models)),
+                content_type='application/json'
+            )
+            response['Cache-Control'] = 'no-cache'
+            return response
 
         except Exception as e:
             logger.error(f"Error fetching COBie data: {str(e)}", exc_info=True)
@@ -1681,29 +1654,147 @@ class BimCobieObjectViewSet(AutoPrefetchViewSetMixin, viewsets.ReadOnlyModelView
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    @action(detail=False, methods=['get'])
-    def distinct_name_value(self, request):
-        try:
-            # 先取得唯一 display_name 和 value，且 display_name 以 "COBie." 開頭
-            distinct_pairs = models.BimObject.objects.filter(
-                display_name__startswith='COBie.'
-            ).values('display_name', 'value').distinct().order_by('display_name')
-
-            # 查詢所有有效的 BimCobie 並轉成 dict 方便在 Python 中映射描述
-            cobie_description_map = dict(
-                models.BimCobie.objects.filter(is_active=True).values_list('name', 'description')
+    def _cobie_queryset(self, bim_model_ids):
+        """display_name 以 COBie. 開頭的屬性（走 bim_model + display_name 前綴索引）"""
+        return models.BimObject.objects.filter(
+            bim_model_id__in=bim_model_ids,
+            display_name__startswith=self.COBIE_PREFIX
+        )
+
+    def _cobie_rows(self, bim_model_ids):
+        """
+        逐一產生各元件在各 sheet 的資料列 (sheet, model_id, dbid, {屬性: 值})
+        依 (bim_model, dbid) 排序讀取，同一元件的屬性連續出現，記憶體中只保留當前元件
+        display_name 格式: COBie.Sheet.Property，無法分類者忽略
+        """
+        queryset = self._cobie_queryset(bim_model_ids).order_by(
+            'bim_model_id', 'dbid', 'display_name'
+        ).values_list('bim_model_id', 'dbid', 'display_name', 'value')
+
+        current = None
+        sheets = {}
+        for model_id, dbid, display_name, value in queryset.iterator(chunk_size=self.CHUNK_SIZE):
+            if (model_id, dbid) != current:
+                for sheet, values in sheets.items():
+                    yield sheet, current[0], current[1], values
+                current = (model_id, dbid)
+                sheets = {}
+            parts = display_name.split('.', 2)
+            if len(parts) < 3:
+                continue
+            sheets.setdefault(parts[1], {})[parts[2]] = value
+
+        for sheet, values in sheets.items():
+            yield sheet, current[0], current[1], values
+
+    def _json_chunks(self, bim_models):
+        """將資料列分塊序列化為 JSON 陣列"""
+        yield '['
+        buffer = []
+        first = True
+        for sheet, model_id, dbid, values in self._cobie_rows(bim_models):
+            buffer.append(json.dumps(
+                {'sheet': sheet, 'model': bim_models[model_id], 'dbid': dbid, 'values': values},
+                ensure_ascii=False
+            ))
+            if len(buffer) >= self.ROWS_PER_CHUNK:
+                yield ('' if first else ',') + ','.join(buffer)
+                buffer = []
+                first = False
+        if buffer:
+            yield ('' if first else ',') + ','.join(buffer)
+        yield ']'
+
+    def _sheet_columns(self, bim_model_ids):
+        """各 sheet 的屬性欄位（Name 置前，其餘依字母排序）"""
+        display_names = self._cobie_queryset(bim_model_ids).order_by(
+            'display_name'
+        ).values_list('display_name', flat=True).distinct()
+
+        columns = defaultdict(list)
+        for display_name in display_names:
+            parts = display_name.split('.', 2)
+            if len(parts) == 3:
+                columns[parts[1]].append(parts[2])
+        return {
+            sheet: sorted(properties, key=lambda p: (p != 'Name', p))
+            for sheet, properties in sorted(columns.items())
+        }
+
+    @staticmethod
+    def _unique_sheet_name(sheet, used):
+        """
+        sheet 名稱最長 31 字元、不可含 []:*?/ 與反斜線且不可以單引號開頭或結尾；
+        截斷後重複的名稱 (不分大小寫) 加上數字後綴
+        """
+        base = re.sub(r'[\[\]:*?/\\]', '_', sheet)[:31].strip("'") or 'Sheet'
+        name = base
+        suffix = 1
+        while name.lower() in used:
+            suffix += 1
+            name = f'{base[:31 - len(str(suffix)) - 1]}_{suffix}'
+        used.add(name.lower())
+        return name
+
+    def _xlsx_response(self, file_name, bim_models):
+        """
+        以 xlsxwriter constant_memory 模式逐列寫入暫存檔後串流下載
+        各 sheet 的列依元件順序遞增寫入，記憶體只保留當前列
+        """
+        import tempfile
+        import xlsxwriter
+
+        columns = self._sheet_columns(bim_models)
+        if not columns:
+            return Response(
+                {"error": "沒有可匯出的 COBie 數據"},
+                status=status.HTTP_404_NOT_FOUND
             )
 
-            data = []
-            for item in distinct_pairs:
-                description = cobie_description_map.get(item['display_name'], '') or item['display_name']
-                data.append({
-                    'display_name': item['display_name'],
-                    'label': item['value'],
-                    'description': description,
-                })
+        # 多個模型符合時加上模型欄位區分相同 dbid
+        with_model = len(bim_models) > 1
+        output = tempfile.TemporaryFile()
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        header_format = workbook.add_format({'bold': True})
+
+        worksheets = {}
+        next_rows = {}
+        sheet_names = set()
+        for sheet, properties in columns.items():
+            worksheet = workbook.add_worksheet(self._unique_sheet_name(sheet, sheet_names))
+            headers = (['Model'] if with_model else []) + ['DBID'] + properties
+            worksheet.write_row(0, 0, headers, header_format)
+            worksheet.set_column(0, len(headers) - 1, 20)
+            worksheets[sheet] = worksheet
+            next_rows[sheet] = 1
+
+        for sheet, model_id, dbid, values in self._cobie_rows(bim_models):
+            row = ([bim_models[model_id]] if with_model else []) + [dbid]
+            row += [values.get(prop) for prop in columns[sheet]]
+            worksheets[sheet].write_row(next_rows[sheet], 0, row)
+            next_rows[sheet] += 1
+
+        workbook.close()
+        output.seek(0)
+
+        response = StreamingHttpResponse(
+            stream_sync_iterator(_read_file_chunks(output)),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        response['Content-Disposition'] = content_disposition_header(
+            True, f"{os.path.splitext(file_name)[0]}_COBie.xlsx"
+        )
+        return response
 
-            return Response(data, status=200)
+    @action(detail=False, methods=['get'])
+    def distinct_name_value(self, request):
+        """
+        COBie (display_name, value) 唯一值，由匯入時維護的 BimCobieValue 字典產生並快取
+        支援 ETag / If-None-Match
+        """
+        try:
+            etag, data = get_cobie_name_values()
+            return etag_response(request, etag, data)
 
         except Exception as e:
             logger.error(f"Error fetching distinct name-value pairs: {str(e)}", exc_info=True)
@@ -1754,19 +1845,13 @@ class BimCobieObjectViewSet(AutoPrefetchViewSetMixin, viewsets.ReadOnlyModelView
 
     @action(detail=False, methods=['get'])
     def distinct_name(self, request):
+        """COBie 唯一 display_name（同 distinct_name_value 由字典產生並快取，支援 ETag）"""
         try:
-            # 查詢以 'COBie.' 開頭的唯一 display_name，並按字母排序
-            display_names = models.BimObject.objects.filter(
-                display_name__startswith='COBie.'
-            ).values('display_name').distinct().order_by('display_name')
-
-            # 提取 display_name 列表
-            result = [item['display_name'] for item in display_names]
-
-            return Response({
+            etag, result = get_cobie_names()
+            return etag_response(request, etag, {
                 'count': len(result),
                 'results': result
-            }, status=200)
+            })
 
         except Exception as e:
             # 記錄錯誤日誌
@@ -411,6 +411,18 @@ class Derivative:
         response = requests.get(url, headers=headers)
         return BytesIO(response.content)
 
+    def read_resource_buffer(self, resource: Resource):
+        """
+        Reads the full content of a resource as a bytes-like buffer.
+
+        Parameters:
+        resource (Resource): The resource object containing the URL to download.
+
+        Returns:
+        bytes: The content of the resource.
+        """
+        return self.download_stream_resource(resource).read()
+
     def download_resource(self, resource: Resource, local_path: str) -> str:
         """
         Downloads a resource from a URL and saves it to a local path.
@@ -16,6 +16,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 from .PackFileReader import PackFileReader
 from .Derivative import Derivative
+from .LocalDerivative import LocalDerivative
 from .ManifestItem import ManifestItem
 from .Token import Token
 
@@ -42,13 +43,39 @@ class Fragments:
         derivative = Derivative(urn, token, region)
         manifest_items = derivative.read_svf_manifest_items()
         for manifest_item in manifest_items:
-            resources = derivative.read_svf_resource_item(manifest_item)
-            for resource in resources:
-                if resource.local_path.endswith("FragmentList.pack"):
-                    bytes_io = derivative.download_stream_resource(resource)
-                    buffer = bytes_io.read()
-                    frags = Fragments.parse_fragments(buffer)
-                    fragments[manifest_item.guid] = frags
+            fragments.update(Fragments.parse_fragments_from_manifest_item(derivative, manifest_item))
+        return fragments
+
+    @staticmethod
+    def parse_fragments_from_svf_path(svf_path: str, urn: str = None, token: Token = None, region: str = "US") -> dict:
+        """
+        Parse fragments from an SVF downloaded to disk
+        :param svf_path: path of the svf file, e.g. "path/to/3D.svf"
+        :param urn: the urn of the model, used to fetch files missing on disk
+        :param token: the token authentication, used to fetch files missing on disk
+        :param region:  the region of hub (default is US)
+        :return:  a dictionary of fragments with key is the guid of the manifest item and value is the list of fragments
+        """
+        fragments = {}
+        derivative = LocalDerivative(svf_path, urn, token, region)
+        for manifest_item in derivative.read_svf_manifest_items():
+            fragments.update(Fragments.parse_fragments_from_manifest_item(derivative, manifest_item))
+        return fragments
+
+    @staticmethod
+    def parse_fragments_from_manifest_item(derivative: Derivative, manifest_item: ManifestItem) -> dict:
+        """
+        Parse fragments of a manifest item
+        :param derivative: the derivative to read resources from
+        :param manifest_item: the manifest item of the svf
+        :return:  a dictionary of fragments with key is the guid of the manifest item and value is the list of fragments
+        """
+        fragments = {}
+        resources = derivative.read_svf_resource_item(manifest_item)
+        for resource in resources:
+            if resource.local_path.endswith("FragmentList.pack"):
+                buffer = derivative.read_resource_buffer(resource)
+                fragments[manifest_item.guid] = Fragments.parse_fragments(buffer)
         return fragments
 
     @staticmethod
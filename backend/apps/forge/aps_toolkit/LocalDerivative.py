@@ -0,0 +1,147 @@
+"""
+Copyright (C) 2024  chuongmep.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import mmap
+import os
+import zipfile
+from io import BytesIO
+from json import loads as json_loads
+from typing import List
+from urllib.parse import unquote
+from os.path import join, normpath
+from .Derivative import Derivative
+from .ManifestItem import ManifestItem
+from .PathInfo import PathInfo
+from .Resource import Resource
+from .Token import Token
+
+
+class LocalDerivative(Derivative):
+    """
+    Derivative that resolves SVF resources from an already downloaded SVF directory
+    (e.g. MEDIA_ROOT/svf/{file}/ver_{n}/.../{3D}.svf). Files missing on disk are fetched
+    from APS and saved next to the svf, only when urn and token are given.
+    """
+
+    def __init__(self, svf_path: str, urn: str = None, token: Token = None, region: str = "US"):
+        super().__init__(urn, token, region)
+        if not os.path.exists(svf_path):
+            raise Exception(f"File {svf_path} not found")
+        self.svf_path = os.path.abspath(svf_path)
+        self.svf_dir = os.path.dirname(self.svf_path)
+        self._remote_resources = None
+
+    def read_svf_manifest_items(self) -> List[ManifestItem]:
+        """
+        Reads the SVF manifest item of the local svf file.
+
+        Returns:
+        List[ManifestItem]: A list with one manifest item, the guid is the svf file name.
+        """
+        manifest_json = self._read_svf_entry("manifest.json")
+        root_file_name = os.path.basename(self.svf_path)
+        base_path = self.svf_dir.replace(os.sep, '/') + '/'
+        path_info = PathInfo(root_file_name, base_path, base_path, self.urn)
+        path_info.files = self._get_assets(manifest_json)
+        path_info.files.append(root_file_name)
+        # thumbnails are saved beside the svf file
+        for file in sorted(os.listdir(self.svf_dir)):
+            if file.endswith(".png") and file not in path_info.files:
+                path_info.files.append(file)
+        guid = os.path.splitext(root_file_name)[0]
+        return [ManifestItem(guid, "application/autodesk-svf", path_info, self.urn)]
+
+    def read_svf_resource_item(self, manifest_item: ManifestItem) -> List[Resource]:
+        """
+        Reads SVF resource items from the manifest item, local_path is the absolute path on disk.
+
+        Parameters:
+        manifest_item (ManifestItem): The manifest item containing information about SVF resources.
+
+        Returns:
+        List[Resource]: A list of SVF resource items extracted from the manifest item.
+        """
+        resources = []
+        for file in manifest_item.path_info.files:
+            file_name = file[file.rfind("/") + 1:]
+            local_path = normpath(join(self.svf_dir, unquote(file)))
+            resources.append(Resource(file_name, file, local_path))
+        return resources
+
+    def read_svf_metadata(self, svf_urn: str = None):
+        """
+        Reads metadata.json from the local svf file.
+
+        Returns:
+        dict: The contents of metadata.json.
+        """
+        return self._read_svf_entry("metadata.json")
+
+    def download_stream_resource(self, resource: Resource) -> BytesIO:
+        """
+        Opens a local resource as a stream, it is downloaded first if missing on disk.
+
+        Parameters:
+        resource (Resource): The resource to read.
+
+        Returns:
+        BytesIO: A stream containing the resource.
+        """
+        with open(self._ensure_local(resource), "rb") as f:
+            return BytesIO(f.read())
+
+    def read_resource_buffer(self, resource: Resource):
+        """
+        Memory-maps a local resource, it is downloaded first if missing on disk.
+
+        Parameters:
+        resource (Resource): The resource to read.
+
+        Returns:
+        mmap.mmap | bytes: A read-only buffer of the resource.
+        """
+        local_path = self._ensure_local(resource)
+        if os.path.getsize(local_path) == 0:
+            return b""
+        with open(local_path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read_svf_entry(self, name: str) -> dict:
+        with zipfile.ZipFile(self.svf_path) as zip_file:
+            with zip_file.open(name) as data:
+                return json_loads(data.read().decode("utf-8"))
+
+    def _ensure_local(self, resource: Resource) -> str:
+        local_path = resource.local_path
+        if os.path.exists(local_path):
+            return local_path
+        if not self.urn or not self.token:
+            raise Exception(f"File {local_path} not found")
+        remote_resource = self._find_remote_resource(local_path)
+        if remote_resource is None:
+            raise Exception(f"File {local_path} not found in derivative {self.urn}")
+        return self.download_resource(remote_resource, local_path)
+
+    def _find_remote_resource(self, local_path: str):
+        if self._remote_resources is None:
+            self._remote_resources = []
+            for manifest_item in super().read_svf_manifest_items():
+                self._remote_resources.extend(super().read_svf_resource_item(manifest_item))
+        local_path = local_path.replace(os.sep, '/')
+        for resource in self._remote_resources:
+            if local_path.endswith('/' + resource.local_path.lstrip('/')):
+                return resource
+        return None
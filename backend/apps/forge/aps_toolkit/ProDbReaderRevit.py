@@ -176,10 +176,7 @@ class PropDbReaderRevit(PropReader):
         """
         categories_dict = self.get_all_categories()
         dbids = list(categories_dict.keys())
-        dataframe = pd.DataFrame()
-        for dbid in dbids:
-            df = self._get_recursive_ids([dbid], is_get_sub_family, display_unit)
-            dataframe = pd.concat([dataframe, df], ignore_index=True)
+        dataframe = self._get_recursive_ids(dbids, is_get_sub_family, display_unit)
         if dataframe.empty:
             return dataframe
         dataframe["Family Name"] = dataframe["Name"].str.extract(r'(.*)\s\[')
@@ -193,11 +190,8 @@ class PropDbReaderRevit(PropReader):
         """
         svf_reader = SVFReader(self.urn, self.token, self.region)
         frags = svf_reader.read_fragments()
-        df_bbox = pd.DataFrame(columns=["dbId", "bbox"])
-        for k, v in frags.items():
-            for f in v:
-                df_bbox = pd.concat([df_bbox, pd.DataFrame([[f.dbID, f.bbox]], columns=["dbId", "bbox"])])
-        df_bbox.reset_index(drop=True, inplace=True)
+        rows = [[f.dbID, f.bbox] for v in frags.values() for f in v]
+        df_bbox = pd.DataFrame(rows, columns=["dbId", "bbox"])
         df_bbox.sort_values(by="dbId", inplace=True)
         df_bbox.drop_duplicates(subset="dbId", inplace=True)
         return df_bbox
@@ -226,42 +220,42 @@ class PropDbReaderRevit(PropReader):
         :return: :class:`pandas.DataFrame` : Dataframe contains all dbid,category, family, family type
         dbId: database id of family type
         """
-        # create columns
-        df = pd.DataFrame(columns=["dbId", "Category", "Family", "FamilyType"])
-        self._get_recursive_child_types(df, 1, "_RFT")
+        rows = []
+        self._get_recursive_child_types(rows, 1, "_RFT")
+        df = pd.DataFrame(rows, columns=["dbId", "Category", "Family", "FamilyType"])
         df = df.sort_values(by=["Category", "Family", "FamilyType"])
         return df
 
-    def _get_recursive_child_types(self, data_frame, id, name):
+    def _get_recursive_child_types(self, rows, id, name):
         children = self.get_children(id)
         for child in children:
             properties = self.enumerate_properties(child)
             property = [prop.value for prop in properties if prop.name == name]
             if len(property) == 0:
-                self._get_recursive_child_types(data_frame, child, name)
+                self._get_recursive_child_types(rows, child, name)
             else:
                 if str(property[0]) == "":
                     continue
                 family_type = property[0].strip()
                 category = [prop.value for prop in properties if prop.name == "_RC"][0]
                 family = [prop.value for prop in properties if prop.name == "_RFN"][0]
-                new_row = {"dbId": child, "Category": category, "Family": family, "FamilyType": family_type}
-                data_frame.loc[len(data_frame)] = new_row
+                rows.append({"dbId": child, "Category": category, "Family": family, "FamilyType": family_type})
 
     def get_cats_fams_types_params(self) -> pd.DataFrame:
         """
         Get all categories, families, families types and parameters, is parameter type in model
         :return: :class:`pandas.DataFrame` : Dataframe contains all dbid,category, family, family type, parameter, is parameter type
         """
-        df = pd.DataFrame(columns=["dbId", "Category", "Family", "FamilyType", "Parameter","Is Parameter Type"])
-        self._get_recursive_child_types_params(df, 1)
+        rows = []
+        self._get_recursive_child_types_params(rows, 1)
+        df = pd.DataFrame(rows, columns=["dbId", "Category", "Family", "FamilyType", "Parameter", "Is Parameter Type"])
         # drop duplicates
         df.drop_duplicates(subset=["dbId", "Category", "Family", "FamilyType", "Parameter","Is Parameter Type"], inplace=True)
         df = df.sort_values(by=["Category", "Family", "FamilyType", "Parameter", "Is Parameter Type"])
         df = df.drop(columns=["dbId"])
         return df
 
-    def _get_recursive_child_types_params(self, data_frame, id):
+    def _get_recursive_child_types_params(self, rows, id):
         children = self.get_children(id)
         for child in children:
             properties = self.enumerate_properties(child)
@@ -269,8 +263,8 @@ class PropDbReaderRevit(PropReader):
                         prop.name == "Category" and prop.value == "Revit Family Type"]
 
             if len(property) == 0:
-                # Recursively call the function, passing the same data_frame
-                self._get_recursive_child_types_params(data_frame, child)
+                # Recursively call the function, passing the same rows
+                self._get_recursive_child_types_params(rows, child)
             else:
                 if str(property[0]) == "":
                     continue
@@ -296,11 +290,10 @@ class PropDbReaderRevit(PropReader):
                     # add key is parameter name and value is type
                     for key, value in params_dict.items():
                         params[key] = is_type
-                # Add rows to the existing data_frame
+                # Add rows to the existing rows
                 for param in params:
-                    new_row = {"dbId": child, "Category": category, "Family": family, "FamilyType": family_type,
-                               "Parameter": param, "Is Parameter Type": params[param]}
-                    data_frame.loc[len(data_frame)] = new_row
+                    rows.append({"dbId": child, "Category": category, "Family": family, "FamilyType": family_type,
+                                 "Parameter": param, "Is Parameter Type": params[param]})
 
     def get_data_by_category(self, category: str, is_get_sub_family: bool = False,
                              display_unit: bool = False, is_add_family_name: bool = False) -> pd.DataFrame:
@@ -312,19 +305,7 @@ class PropDbReaderRevit(PropReader):
         :param is_add_family_name: the flag to add family name or not, default is False
         :return: :class:`pandas.DataFrame` : Dataframe contains data by category
         """
-        categories = self.get_all_categories()
-        # if category starts with Revit, remove it
-        if category.startswith("Revit"):
-            category = category[5:].strip()
-        category_id = [key for key, value in categories.items() if value == category]
-        dataframe = self._get_recursive_ids(category_id, is_get_sub_family, display_unit)
-        if dataframe.empty:
-            return dataframe
-        if (is_add_family_name):
-            # get name from family and get name by regex e.g "Seating-LAMMHULTS-PENNE-Chair [12143232]" ->
-            # "Seating-LAMMHULTS-PENNE-Chair"
-            dataframe["Family Name"] = dataframe["Name"].str.extract(r'(.*)\s\[')
-        return dataframe
+        return self.get_data_by_categories([category], is_get_sub_family, display_unit, is_add_family_name)
 
     def get_data_by_categories(self, categories: List[str], is_get_sub_family: bool = False,
                                display_unit: bool = False, is_add_family_name: bool = False) -> pd.DataFrame:
@@ -335,11 +316,20 @@ class PropDbReaderRevit(PropReader):
         :param display_unit: the flag to display unit or not in value, default is False
         :return: :class:`pandas.DataFrame` : Dataframe contains data by categories
         """
-        dataframe = pd.DataFrame()
+        all_categories = self.get_all_categories()
+        category_ids = []
         for category in categories:
-            dataframe = pd.concat(
-                [dataframe, self.get_data_by_category(category, is_get_sub_family, display_unit, is_add_family_name)],
-                ignore_index=True)
+            # if category starts with Revit, remove it
+            if category.startswith("Revit"):
+                category = category[5:].strip()
+            category_ids.extend([key for key, value in all_categories.items() if value == category])
+        dataframe = self._get_recursive_ids(category_ids, is_get_sub_family, display_unit)
+        if dataframe.empty:
+            return dataframe
+        if (is_add_family_name):
+            # get name from family and get name by regex e.g "Seating-LAMMHULTS-PENNE-Chair [12143232]" ->
+            # "Seating-LAMMHULTS-PENNE-Chair"
+            dataframe["Family Name"] = dataframe["Name"].str.extract(r'(.*)\s\[')
         return dataframe
 
     def get_data_by_parameters(self, params: List[str], display_unit: bool = False) -> pd.DataFrame:
@@ -349,11 +339,9 @@ class PropDbReaderRevit(PropReader):
         :param display_unit: the flag to display unit or not in value, default is False
         :return: :class:`pandas.DataFrame` : Dataframe contains data by parameters
         """
-        dataframe = pd.DataFrame()
         all_categories = self.get_all_categories()
         category_ids = [key for key, value in all_categories.items()]
-        dataframe = pd.concat(
-            [dataframe, self._get_recursive_ids_prams(category_ids, params, False, display_unit)], ignore_index=True)
+        dataframe = self._get_recursive_ids_prams(category_ids, params, False, display_unit)
         if dataframe.empty:
             return dataframe
         if "Family Name" in params:
@@ -375,13 +363,9 @@ class PropDbReaderRevit(PropReader):
         if not is_have_name:
             params.append("Name")
             flag_name = True
-        dataframe = pd.DataFrame()
         all_categories = self.get_all_categories()
         category_ids = [key for key, value in all_categories.items() if value in categories]
-        for category_id in category_ids:
-            dataframe = pd.concat(
-                [dataframe, self._get_recursive_ids_prams([category_id], params, is_get_sub_family, display_unit)],
-                ignore_index=True)
+        dataframe = self._get_recursive_ids_prams(category_ids, params, is_get_sub_family, display_unit)
         if dataframe.empty:
             return dataframe
         if "Family Name" in params:
@@ -463,21 +447,25 @@ class PropDbReaderRevit(PropReader):
         dataframe["Family Name"] = dataframe["Name"].str.extract(r'(.*)\s\[')
         return dataframe
 
-    def _get_recursive_ids(self, db_ids: List[int], get_sub_family: bool, display_unit: bool = False) -> pd.DataFrame:
-        dataframe = pd.DataFrame()
+    def _iter_element_properties(self, db_ids: List[int], get_sub_family: bool, display_unit: bool = False):
+        """
+        Walk the element tree from db_ids in pre-order without recursion
+        :param db_ids: List of database ids to start from
+        :param get_sub_family: the flag to get sub family or not
+        :param display_unit: the flag to display unit or not in value
+        :return: generator of (dbId, instance ids, properties of the element)
+        """
         props_ignore = ['parent', 'instanceof_objid', 'child', "viewable_in"]
-        if len(db_ids) == 0:
-            return dataframe
-        for id in db_ids:
+        stack = list(reversed(db_ids))
+        while stack:
+            id = stack.pop()
             props = self.enumerate_properties(id)
-            flag_sub_families = False
-            properties = {}
+            stack.extend(reversed(self.get_children(id)))
             # if props contain _RC, _RFN, _RFT, it's not a leaf node, continue to get children
-            if len([prop for prop in props if prop.name in ["_RC", "_RFN", "_RFT"]]) > 0:
-                ids = self.get_children(id)
-                dataframe = pd.concat([dataframe, self._get_recursive_ids(ids, get_sub_family, display_unit)],
-                                      ignore_index=True)
+            if any(prop.name in ["_RC", "_RFN", "_RFT"] for prop in props):
                 continue
+            flag_sub_families = False
+            properties = {}
             for prop in props:
                 if prop.category == "__internalref__" and prop.name == "Sub Family":
                     flag_sub_families = True
@@ -493,33 +481,35 @@ class PropDbReaderRevit(PropReader):
                                 properties[prop.name] = prop.value
                         else:
                             properties[prop.name] = prop.value
-            db_id = id
-            external_id = self.ids[id]
-            properties['dbId'] = db_id
-            properties['external_id'] = external_id
             if flag_sub_families and not get_sub_family:
-                ids = self.get_children(id)
-                dataframe = pd.concat([dataframe, self._get_recursive_ids(ids, get_sub_family, display_unit)],
-                                      ignore_index=True)
                 continue
-            ins = self.get_instance(id)
-            if len(ins) > 0:
-                for instance in ins:
-                    if display_unit:
-                        types = self.get_all_properties_display_unit(instance)
-                    else:
-                        types = self.get_properties(instance)
-                    properties = {**properties, **types}
-            singleDF = pd.DataFrame(properties, index=[0])
-            dataframe = pd.concat([dataframe, singleDF], ignore_index=True)
-            ids = self.get_children(id)
-            dataframe = pd.concat([dataframe, self._get_recursive_ids(ids, get_sub_family, display_unit)],
-                                  ignore_index=True)
+            yield id, self.get_instance(id), properties
+
+    @staticmethod
+    def _records_to_dataframe(records: List[dict]) -> pd.DataFrame:
+        dataframe = pd.DataFrame.from_records(records)
+        # set dbid and external_id to first and second column if it exists
         if 'dbId' in dataframe.columns and 'external_id' in dataframe.columns:
             dataframe = dataframe[
                 ['dbId', 'external_id'] + [col for col in dataframe.columns if col not in ['dbId', 'external_id']]]
         return dataframe
 
+    def _get_recursive_ids(self, db_ids: List[int], get_sub_family: bool, display_unit: bool = False) -> pd.DataFrame:
+        if len(db_ids) == 0:
+            return pd.DataFrame()
+        records = []
+        for id, instances, properties in self._iter_element_properties(db_ids, get_sub_family, display_unit):
+            properties['dbId'] = id
+            properties['external_id'] = self.ids[id]
+            for instance in instances:
+                if display_unit:
+                    types = self.get_all_properties_display_unit(instance)
+                else:
+                    types = self.get_properties(instance)
+                properties = {**properties, **types}
+            records.append(properties)
+        return self._records_to_dataframe(records)
+
     def _get_recursive_ids_prams(self, childs: List[int], params: List[str], get_sub_family: bool,
                                  display_unit: bool = False) -> pd.DataFrame:
         """
@@ -530,74 +520,29 @@ class PropDbReaderRevit(PropReader):
         :param display_unit: the flag to display unit or not in value
         :return:
         """
-        dataframe = pd.DataFrame()
-        props_ignore = ['parent', 'instanceof_objid', 'child', "viewable_in"]
         if len(childs) == 0:
-            return dataframe
-        for id in childs:
-            flag_sub_families = False
-            props = self.enumerate_properties(id)
-            # if props contain _RC, _RFN, _RFT, it's not a leaf node, continue to get children
-            if len([prop for prop in props if prop.name in ["_RC", "_RFN", "_RFT"]]) > 0:
-                ids = self.get_children(id)
-                dataframe = pd.concat(
-                    [dataframe, self._get_recursive_ids_prams(ids, params, get_sub_family, display_unit)],
-                    ignore_index=True)
-                continue
-            properties = {}
-            for prop in props:
-                if prop.category == "__internalref__" and prop.name == "Sub Family":
-                    flag_sub_families = True
-                if prop.name not in props_ignore:
-                    if prop.name == "name":
-                        properties["Name"] = prop.value
-                    else:
-                        if display_unit:
-                            if prop.data_type_context not in ["", None]:
-                                properties[prop.name] = str(prop.value) + " " + str(
-                                    self.units.parse_symbol(prop.data_type_context))
-                            else:
-                                properties[prop.name] = prop.value
-                        else:
-                            properties[prop.name] = prop.value
-            db_id = id
-            external_id = self.ids[id]
+            return pd.DataFrame()
+        records = []
+        for id, instances, properties in self._iter_element_properties(childs, get_sub_family, display_unit):
             # filter just get properties name in params list
             properties = {k: v for k, v in properties.items() if k in params}
-            properties['dbId'] = db_id
-            properties['external_id'] = external_id
-            if flag_sub_families and not get_sub_family:
-                ids = self.get_children(id)
-                dataframe = pd.concat(
-                    [dataframe, self._get_recursive_ids_prams(ids, params, get_sub_family, display_unit)],
-                    ignore_index=True)
-                continue
-            # get instances
-            ins = self.get_instance(id)
-            if len(ins) > 0:
-                for instance in ins:
-                    if display_unit:
-                        types = self.get_all_properties_display_unit(instance)
-                    else:
-                        types = self.get_all_properties(instance)
-                    types = {k: v for k, v in types.items() if k in params}
-                    # add unit to value
-                    if display_unit:
-                        for key, value in types.items():
-                            if key in params:
-                                if self.units is not None:
-                                    types[key] = str(value) + " " + str(self.units.parse_symbol(key))
-                    properties = {**properties, **types}
-            single_df = pd.DataFrame(properties, index=[0])
-            dataframe = pd.concat([dataframe, single_df], ignore_index=True)
-            ids = self.get_children(id)
-            dataframe = pd.concat([dataframe, self._get_recursive_ids_prams(ids, params, get_sub_family, display_unit)],
-                                  ignore_index=True)
-        # set dbid and external_id to first and second column if it exists
-        if 'dbId' in dataframe.columns and 'external_id' in dataframe.columns:
-            dataframe = dataframe[
-                ['dbId', 'external_id'] + [col for col in dataframe.columns if col not in ['dbId', 'external_id']]]
-        return dataframe
+            properties['dbId'] = id
+            properties['external_id'] = self.ids[id]
+            for instance in instances:
+                if display_unit:
+                    types = self.get_all_properties_display_unit(instance)
+                else:
+                    types = self.get_all_properties(instance)
+                types = {k: v for k, v in types.items() if k in params}
+                # add unit to value
+                if display_unit:
+                    for key, value in types.items():
+                        if key in params:
+                            if self.units is not None:
+                                types[key] = str(value) + " " + str(self.units.parse_symbol(key))
+                properties = {**properties, **types}
+            records.append(properties)
+        return self._records_to_dataframe(records)
 
     def get_data_by_external_id(self, external_id: str, is_get_sub_family: bool = False,
                                 display_unit: bool = False) -> pd.DataFrame:
@@ -0,0 +1,189 @@
+"""
+Copyright (C) 2024  chuongmep.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+class ValueTable:
+    """
+    Read-only sequence of values (str, int, float, None or any json value) backed by numpy arrays,
+    strings are stored once in a utf-8 blob and decoded on access.
+    """
+    NONE, INT, FLOAT, STR, JSON = range(5)
+
+    def __init__(self, kinds, numbers, offsets, blob):
+        self.kinds = kinds
+        self.numbers = numbers
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        kind = self.kinds[index]
+        if kind == ValueTable.INT:
+            return int(self.numbers[index])
+        if kind == ValueTable.FLOAT:
+            return float(self.numbers[index])
+        if kind == ValueTable.NONE:
+            return None
+        text = self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+        return text if kind == ValueTable.STR else json.loads(text)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @staticmethod
+    def build(values: list) -> tuple:
+        """
+        Encode a list of values to the arrays of a value table
+        :param values: list of values loaded from objects_vals.json.gz or objects_ids.json.gz
+        :return: kinds, numbers, offsets, blob
+        """
+        count = len(values)
+        kinds = np.zeros(count, dtype=np.uint8)
+        numbers = np.zeros(count, dtype=np.float64)
+        lengths = np.zeros(count + 1, dtype=np.int64)
+        chunks = []
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            if isinstance(value, int) and not isinstance(value, bool) and abs(value) < 2 ** 53:
+                kinds[i] = ValueTable.INT
+                numbers[i] = value
+                continue
+            if isinstance(value, float):
+                kinds[i] = ValueTable.FLOAT
+                numbers[i] = value
+                continue
+            if isinstance(value, str):
+                kinds[i] = ValueTable.STR
+                data = value.encode('utf-8')
+            else:
+                kinds[i] = ValueTable.JSON
+                data = json.dumps(value).encode('utf-8')
+            lengths[i + 1] = len(data)
+            chunks.append(data)
+        offsets = np.cumsum(lengths)
+        blob = np.frombuffer(b"".join(chunks), dtype=np.uint8)
+        return kinds, numbers, offsets, blob
+
+
+class PropCache:
+    """
+    Binary cache of a property database (objects_*.json.gz) written once per svf version.
+    Arrays are saved as .npy files and memory-mapped on load, so the pages are shared by all
+    worker processes reading the same model.
+    """
+    format_version = 2
+    tables = ["ids", "vals"]
+    table_arrays = ["kinds", "numbers", "offsets", "blob"]
+    source_files = ["objects_ids.json.gz", "objects_offs.json.gz", "objects_avs.json.gz", "objects_attrs.json.gz",
+                    "objects_vals.json.gz"]
+
+    @staticmethod
+    def source_signature(cache_dir: str) -> dict:
+        """
+        Size and mtime of the objects_*.json.gz files beside cache_dir the cache is built from
+        :return: {file name: [size, mtime_ns]}, missing files are left out
+        """
+        source_dir = os.path.dirname(os.path.abspath(cache_dir))
+        signature = {}
+        for name in PropCache.source_files:
+            try:
+                stat = os.stat(os.path.join(source_dir, name))
+            except OSError:
+                continue
+            signature[name] = [stat.st_size, stat.st_mtime_ns]
+        return signature
+
+    @staticmethod
+    def exists(cache_dir: str) -> bool:
+        """
+        Whether cache_dir holds a cache of the current format built from the source files now on disk,
+        a re-downloaded svf in the same directory invalidates the cache
+        """
+        meta_path = os.path.join(cache_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (meta.get("format_version") == PropCache.format_version
+                and meta.get("sources") == PropCache.source_signature(cache_dir))
+
+    @staticmethod
+    def write(cache_dir: str, ids: list, offsets: list, avs: list, attrs: list, vals: list) -> str:
+        """
+        Write the property tables to cache_dir, the directory is replaced atomically
+        :return: cache directory
+        """
+        parent_dir = os.path.dirname(os.path.abspath(cache_dir))
+        tmp_dir = tempfile.mkdtemp(prefix=".objects_cache_", dir=parent_dir)
+        try:
+            np.save(os.path.join(tmp_dir, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+            avs_array = np.asarray(avs, dtype=np.int64)
+            if len(avs_array) == 0 or avs_array.max() < 2 ** 32:
+                avs_array = avs_array.astype(np.uint32)
+            np.save(os.path.join(tmp_dir, "avs.npy"), avs_array)
+            for table, values in zip(PropCache.tables, [ids, vals]):
+                for name, array in zip(PropCache.table_arrays, ValueTable.build(values)):
+                    np.save(os.path.join(tmp_dir, f"{table}_{name}.npy"), array)
+            with open(os.path.join(tmp_dir, "attrs.json"), "w", encoding="utf-8") as f:
+                json.dump(attrs, f, ensure_ascii=False)
+            with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"format_version": PropCache.format_version,
+                           "sources": PropCache.source_signature(cache_dir)}, f)
+            if os.path.exists(cache_dir):
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            os.replace(tmp_dir, cache_dir)
+        except OSError:
+            # another process has written the cache in the meantime
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not PropCache.exists(cache_dir):
+                raise
+        return cache_dir
+
+    @staticmethod
+    def read(cache_dir: str) -> dict:
+        """
+        Load the property tables from cache_dir with memory-mapped arrays
+        :return: dictionary of ids, offsets, avs, attrs, vals
+        """
+        def load(name):
+            return np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+
+        result = {
+            "offsets": load("offsets"),
+            "avs": load("avs"),
+        }
+        for table in PropCache.tables:
+            result[table] = ValueTable(*[load(f"{table}_{name}") for name in PropCache.table_arrays])
+        with open(os.path.join(cache_dir, "attrs.json"), "r", encoding="utf-8") as f:
+            result["attrs"] = json.load(f)
+        return result
@@ -20,7 +20,10 @@ import re
 import codecs
 import requests
 from .Derivative import Derivative
+from .LocalDerivative import LocalDerivative
+from .PropCache import PropCache
 from .ManifestItem import ManifestItem
+import numpy as np
 import pandas as pd
 from typing import List
 from .units.DisplayUnits import DisplayUnits
@@ -30,6 +33,9 @@ import os
 
 
 class PropReader:
+    adjacency_categories = ["__child__", "__parent__", "__instanceof__"]
+    required_files = ["objects_ids.json.gz", "objects_offs.json.gz", "objects_avs.json.gz", "objects_attrs.json.gz",
+                      "objects_vals.json.gz"]
 
     def __init__(self, urn: str = None, token: Token = None, region: str = "US", manifest_item: [ManifestItem] = None):
         # get manifest
@@ -45,10 +51,11 @@ class PropReader:
         self.units = DisplayUnits()
 
     @classmethod
-    def read_from_resource(cls, path):
+    def read_from_resource(cls, path, use_cache: bool = True):
         """
         Initialize PropReader from svf extracted
         :param path: path of resource extracted by svf, e.g. "path/to/3D.svf" or "path/../Resource"
+        :param use_cache: read from (and write) the binary cache "Resource/objects_cache"
         :remark :see tutorial at https://chuongmep.com/posts/2024-09-25-revit-extractor.html
         :return: Instance
         """
@@ -67,6 +74,9 @@ class PropReader:
             raise Exception(f"Directory {parrent_dir} not found")
         if not parrent_dir.endswith("Resource"):
             raise Exception(f"Directory {parrent_dir} is not Resource")
+        cache_dir = os.path.join(parrent_dir, "objects_cache")
+        if use_cache and PropCache.exists(cache_dir):
+            return cls.read_from_cache(cache_dir)
         ids_path = os.path.join(parrent_dir, "objects_ids.json.gz")
         if not os.path.exists(ids_path):
             raise Exception(f"File {ids_path} not found")
@@ -82,7 +92,72 @@ class PropReader:
         vals_path = os.path.join(parrent_dir, "objects_vals.json.gz")
         if not os.path.exists(vals_path):
             raise Exception(f"File {vals_path} not found")
-        return cls.read_from_json_gzip_files(ids_path, offsets_path, avs_path, attrs_path, vals_path)
+        instance = cls.read_from_json_gzip_files(ids_path, offsets_path, avs_path, attrs_path, vals_path)
+        if use_cache:
+            instance.write_cache(cache_dir)
+        return instance
+
+    @classmethod
+    def read_from_svf_path(cls, svf_path: str, urn: str = None, token: Token = None, region: str = "US",
+                           use_cache: bool = True):
+        """
+        Initialize PropReader from svf downloaded to disk, files missing on disk are fetched by urn and token if given
+        :param svf_path: path of the svf file, e.g. "path/to/3D.svf"
+        :param use_cache: read from (and write) the binary cache "objects_cache" beside objects_*.json.gz
+        :return: Instance
+        """
+        derivative = LocalDerivative(svf_path, urn, token, region)
+        manifest_items = derivative.read_svf_manifest_items()
+        resources = [resource for resource in derivative.read_svf_resource_item(manifest_items[0])
+                     if resource.file_name in cls.required_files]
+        missing_files = [file for file in cls.required_files if file not in [r.file_name for r in resources]]
+        if missing_files:
+            raise Exception(f"Missing required files: {missing_files}")
+        cache_dir = os.path.join(os.path.dirname(resources[0].local_path), "objects_cache")
+        if use_cache and PropCache.exists(cache_dir):
+            instance = cls.read_from_cache(cache_dir)
+        else:
+            instance = cls.__new__(cls)
+            instance._load_buffers({resource.file_name: derivative.read_resource_buffer(resource)
+                                    for resource in resources})
+            instance.units = DisplayUnits()
+            if use_cache:
+                instance.write_cache(cache_dir)
+        instance.host = "https://developer.api.autodesk.com"
+        instance.urn = urn
+        instance.token = token
+        instance.region = region
+        return instance
+
+    @classmethod
+    def read_from_cache(cls, cache_dir: str):
+        """
+        Initialize PropReader from the binary cache written by :meth:`write_cache`, arrays are memory-mapped
+        :param cache_dir: directory of the cache
+        :return: Instance
+        """
+        tables = PropCache.read(cache_dir)
+        instance = cls.__new__(cls)
+        instance.ids = tables["ids"]
+        instance.offsets = tables["offsets"]
+        instance.avs = tables["avs"]
+        instance.attrs = tables["attrs"]
+        instance.vals = tables["vals"]
+        instance.units = DisplayUnits()
+        return instance
+
+    def write_cache(self, cache_dir: str) -> str:
+        """
+        Write the property tables to a binary cache, see :meth:`read_from_cache`
+        :param cache_dir: directory of the cache
+        :return: directory of the cache
+        """
+        try:
+            return PropCache.write(cache_dir, self.ids, self.offsets, self.avs, self.attrs, self.vals)
+        except OSError as e:
+            print(f"Failed to write property cache {cache_dir}: {e}")
+            return None
+
     @classmethod
     def read_from_json_gzip_files(cls, ids_path: str, offsets_path: str, avs_path: str, attrs_path: str,
                                   vals_path: str):
@@ -156,19 +231,23 @@ class PropReader:
                 except Exception as e:
                     print(f"Error processing {source.file_name}: {e}")
 
-        required_files = ["objects_ids.json.gz", "objects_offs.json.gz", "objects_avs.json.gz", "objects_attrs.json.gz",
-                          "objects_vals.json.gz"]
-
         # Ensure all required files are downloaded
-        missing_files = [file for file in required_files if file not in downloaded_files]
+        missing_files = [file for file in self.required_files if file not in downloaded_files]
         if missing_files:
             raise Exception(f"Missing required files: {missing_files}")
 
-        self.ids = json.loads(codecs.decode(gzip.decompress(downloaded_files["objects_ids.json.gz"]), 'utf-8'))
-        self.offsets = json.loads(codecs.decode(gzip.decompress(downloaded_files["objects_offs.json.gz"]), 'utf-8'))
-        self.avs = json.loads(codecs.decode(gzip.decompress(downloaded_files["objects_avs.json.gz"]), 'utf-8'))
-        self.attrs = json.loads(codecs.decode(gzip.decompress(downloaded_files["objects_attrs.json.gz"]), 'utf-8'))
-        self.vals = json.loads(codecs.decode(gzip.decompress(downloaded_files["objects_vals.json.gz"]), 'utf-8'))
+        self._load_buffers(downloaded_files)
+
+    def _load_buffers(self, buffers: dict):
+        """
+        Load property tables from the content of objects_*.json.gz files
+        :param buffers: dictionary of file name and content (bytes-like)
+        """
+        self.ids = json.loads(codecs.decode(gzip.decompress(buffers["objects_ids.json.gz"]), 'utf-8'))
+        self.offsets = json.loads(codecs.decode(gzip.decompress(buffers["objects_offs.json.gz"]), 'utf-8'))
+        self.avs = json.loads(codecs.decode(gzip.decompress(buffers["objects_avs.json.gz"]), 'utf-8'))
+        self.attrs = json.loads(codecs.decode(gzip.decompress(buffers["objects_attrs.json.gz"]), 'utf-8'))
+        self.vals = json.loads(codecs.decode(gzip.decompress(buffers["objects_vals.json.gz"]), 'utf-8'))
 
     def enumerate_properties(self, id) -> list:
         """
@@ -274,22 +353,104 @@ class PropReader:
                 props[prop.name] = value
         return props
 
+    def _pair_arrays(self) -> tuple:
+        """
+        Offsets and attribute/value columns of avs as numpy arrays (views when already memory-mapped)
+        :return: offsets, attribute index of each pair, value index of each pair
+        """
+        if getattr(self, "_pairs", None) is None:
+            offsets = self.offsets if isinstance(self.offsets, np.ndarray) else np.asarray(self.offsets, dtype=np.int64)
+            avs = self.avs if isinstance(self.avs, np.ndarray) else np.asarray(self.avs, dtype=np.int64)
+            self._pairs = (offsets.astype(np.int64, copy=False), avs[0::2], avs[1::2])
+        return self._pairs
+
+    def _attribute_mask(self, names: List[str] = None, categories: List[str] = None,
+                        display_names: List[str] = None, exclude_internal: bool = False) -> np.ndarray:
+        """
+        Boolean mask over the attribute table, filters are applied before any value is decoded
+        """
+        rg = re.compile(r'^__\w+__$')
+        mask = np.zeros(len(self.attrs), dtype=bool)
+        for i, attr_obj in enumerate(self.attrs):
+            if not isinstance(attr_obj, list) or len(attr_obj) < 2:
+                continue
+            if names is not None and attr_obj[0] not in names:
+                continue
+            if categories is not None and attr_obj[1] not in categories:
+                continue
+            if display_names is not None and attr_obj[5] not in display_names:
+                continue
+            if exclude_internal and (not attr_obj[1] or rg.match(attr_obj[1])):
+                continue
+            mask[i] = True
+        return mask
+
+    def get_property_table(self, db_ids: List[int] = None, names: List[str] = None, categories: List[str] = None,
+                           display_names: List[str] = None, exclude_internal: bool = False) -> pd.DataFrame:
+        """
+        Get attribute-value pairs of many objects at once in long format, values are not decoded
+        :param db_ids: list of database id, None to get all objects
+        :param names: only keep attributes with these names, e.g. ["_RC", "ElementId"]
+        :param categories: only keep attributes with these categories, e.g. ["__child__"]
+        :param display_names: only keep attributes with these display names
+        :param exclude_internal: drop attributes with internal categories (e.g. "__parent__")
+        :return: :class:`pandas.DataFrame` with columns dbId, attr_idx, val_idx ordered by dbId
+        """
+        offsets, attr_col, val_col = self._pair_arrays()
+        pair_count = len(attr_col)
+        if db_ids is None:
+            pair_idx = None
+        else:
+            ids = np.asarray(db_ids, dtype=np.int64)
+            ids = ids[(ids > 0) & (ids < len(offsets))]
+            starts = offsets[ids]
+            ends = np.where(ids == len(offsets) - 1, pair_count, offsets[np.minimum(ids + 1, len(offsets) - 1)])
+            lengths = np.maximum(ends - starts, 0)
+            total = int(lengths.sum())
+            pair_idx = np.arange(total, dtype=np.int64) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+            pair_dbids = np.repeat(ids, lengths)
+        mask = self._attribute_mask(names, categories, display_names, exclude_internal)
+        if pair_idx is None:
+            pair_idx = np.flatnonzero(mask[attr_col])
+            pair_dbids = np.searchsorted(offsets, pair_idx, side="right") - 1
+        else:
+            keep = mask[attr_col[pair_idx]]
+            pair_idx = pair_idx[keep]
+            pair_dbids = pair_dbids[keep]
+        return pd.DataFrame({
+            "dbId": pair_dbids.astype(np.int64),
+            "attr_idx": np.asarray(attr_col[pair_idx], dtype=np.int64),
+            "val_idx": np.asarray(val_col[pair_idx], dtype=np.int64),
+        })
+
+    def decode_property_table(self, table: pd.DataFrame) -> pd.DataFrame:
+        """
+        Decode a table from :meth:`get_property_table`, each attribute and value is decoded once
+        :param table: :class:`pandas.DataFrame` with columns dbId, attr_idx, val_idx
+        :return: :class:`pandas.DataFrame` with columns name, category, display_name, data_type_context and value added
+        """
+        table = table.copy()
+        attr_idx, attr_inverse = np.unique(table["attr_idx"].to_numpy(), return_inverse=True)
+        attrs = [self.attrs[i] for i in attr_idx]
+        for column, position in [("name", 0), ("category", 1), ("data_type_context", 3), ("display_name", 5)]:
+            decoded = np.empty(len(attrs), dtype=object)
+            decoded[:] = [attr_obj[position] for attr_obj in attrs]
+            table[column] = decoded[attr_inverse]
+        val_idx, val_inverse = np.unique(table["val_idx"].to_numpy(), return_inverse=True)
+        decoded = np.empty(len(val_idx), dtype=object)
+        decoded[:] = [self.vals[i] for i in val_idx]
+        table["value"] = decoded[val_inverse]
+        return table
+
     def get_property_values_by_names(self, names: List[str]) -> dict:
         result = {}
-        for i in range(len(self.offsets)):
-            av_start = 2 * self.offsets[i]
-            av_end = len(self.avs) if i == len(self.offsets) - 1 else 2 * self.offsets[i + 1]
-            for j in range(av_start, av_end, 2):
-                attr_offset = self.avs[j]
-                attr_obj = self.attrs[attr_offset]
-                if isinstance(attr_obj, list) and len(attr_obj) >= 2:
-                    name = attr_obj[0]
-                    if name in names:
-                        value = self.vals[self.avs[j + 1]]
-                        values = result.get(name, [])
-                        if value not in values:
-                            values.append(value)
-                            result[name] = values
+        table = self.get_property_table(names=names).drop_duplicates(subset=["attr_idx", "val_idx"])
+        table = self.decode_property_table(table)
+        for name, value in zip(table["name"], table["value"]):
+            values = result.get(name, [])
+            if value not in values:
+                values.append(value)
+                result[name] = values
         return result
 
     def get_property_values_by_display_names(self, display_names: List[str]) -> dict:
@@ -299,21 +460,13 @@ class PropReader:
         :return:
         """
         result = {}
-        for i in range(len(self.offsets)):
-            av_start = 2 * self.offsets[i]
-            av_end = len(self.avs) if i == len(self.offsets) - 1 else 2 * self.offsets[i + 1]
-            for j in range(av_start, av_end, 2):
-                attr_offset = self.avs[j]
-                attr_obj = self.attrs[attr_offset]
-                if isinstance(attr_obj, list) and len(attr_obj) >= 2:
-                    display_name = attr_obj[5]
-                    if display_name in display_names:
-                        value = self.vals[self.avs[j + 1]]
-                        values = result.get(display_name, [])
-                        if value not in values:
-                            values.append(value)
-                            result[display_name] = values
-
+        table = self.get_property_table(display_names=display_names).drop_duplicates(subset=["attr_idx", "val_idx"])
+        table = self.decode_property_table(table)
+        for display_name, value in zip(table["display_name"], table["value"]):
+            values = result.get(display_name, [])
+            if value not in values:
+                values.append(value)
+                result[display_name] = values
         return result
 
     def get_properties_group_by_category(self, id) -> dict:
@@ -343,17 +496,40 @@ class PropReader:
 
         return properties
 
+    def build_adjacency_index(self) -> dict:
+        """
+        Build the children, parent and instance-of lookups once from avs and attrs
+        :return: :class:`dict` with key is the attribute category ("__child__", "__parent__", "__instanceof__")
+        and value is a CSR pair (indptr, indices), neighbours of id are indices[indptr[id]:indptr[id + 1]]
+        """
+        offsets, _, _ = self._pair_arrays()
+        adjacency = {}
+        for category in self.adjacency_categories:
+            table = self.get_property_table(categories=[category])
+            table = table[table["dbId"] > 0]
+            val_idx, inverse = np.unique(table["val_idx"].to_numpy(), return_inverse=True)
+            targets = np.array([int(self.vals[i]) for i in val_idx], dtype=np.int64)
+            indptr = np.searchsorted(table["dbId"].to_numpy(), np.arange(len(offsets) + 1), side="left")
+            adjacency[category] = (indptr, targets[inverse] if len(targets) else np.zeros(0, dtype=np.int64))
+        self._adjacency = adjacency
+        return adjacency
+
+    def _get_neighbours(self, id, category: str) -> list:
+        adjacency = getattr(self, "_adjacency", None)
+        if adjacency is None:
+            adjacency = self.build_adjacency_index()
+        indptr, indices = adjacency[category]
+        if not 0 < id < len(indptr) - 1:
+            return []
+        return indices[indptr[id]:indptr[id + 1]].tolist()
+
     def get_children(self, id) -> list:
         """
         Get all children of an object
         :param id: database id storage in the manifest file
         :return: list of children (database id)
         """
-        children = []
-        for prop in self.enumerate_properties(id):
-            if prop.category == "__child__":
-                children.append(int(prop.value))
-        return children
+        return self._get_neighbours(id, "__child__")
 
     def get_parent(self, id) -> list:
         """
@@ -361,11 +537,7 @@ class PropReader:
         :param id: database id storage in the manifest file
         :return: list of parent (database id)
         """
-        parent = []
-        for prop in self.enumerate_properties(id):
-            if prop.category == "__parent__":
-                parent.append(int(prop.value))
-        return parent
+        return self._get_neighbours(id, "__parent__")
 
     def get_instance(self, id) -> list:
         """
@@ -373,11 +545,7 @@ class PropReader:
         :param id:  database id storage in the manifest file
         :return:  list of instance (database id)
         """
-        instance_of = []
-        for prop in self.enumerate_properties(id):
-            if prop.category == "__instanceof__":
-                instance_of.append(int(prop.value))
-        return instance_of
+        return self._get_neighbours(id, "__instanceof__")
 
     def get_internal_ref(self, id) -> list:
         reference = []
@@ -396,33 +564,7 @@ class PropReader:
         :param db_ids:  list of database id storage in the manifest file
         :return:  :class:`pandas.DataFrame` of properties
         """
-        dataframe = pd.DataFrame()
-        props_ignore = ['parent', 'instanceof_objid', 'child', "viewable_in"]
-        if len(db_ids) == 0:
-            return dataframe
-        for id in db_ids:
-            props = self.enumerate_properties(id)
-            properties = {}
-            for prop in props:
-                if prop.name == 'name':
-                    continue
-                if prop.name not in props_ignore:
-                    properties[prop.name] = prop.value
-            db_id = id
-            properties['dbId'] = db_id
-            ins = self.get_instance(id)
-            if len(ins) > 0:
-                for instance in ins:
-                    types = self.get_properties(instance)
-                    properties = {**properties, **types}
-            singleDF = pd.DataFrame(properties, index=[0])
-            dataframe = pd.concat([dataframe, singleDF], ignore_index=True)
-            ids = self.get_children(id)
-            dataframe = pd.concat([dataframe, self.get_recursive_ids(ids)], ignore_index=True)
-        if 'dbId' in dataframe.columns:
-            dataframe = dataframe[
-                ['dbId'] + [col for col in dataframe.columns if col not in ['dbId']]]
-        return dataframe
+        return self._get_recursive_frame(db_ids)
 
     def get_recursive_ids_by_parameters(self, db_ids: List[int], params: List[str]) -> pd.DataFrame:
         """
@@ -431,50 +573,80 @@ class PropReader:
         :param params:  list of parameters to get
         :return:  :class:`pandas.DataFrame` of properties
         """
-        dataframe = pd.DataFrame()
-        props_ignore = ['parent', 'instanceof_objid', 'child', "viewable_in"]
-        if len(db_ids) == 0:
-            return dataframe
-        for id in db_ids:
-            props = self.enumerate_properties(id)
-            properties = {}
-            for prop in props:
-                if prop.name == 'name':
+        return self._get_recursive_frame(db_ids, params)
+
+    def _walk_descendants(self, db_ids: List[int]) -> List[int]:
+        """
+        Each id followed by all its descendants in depth-first pre-order, like the former recursion
+        (an id given more than once, or inside the subtree of another given id, is repeated)
+        :param db_ids: list of database id storage in the manifest file
+        :return: list of database id
+        """
+        ordered = []
+        for root in db_ids:
+            seen = set()
+            stack = [root]
+            while stack:
+                id = stack.pop()
+                if id in seen:
                     continue
-                if prop.name not in props_ignore:
-                    properties[prop.name] = prop.value
-            db_id = id
-            properties = {k: v for k, v in properties.items() if k in params}
-            properties['dbId'] = db_id
-            ins = self.get_instance(id)
-            if len(ins) > 0:
-                for instance in ins:
-                    types = self.get_properties(instance)
-                    types = {k: v for k, v in types.items() if k in params}
-                    properties = {**properties, **types}
-            singleDF = pd.DataFrame(properties, index=[0])
-            dataframe = pd.concat([dataframe, singleDF], ignore_index=True)
-            ids = self.get_children(id)
-            dataframe = pd.concat([dataframe, self.get_recursive_ids_by_parameters(ids, params)], ignore_index=True)
-        if 'dbId' in dataframe.columns:
-            dataframe = dataframe[['dbId'] + [col for col in dataframe.columns if col not in ['dbId']]]
-        return dataframe
+                seen.add(id)
+                ordered.append(id)
+                stack.extend(reversed(self.get_children(id)))
+        return ordered
+
+    def _get_recursive_frame(self, db_ids: List[int], params: List[str] = None) -> pd.DataFrame:
+        """
+        One row per object of db_ids and their descendants: own properties (except name and the links
+        parent/child/instanceof/viewable_in), then the properties of each instance-of type overriding them,
+        built from two property tables instead of reading every object separately
+        :param db_ids: list of database id storage in the manifest file
+        :param params: only keep these property names, None to keep all
+        :return: :class:`pandas.DataFrame` with column dbId first
+        """
+        if len(db_ids) == 0:
+            return pd.DataFrame()
+        props_ignore = ['name', 'parent', 'instanceof_objid', 'child', "viewable_in"]
+        ids = self._walk_descendants(db_ids)
+        unique_ids = list(dict.fromkeys(ids))
+        rows = pd.DataFrame({"row": np.arange(len(ids)), "dbId": ids})
+
+        own = self.decode_property_table(self.get_property_table(db_ids=unique_ids, names=params))
+        own = own.loc[~own["name"].isin(props_ignore), ["dbId", "name", "value"]]
+        own["rank"] = 0
+        frames = [own]
+
+        links = [(id, rank, instance) for id in unique_ids
+                 for rank, instance in enumerate(self.get_instance(id), start=1)]
+        if links:
+            links = pd.DataFrame(links, columns=["dbId", "rank", "instance"])
+            types = self.decode_property_table(self.get_property_table(
+                db_ids=links["instance"].unique().tolist(), names=params, exclude_internal=True))
+            types = types.rename(columns={"dbId": "instance"})[["instance", "name", "value"]]
+            frames.append(links.merge(types, on="instance")[["dbId", "name", "value", "rank"]])
+
+        # order by object, own/type rank and pair order: later properties of the same name win,
+        # columns keep the order of first appearance
+        long = pd.concat(frames, ignore_index=True)
+        long["seq"] = np.arange(len(long))
+        long = rows.merge(long[long["name"] != "dbId"], on="dbId")
+        long = long.sort_values(["row", "rank", "seq"], kind="stable")
+        columns = long["name"].drop_duplicates().tolist()
+        long = long.drop_duplicates(subset=["row", "name"], keep="last")
+        dataframe = long.pivot(index="row", columns="name", values="value")
+        dataframe = dataframe.reindex(index=range(len(ids)), columns=columns)
+        dataframe.columns.name = None
+        dataframe.insert(0, "dbId", ids)
+        return dataframe.reset_index(drop=True).infer_objects()
 
     def get_all_properties_names(self) -> List[str]:
         """
         Get all properties names of all objects
         :return: :class:`list` of properties names
         """
-        props_names = []
-        for i in range(len(self.offsets)):
-            av_start = 2 * self.offsets[i]
-            av_end = len(self.avs) if i == len(self.offsets) - 1 else 2 * self.offsets[i + 1]
-            for j in range(av_start, av_end, 2):
-                attr_offset = self.avs[j]
-                attr_obj = self.attrs[attr_offset]
-                if isinstance(attr_obj, list) and len(attr_obj) >= 2:
-                    name = attr_obj[0]
-                    props_names.append(name)
+        _, attr_col, _ = self._pair_arrays()
+        mask = self._attribute_mask()
+        props_names = [self.attrs[i][0] for i in np.unique(attr_col) if mask[i]]
         props_names = list(set(props_names))
         props_names.sort()
         return props_names
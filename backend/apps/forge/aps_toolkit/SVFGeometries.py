@@ -50,8 +50,7 @@ class SVFGeometries:
         resources = derivative.read_svf_resource_item(manifest_item)
         for resource in resources:
             if resource.local_path.endswith("GeometryMetadata.pf"):
-                bytes_io = derivative.download_stream_resource(resource)
-                buffer = bytes_io.read()
+                buffer = derivative.read_resource_buffer(resource)
                 geos = SVFGeometries.parse_geometries(buffer)
                 geometries.extend(geos)
         return geometries
@@ -46,8 +46,7 @@ class SVFMaterials:
         materials = []
         for resource in resources:
             if resource.local_path.endswith("Materials.json.gz"):
-                bytes_io = derivative.download_stream_resource(resource)
-                buffer = bytes_io.read()
+                buffer = derivative.read_resource_buffer(resource)
                 mats = SVFMaterials.parse_materials(buffer)
                 materials.extend(mats)
         return materials
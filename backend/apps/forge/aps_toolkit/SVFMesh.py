@@ -20,6 +20,7 @@ import math
 from .SVFLines import SVFLines
 from .SVFPoints import SVFPoints
 from .Derivative import Derivative
+from .LocalDerivative import LocalDerivative
 import re
 from .ManifestItem import ManifestItem
 
@@ -65,6 +66,19 @@ class SVFMesh:
             mesh_packs[manifest_item.guid] = meshes_manifest_item
         return mesh_packs
 
+    @staticmethod
+    def parse_mesh_from_svf_path(svf_path, urn=None, token=None, region="US") -> dict:
+        """
+        Reads mesh data from an SVF downloaded to disk, missing packs are fetched by urn and token if given.
+        :param svf_path: path of the svf file, e.g. "path/to/3D.svf"
+        :return: a dictionary where the key is the guid of the manifest item and value is the list of meshes
+        """
+        derivative = LocalDerivative(svf_path, urn, token, region)
+        mesh_packs = {}
+        for manifest_item in derivative.read_svf_manifest_items():
+            mesh_packs[manifest_item.guid] = SVFMesh.parse_mesh_from_manifest_item(derivative, manifest_item)
+        return mesh_packs
+
     @staticmethod
     def parse_mesh_from_manifest_item(derivative:[Derivative], manifest_item: [ManifestItem]) -> list:
         svf_resources = derivative.read_svf_resource_item(manifest_item)
@@ -73,8 +87,7 @@ class SVFMesh:
         file_packs = [resource for resource in svf_resources if pattern.match(resource.file_name)]
         meshes_manifest_item = []
         for file_pack in file_packs:
-            bytes_io = derivative.download_stream_resource(file_pack)
-            buffer = bytes_io.read()
+            buffer = derivative.read_resource_buffer(file_pack)
             meshes = SVFMesh.parse_mesh(buffer)
             meshes_manifest_item.extend(meshes)
         return meshes_manifest_item
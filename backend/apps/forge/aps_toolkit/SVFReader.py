@@ -17,6 +17,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from os.path import join
 import os
 from .Derivative import Derivative
+from .LocalDerivative import LocalDerivative
 from .Fragments import Fragments
 from .SVFGeometries import SVFGeometries
 from .ManifestItem import ManifestItem
@@ -35,8 +36,24 @@ class SVFReader:
         self.urn = urn
         self.token = token
         self.region = region
+        self.svf_path = None
         self.derivative = Derivative(self.urn, self.token, self.region)
 
+    @classmethod
+    def read_from_svf_path(cls, svf_path, urn=None, token=None, region="US"):
+        """
+        Initialize SVFReader from svf downloaded to disk, files missing on disk are fetched by urn and token if given
+        :param svf_path: path of the svf file, e.g. "path/to/3D.svf"
+        :return: Instance
+        """
+        instance = cls.__new__(cls)
+        instance.urn = urn
+        instance.token = token
+        instance.region = region
+        instance.svf_path = svf_path
+        instance.derivative = LocalDerivative(svf_path, urn, token, region)
+        return instance
+
     def read_contents(self, manifest_item: list[ManifestItem] = None) -> list[SVFContent]:
         contents = []
         if manifest_item:
@@ -71,15 +88,10 @@ class SVFReader:
     def read_fragments(self, manifest_item: list[ManifestItem] = None) -> dict:
         fragments = {}
         if manifest_item:
-            resources = self.derivative.read_svf_resource_item(manifest_item)
-            for resource in resources:
-                if resource.local_path.endswith("FragmentList.pack"):
-                    bytes_io = self.derivative.download_stream_resource(resource)
-                    buffer = bytes_io.read()
-                    frags = Fragments.parse_fragments(buffer)
-                    fragments[manifest_item.guid] = frags
+            fragments = Fragments.parse_fragments_from_manifest_item(self.derivative, manifest_item)
         else:
-            fragments = Fragments.parse_fragments_from_urn(self.urn, self.token, self.region)
+            for item in self.read_svf_manifest_items():
+                fragments.update(Fragments.parse_fragments_from_manifest_item(self.derivative, item))
         return fragments
 
     def read_geometries(self, manifest_item: list[ManifestItem] = None) -> dict:
@@ -88,7 +100,8 @@ class SVFReader:
             geos = SVFGeometries.parse_geos_from_manifest_item(self.derivative, manifest_item)
             geometries[manifest_item.guid] = geos
         else:
-            geometries = SVFGeometries.parse_geometries_from_urn(self.urn, self.token, self.region)
+            for item in self.read_svf_manifest_items():
+                geometries[item.guid] = SVFGeometries.parse_geos_from_manifest_item(self.derivative, item)
         return geometries
 
     def read_meshes(self, manifest_item: list[ManifestItem] = None) -> dict:
@@ -97,7 +110,8 @@ class SVFReader:
             mesh = SVFMesh.parse_mesh_from_manifest_item(self.derivative, manifest_item)
             meshes[manifest_item.guid] = mesh
         else:
-            meshes = SVFMesh.parse_mesh_from_urn(self.urn, self.token, self.region)
+            for item in self.read_svf_manifest_items():
+                meshes[item.guid] = SVFMesh.parse_mesh_from_manifest_item(self.derivative, item)
         return meshes
 
     def read_materials(self, manifest_item: list[ManifestItem] = None) -> dict[str, list[Materials]]:
@@ -106,7 +120,8 @@ class SVFReader:
             mats = SVFMaterials.parse_materials_from_manifest_item(self.derivative, manifest_item)
             materials[manifest_item.guid] = mats
         else:
-            materials = SVFMaterials.parse_materials_from_urn(self.urn, self.token, self.region)
+            for item in self.read_svf_manifest_items():
+                materials[item.guid] = SVFMaterials.parse_materials_from_manifest_item(self.derivative, item)
         return materials
 
     def read_images(self, manifest_item: list[ManifestItem] = None) -> dict[str, list[SVFImage]]:
@@ -115,7 +130,8 @@ class SVFReader:
             imgs = SVFImage.parse_images_from_derivative(self.derivative, manifest_item)
             images[manifest_item.guid] = imgs
         else:
-            images = SVFImage.parse_images_from_urn(self.urn, self.token, self.region)
+            for item in self.read_svf_manifest_items():
+                images[item.guid] = SVFImage.parse_images_from_derivative(self.derivative, item)
         return images
 
     def read_meta_data(self, manifest_item: list[ManifestItem] = None) -> dict:
@@ -124,10 +140,13 @@ class SVFReader:
             meta_data = SVFMetadata.parse_metadata_from_derivative(self.derivative, manifest_item)
             meta_datas[manifest_item.guid] = meta_data
         else:
-            meta_datas = SVFMetadata.parse_metadata_from_urn(self.urn, self.token, self.region)
+            for item in self.read_svf_manifest_items():
+                meta_datas[item.guid] = SVFMetadata.parse_metadata_from_derivative(self.derivative, item)
         return meta_datas
 
     def read_properties(self) -> PropReader:
+        if self.svf_path:
+            return PropReader.read_from_svf_path(self.svf_path, self.urn, self.token, self.region)
         return PropReader(self.urn, self.token, self.region)
 
     def download(self, output_dir, manifest_item: list[ManifestItem] = None, send_progress=None):
@@ -6,6 +6,7 @@ from .ProDbReaderRevit import PropDbReaderRevit
 from .ProDbReaderCad import PropDbReaderCad
 from .ProDbReaderNavis import PropDbReaderNavis
 from .PropReader import PropReader
+from .PropCache import PropCache
 from .DbReader import DbReader
 from .Bucket import Bucket
 from .Token import Token
@@ -15,6 +16,7 @@ from .PackFileReader import PackFileReader
 from .SVFReader import SVFReader
 from .SVFContent import SVFContent
 from .Derivative import Derivative
+from .LocalDerivative import LocalDerivative
 from .Fragments import Fragments
 from .SVFGeometries import SVFGeometries
 from .SVFMesh import SVFMesh
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:27
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # forge_bim_object 資料量大，以 CREATE INDEX CONCURRENTLY 建立索引，不阻擋寫入（不可包在交易中）
+    atomic = False
+
+    dependencies = [
+        ('forge', '0054_bimmodel_uploader'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='bimobject',
+            index=models.Index(fields=['bim_model', 'display_name'], name='idx_bim_obj_name_prefix', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_cobie_values(apps, schema_editor):
+    """依現有 BimObject 逐模型建立 COBie 屬性值字典"""
+    BimModel = apps.get_model('forge', 'BimModel')
+    BimObject = apps.get_model('forge', 'BimObject')
+    BimCobieValue = apps.get_model('forge', 'BimCobieValue')
+
+    for bim_model_id in BimModel.objects.values_list('id', flat=True):
+        rows = BimObject.objects.filter(
+            bim_model_id=bim_model_id,
+            display_name__startswith='COBie.'
+        ).values('display_name', 'value').annotate(count=Count('id')).order_by()
+        BimCobieValue.objects.bulk_create(
+            [BimCobieValue(bim_model_id=bim_model_id, **row) for row in rows],
+            batch_size=5000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0055_bim_object_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BimCobieValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('display_name', models.CharField(max_length=255)),
+                ('value', models.CharField(blank=True, max_length=255, null=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('bim_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cobie_values', to='forge.bimmodel')),
+            ],
+            options={
+                'db_table': 'forge_bim_cobie_value',
+                'indexes': [models.Index(fields=['display_name', 'value'], name='forge_bim_c_display_b6e39f_idx')],
+                'unique_together': {('bim_model', 'display_name', 'value')},
+            },
+        ),
+        migrations.RunPython(backfill_cobie_values, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0056_bim_cobie_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BimRegionTree',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tree', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'forge_bim_region_tree',
+            },
+        ),
+    ]
@@ -158,6 +158,18 @@ class BimRegion(models.Model):
         return f"{zone_code}-{role_code}-{self.level} (dbid: {self.dbid})"
 
 
+class BimRegionTree(models.Model):
+    """
+    分區(zone)→空間/系統(role)→樓層(level) 樹狀結構的實體化結果，只保留一筆
+    匯入 BimRegion 時重建；ZoneCode / RoleCode 異動或模型刪除時清除，下次讀取再重建
+    """
+    tree = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "forge_bim_region_tree"
+
+
 class BimObjectHierarchy(models.Model):
     bim_model = models.ForeignKey('BimModel', on_delete=models.CASCADE, related_name='object_hierarchies')
     entity_id = models.IntegerField()
@@ -195,6 +207,9 @@ class BimObject(models.Model):
             models.Index(fields=['display_name', 'value']),
             models.Index(fields=['numeric_value']),
             models.Index(fields=['bim_model', 'dbid', 'value']),
+            # COBie 匯出以 display_name LIKE 'COBie.%' 前綴查詢，pattern_ops 使非 C collation 也可走索引
+            models.Index(fields=['bim_model', 'display_name'], name='idx_bim_obj_name_prefix',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
             models.Index(fields=['root_dbid']),
             models.Index(fields=['parent_id']),
             GinIndex(fields=['value'], name='idx_bim_obj_val_trgm', opclasses=['gin_trgm_ops']),
@@ -204,6 +219,27 @@ class BimObject(models.Model):
         return f"{self.value} (dbid: {self.dbid})"
 
 
+class BimCobieValue(models.Model):
+    """
+    COBie 屬性值字典：每個模型的 (display_name, value) 及出現次數
+    匯入模型時整批重建該模型的資料，查詢唯一值時不需掃描 BimObject
+    """
+    bim_model = models.ForeignKey('BimModel', on_delete=models.CASCADE, related_name='cobie_values')
+    display_name = models.CharField(max_length=255)
+    value = models.CharField(max_length=255, null=True, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "forge_bim_cobie_value"
+        unique_together = ('bim_model', 'display_name', 'value')
+        indexes = [
+            models.Index(fields=['display_name', 'value']),
+        ]
+
+    def __str__(self):
+        return f"{self.display_name}: {self.value} ({self.count})"
+
+
 class BimCobie(models.Model):
     # 狀態選擇
     STATUS_CHOICES = [
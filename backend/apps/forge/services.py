@@ -2,13 +2,18 @@ import datetime
 import json
 import redis
 import base64
+import os
 import sqlite3
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
 from rest_framework.exceptions import NotFound
-from apps.forge.aps_toolkit import Auth, Bucket
+from apps.forge.aps_toolkit import Auth, Bucket, SVFReader
 from apps.forge.aps_toolkit.Bucket import PublicKey
 
 from apps.core import models as core_models
+from apps.core.services import get_cached_payload, set_cached_payload, invalidate_cached_payload
 from apps.forge import models as forge_models
 
 
@@ -64,3 +69,216 @@ def get_tender_name(file_name) -> str:
     else:
         tender_name = 'Uncategorized'
     return tender_name
+
+
+def get_local_svf_reader(bim_model, token=None) -> SVFReader:
+    """依 BimModel.svf_path 從本機 SVF 目錄建立 SVFReader，缺檔時才以 token 向 APS 補抓"""
+    if not bim_model.svf_path:
+        raise NotFound(f"BimModel {bim_model.name} has no SVF on server.")
+    svf_path = os.path.join(settings.MEDIA_ROOT, bim_model.svf_path).replace(os.sep, '/')
+    if not os.path.exists(svf_path):
+        raise NotFound(f"SVF file not found: {bim_model.svf_path}")
+    return SVFReader.read_from_svf_path(svf_path, bim_model.urn, token)
+
+
+COBIE_NAME_VALUE_CACHE_KEY = 'forge:cobie:name_value'
+COBIE_NAME_CACHE_KEY = 'forge:cobie:name'
+
+
+def refresh_cobie_values(bim_model_id) -> int:
+    """重建單一模型的 COBie 屬性值字典（匯入 BimObject 後呼叫），回傳字典筆數"""
+    rows = list(
+        forge_models.BimObject.objects.filter(
+            bim_model_id=bim_model_id,
+            display_name__startswith='COBie.'
+        ).values('display_name', 'value').annotate(count=Count('id')).order_by()
+    )
+    with transaction.atomic():
+        forge_models.BimCobieValue.objects.filter(bim_model_id=bim_model_id).delete()
+        forge_models.BimCobieValue.objects.bulk_create(
+            [forge_models.BimCobieValue(bim_model_id=bim_model_id, **row) for row in rows],
+            batch_size=5000
+        )
+        transaction.on_commit(invalidate_cobie_dictionary)
+    return len(rows)
+
+
+def invalidate_cobie_dictionary():
+    """清除 COBie 唯一值快取（模型匯入 / 刪除、COBie 欄位定義異動時）"""
+    invalidate_cached_payload(COBIE_NAME_VALUE_CACHE_KEY, COBIE_NAME_CACHE_KEY)
+
+
+def get_cobie_name_values():
+    """
+    所有模型的 COBie (display_name, value) 唯一值，含出現次數與模型數
+    :return: (etag, [{display_name, label, description, count, models}])
+    """
+    def build():
+        descriptions = dict(
+            forge_models.BimCobie.objects.filter(is_active=True).values_list('name', 'description')
+        )
+        rows = forge_models.BimCobieValue.objects.values('display_name', 'value').annotate(
+            total=Sum('count'),
+            models=Count('bim_model', distinct=True)
+        ).order_by('display_name', 'value')
+        return [
+            {
+                'display_name': row['display_name'],
+                'label': row['value'],
+                'description': descriptions.get(row['display_name'], '') or row['display_name'],
+                'count': row['total'],
+                'models': row['models'],
+            }
+            for row in rows
+        ]
+
+    return get_cached_payload(COBIE_NAME_VALUE_CACHE_KEY, build)
+
+
+def get_cobie_names():
+    """
+    所有模型出現過的 COBie display_name
+    :return: (etag, [display_name])
+    """
+    def build():
+        return list(
+            forge_models.BimCobieValue.objects.values_list('display_name', flat=True).distinct().order_by('display_name')
+        )
+
+    return get_cached_payload(COBIE_NAME_CACHE_KEY, build)
+
+
+REGION_TREE_CACHE_KEY = 'forge:region_tree'
+
+
+def build_region_tree():
+    """
+    以一次查詢建立 分區(zone)→空間/系統(role)→樓層(level) 樹狀結構
+    分區依 id、角色依 id、樓層依 BimRegion id 排序，排除包含 'XX' 的樓層
+    """
+    rows = forge_models.BimRegion.objects.filter(
+        zone__isnull=False,
+        role__isnull=False
+    ).order_by('zone_id', 'role_id', 'id').values_list(
+        'id', 'level',
+        'zone_id', 'zone__code', 'zone__description',
+        'role_id', 'role__code', 'role__description',
+    )
+
+    zones = {}
+    for region_id, level, zone_id, zone_code, zone_description, role_id, role_code, role_description in rows:
+        zone = zones.get(zone_id)
+        if zone is None:
+            zone = zones[zone_id] = {
+                'label': f'{zone_description} ({zone_code})',
+                'id': zone_id,
+                'code': zone_code,
+                'children': {}
+            }
+
+        role = zone['children'].get(role_id)
+        if role is None:
+            role = zone['children'][role_id] = {
+                'label': f'{role_description} ({role_code})',
+                'id': role_id,
+                'code': role_code,
+                'children': []
+            }
+
+        if 'XX' not in level:
+            role['children'].append({'label': level, 'id': region_id})
+
+    for zone in zones.values():
+        zone['children'] = list(zone['children'].values())
+    return list(zones.values())
+
+
+def rebuild_region_tree():
+    """重建區域樹並寫入資料表與快取（匯入 BimRegion 後呼叫）"""
+    tree = build_region_tree()
+    forge_models.BimRegionTree.objects.update_or_create(pk=1, defaults={'tree': tree})
+    return set_cached_payload(REGION_TREE_CACHE_KEY, tree), tree
+
+
+def get_region_tree():
+    """
+    讀取區域樹：快取 → 資料表 → 重建
+    :return: (etag, tree)
+    """
+    def load():
+        materialized = forge_models.BimRegionTree.objects.filter(pk=1).values_list('tree', flat=True).first()
+        if materialized is not None:
+            return materialized
+        tree = build_region_tree()
+        forge_models.BimRegionTree.objects.update_or_create(pk=1, defaults={'tree': tree})
+        return tree
+
+    return get_cached_payload(REGION_TREE_CACHE_KEY, load)
+
+
+def invalidate_region_tree():
+    """清除區域樹（ZoneCode / RoleCode 異動、模型刪除時），下次讀取重建"""
+    forge_models.BimRegionTree.objects.filter(pk=1).delete()
+    invalidate_cached_payload(REGION_TREE_CACHE_KEY)
+
+
+CONDITION_TREE_CACHE_KEY = 'forge:condition_tree'
+
+
+def build_condition_tree():
+    """
+    以兩次查詢建立條件樹（輸出同 BimConditionSerializer）：
+    啟用的條件依 MPTT (tree_id, lft) 排序，父節點必定先於子節點；
+    分類以 DISTINCT ON (condition, display_name, value) 一次取出後依條件分組
+    停用節點的整個子樹不顯示；空的 categories / children 不輸出
+    """
+    conditions = forge_models.BimCondition.objects.filter(
+        is_active=True
+    ).order_by('tree_id', 'lft').values_list('id', 'name', 'display_name', 'value', 'parent_id', 'order', 'tree_id')
+
+    categories = forge_models.BimCategory.objects.filter(
+        condition__is_active=True
+    ).order_by('condition_id', 'display_name', 'value', 'id').distinct(
+        'condition_id', 'display_name', 'value'
+    ).values_list('condition_id', 'id', 'bim_model_id', 'value', 'display_name')
+
+    categories_by_condition = {}
+    for condition_id, category_id, bim_model_id, value, display_name in categories:
+        categories_by_condition.setdefault(condition_id, []).append({
+            'id': category_id,
+            'bim_model': bim_model_id,
+            'value': value,
+            'display_name': display_name,
+        })
+
+    nodes = {}
+    roots = []
+    for condition_id, name, display_name, value, parent_id, order, tree_id in conditions:
+        node = {'id': condition_id, 'name': name, 'display_name': display_name, 'value': value}
+        node_categories = categories_by_condition.get(condition_id)
+        if node_categories:
+            node['categories'] = sorted(node_categories, key=lambda c: c['value'])
+        nodes[condition_id] = node
+
+        if parent_id is None:
+            roots.append((order, tree_id, node))
+        elif parent_id in nodes:
+            nodes[parent_id].setdefault('children', []).append(node)
+        else:
+            # 父節點停用，整個子樹不顯示
+            del nodes[condition_id]
+
+    return [node for _, _, node in sorted(roots, key=lambda root: root[:2])]
+
+
+def get_condition_tree():
+    """
+    讀取條件樹（快取，匯入分類或條件異動時清除）
+    :return: (etag, tree)
+    """
+    return get_cached_payload(CONDITION_TREE_CACHE_KEY, build_condition_tree)
+
+
+def invalidate_condition_tree():
+    """清除條件樹快取"""
+    invalidate_cached_payload(CONDITION_TREE_CACHE_KEY)
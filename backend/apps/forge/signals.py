@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from . import models
+from .services import invalidate_cobie_dictionary, invalidate_region_tree, invalidate_condition_tree
 
 
 def assign_default_bim_group(sender, instance, created, **kwargs):
@@ -11,3 +13,29 @@ def assign_default_bim_group(sender, instance, created, **kwargs):
         if min_bim_group:
             instance.bim_group = min_bim_group
             instance.save(update_fields=['bim_group'])  # 只更新 bim_group 欄位            
+
+
+@receiver(post_delete, sender=models.BimModel)
+@receiver(post_save, sender=models.BimCobie)
+@receiver(post_delete, sender=models.BimCobie)
+def invalidate_cobie_dictionary_cache(sender, **kwargs):
+    """模型刪除（字典隨之 cascade 刪除）或 COBie 欄位說明異動時清除唯一值快取"""
+    transaction.on_commit(invalidate_cobie_dictionary)
+
+
+@receiver(post_delete, sender=models.BimModel)
+@receiver(post_save, sender=models.ZoneCode)
+@receiver(post_delete, sender=models.ZoneCode)
+@receiver(post_save, sender=models.RoleCode)
+@receiver(post_delete, sender=models.RoleCode)
+def invalidate_region_tree_cache(sender, **kwargs):
+    """分區 / 角色代碼異動或模型刪除（BimRegion 隨之刪除）時清除區域樹"""
+    transaction.on_commit(invalidate_region_tree)
+
+
+@receiver(post_delete, sender=models.BimModel)
+@receiver(post_save, sender=models.BimCondition)
+@receiver(post_delete, sender=models.BimCondition)
+def invalidate_condition_tree_cache(sender, **kwargs):
+    """條件異動或模型刪除（分類隨之 cascade 刪除）時清除條件樹快取"""
+    transaction.on_commit(invalidate_condition_tree)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Sensor, SensorBimBinding, SensorDataLog
+from .models import Sensor, SensorBimBinding, SensorDataLog, SensorDataRollup, SensorAlert
 
 
 @admin.register(Sensor)
@@ -83,3 +83,35 @@ class SensorDataLogAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         # 數據日誌為只讀
         return False
+
+
+@admin.register(SensorDataRollup)
+class SensorDataRollupAdmin(admin.ModelAdmin):
+    list_display = ['sensor', 'resolution', 'bucket', 'count', 'min', 'max']
+    list_filter = ['resolution', 'bucket']
+    search_fields = ['sensor__sensor_id', 'sensor__name']
+    date_hierarchy = 'bucket'
+    raw_id_fields = ['sensor']
+
+    def has_add_permission(self, request):
+        # 彙總由寫入管線維護
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SensorAlert)
+class SensorAlertAdmin(admin.ModelAdmin):
+    list_display = ['sensor', 'previous_status', 'status', 'value', 'timestamp']
+    list_filter = ['status', 'previous_status', 'timestamp']
+    search_fields = ['sensor__sensor_id', 'sensor__name']
+    date_hierarchy = 'timestamp'
+    raw_id_fields = ['sensor']
+
+    def has_add_permission(self, request):
+        # 警報紀錄由警報狀態機產生
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
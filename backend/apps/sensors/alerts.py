@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# 目前處於警告 / 錯誤狀態的感測器 {sensor_id: json}，查詢現有警報只需讀取此 hash
+ACTIVE_ALARMS_KEY = 'sensor:alerts:active'
+# 每個感測器的狀態機 hash：status / since / value / pending / count
+ALERT_STATE_PREFIX = 'sensor:alert:'
+# 狀態轉換事件的 Channels group
+ALERT_GROUP = 'sensor.alerts'
+
+STATUSES = np.array(['normal', 'warning', 'error'])
+
+# 批次套用防抖與遲滯的狀態機，以單一 script 執行確保多個 worker 同時處理同一感測器時不會重複轉換
+# ARGV: debounce, 之後每 5 個一組 (sensor_id, status, clear_status, value, timestamp)
+# 回傳發生的轉換 [[sensor_id, previous_status, status, value, timestamp], ...]
+ALERT_STATE_SCRIPT = """
+local debounce = tonumber(ARGV[1])
+local rank = {normal = 0, warning = 1, error = 2}
+local changes = {}
+for base = 2, #ARGV, 5 do
+    local sensor_id, status, clear_status = ARGV[base], ARGV[base + 1], ARGV[base + 2]
+    local value, timestamp = ARGV[base + 3], ARGV[base + 4]
+    local key = KEYS[2] .. sensor_id
+    local state = redis.call('HMGET', key, 'status', 'pending', 'count')
+    local current = state[1] or 'normal'
+
+    -- 降級時需離開遲滯區間
+    local candidate = status
+    if rank[status] < rank[current] then
+        candidate = clear_status
+    end
+
+    if candidate == current then
+        if state[2] then
+            redis.call('HDEL', key, 'pending', 'count')
+        end
+    else
+        local count = 1
+        if state[2] == candidate then
+            count = tonumber(state[3]) + 1
+        end
+        if count >= debounce then
+            redis.call('HSET', key, 'status', candidate, 'since', timestamp, 'value', value)
+            redis.call('HDEL', key, 'pending', 'count')
+            if candidate == 'normal' then
+                redis.call('HDEL', KEYS[1], sensor_id)
+            else
+                redis.call('HSET', KEYS[1], sensor_id, cjson.encode({
+                    sensor_id = sensor_id, status = candidate, value = tonumber(value), since = timestamp
+                }))
+            end
+            table.insert(changes, {sensor_id, current, candidate, value, timestamp})
+        else
+            redis.call('HSET', key, 'pending', candidate, 'count', count)
+        end
+    end
+end
+return changes
+"""
+
+
+def _threshold_matrix(configs):
+    """[error_min, error_max, warning_min, warning_max]，未設定為 NaN"""
+    return np.array([
+        (c.error_threshold_min, c.error_threshold_max, c.warning_threshold_min, c.warning_threshold_max)
+        for c in configs
+    ], dtype=float).reshape(-1, 4)
+
+
+def evaluate_thresholds(configs, values, deadband=0.0):
+    """
+    以向量運算判斷一批數值的狀態（結果同 Sensor.get_status）
+    deadband > 0 時門檻往正常範圍內縮 門檻範圍 * deadband，用於判斷是否已離開遲滯區間；
+    門檻範圍為已設定門檻的最大值減最小值（門檻為 0 時也有遲滯），只設定一個門檻時改用 |門檻|
+    :return: 狀態字串陣列
+    """
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return np.array([], dtype=STATUSES.dtype)
+    thresholds = _threshold_matrix(configs)
+    if deadband:
+        # fmax / fmin 略過未設定的門檻 (NaN)
+        span = (np.fmax.reduce(thresholds, axis=1) - np.fmin.reduce(thresholds, axis=1))[:, None]
+        with np.errstate(invalid='ignore'):
+            margin = np.where(span > 0, span, np.abs(thresholds)) * deadband
+        thresholds = thresholds + margin * np.array([1, -1, 1, -1])
+
+    # 與 NaN 比較皆為 False，未設定的門檻自然不觸發
+    with np.errstate(invalid='ignore'):
+        error = (values < thresholds[:, 0]) | (values > thresholds[:, 1])
+        warning = (values < thresholds[:, 2]) | (values > thresholds[:, 3])
+    return STATUSES[np.select([error, warning], [2, 1], 0)]
+
+
+class SensorAlertEngine:
+    """
+    感測器警報狀態機
+    一批讀數先以 evaluate_thresholds 向量判斷，再由 Redis script 套用：
+    - 防抖：新狀態需連續出現 debounce 次才轉換
+    - 遲滯：由警告 / 錯誤降級時，數值需離開門檻範圍 hysteresis 比例的區間
+    只有狀態轉換會寫入 SensorAlert 並推送到 sensor.alerts group
+    """
+
+    def __init__(self, redis_client, debounce=None, hysteresis=None, channel_layer=None):
+        self.redis_client = redis_client
+        self.debounce = debounce or settings.SENSOR_ALERT_DEBOUNCE
+        self.hysteresis = hysteresis if hysteresis is not None else settings.SENSOR_ALERT_HYSTERESIS
+        self.channel_layer = channel_layer
+        self._script = redis_client.register_script(ALERT_STATE_SCRIPT)
+        self.transitions = 0
+
+    def evaluate(self, configs, values):
+        """
+        :return: (status, clear_status) 兩個狀態陣列
+        """
+        status = evaluate_thresholds(configs, values)
+        if not self.hysteresis:
+            return status, status
+        return status, evaluate_thresholds(configs, values, self.hysteresis)
+
+    def process(self, readings):
+        """
+        套用狀態機並記錄轉換
+        :param readings: [(config, value, status, clear_status, timestamp)]，timestamp 為 datetime
+        :return: 轉換列表
+        """
+        if not readings:
+            return []
+
+        args = [self.debounce]
+        pks = {}
+        for config, value, status, clear_status, timestamp in readings:
+            args += [config.sensor_id, status, clear_status, repr(float(value)), timestamp.isoformat()]
+            pks[config.sensor_id] = config.pk
+
+        changes = [
+            {
+                'sensor_id': sensor_id,
+                'previous_status': previous_status,
+                'status': status,
+                'value': float(value),
+                'timestamp': timestamp,
+            }
+            for sensor_id, previous_status, status, value, timestamp
+            in self._script(keys=[ACTIVE_ALARMS_KEY, ALERT_STATE_PREFIX], args=args)
+        ]
+        if not changes:
+            return changes
+
+        self.transitions += len(changes)
+        self._save(changes, pks)
+        self._publish(changes)
+        return changes
+
+    def _save(self, changes, pks):
+        from .models import SensorAlert
+
+        try:
+            SensorAlert.objects.bulk_create([
+                SensorAlert(
+                    sensor_id=pks[change['sensor_id']],
+                    previous_status=change['previous_status'],
+                    status=change['status'],
+                    value=change['value'],
+                    timestamp=parse_datetime(change['timestamp']),
+                )
+                for change in changes
+            ])
+        except Exception as e:
+            logger.error(f"Error saving sensor alerts: {e}")
+
+    def _publish(self, changes):
+        channel_layer = self.channel_layer or get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(self._send)(channel_layer, changes)
+        except Exception as e:
+            logger.error(f"Error broadcasting sensor alerts: {e}")
+
+    @staticmethod
+    async def _send(channel_layer, changes):
+        await asyncio.gather(*[
+            channel_layer.group_send(ALERT_GROUP, {'type': 'sensor.alert', 'data': change})
+            for change in changes
+        ])
+
+
+def get_active_alarms(redis_client=None):
+    """
+    取得目前處於警告 / 錯誤狀態的感測器
+    :return: [{sensor_id, status, value, since}]，錯誤優先
+    """
+    from .redis_client import get_redis_client
+
+    redis_client = redis_client or get_redis_client()
+    alarms = [json.loads(value) for value in redis_client.hvals(ACTIVE_ALARMS_KEY)]
+    return sorted(alarms, key=lambda a: (a['status'] != 'error', a['since']))
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from ..alerts import ALERT_GROUP, get_active_alarms
+from ..broadcast import sensor_group_name
+from ..redis_client import get_latest_values
+
+
+class SensorConsumer(AsyncWebsocketConsumer):
+    """
+    感測器即時數據推送 (取代輪詢 sensors/realtime/)
+
+    client 送出：
+        {"action": "subscribe", "sensor_ids": ["TEMP_001"], "interval": 1}
+        {"action": "subscribe", "model_urn": "urn:..."}
+        {"action": "unsubscribe", "sensor_ids": ["TEMP_001"]}   # 未指定 sensor_ids 時取消全部
+        {"action": "subscribe_alerts"} / {"action": "unsubscribe_alerts"}
+    server 送出：
+        {"type": "sensor.snapshot", "data": {"TEMP_001": {...}}}  # 訂閱當下的最新數據
+        {"type": "sensor.update", "data": {...}}
+        {"type": "sensor.alarms", "data": [...]}              # 訂閱警報當下處於警告 / 錯誤的感測器
+        {"type": "sensor.alert", "data": {"sensor_id", "previous_status", "status", "value", "timestamp"}}
+    interval 為此連線每個感測器的最短推送間隔 (秒)，間隔內的更新只送出最後一筆
+    """
+    MAX_SUBSCRIPTIONS = 1000
+
+    async def connect(self):
+        self.sensor_ids = set()
+        self.interval = settings.SENSOR_WS_MIN_INTERVAL
+        self.last_sent = {}
+        self.pending = {}
+        self.flush_tasks = {}
+        self.alerts = False
+        # 與 REST 感測器 API 相同需登入 (session 或 ?token=<JWT>)
+        if not self.scope['user'].is_authenticated:
+            await self.close()
+            return
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        for task in self.flush_tasks.values():
+            task.cancel()
+        for sensor_id in self.sensor_ids:
+            await self.channel_layer.group_discard(sensor_group_name(sensor_id), self.channel_name)
+        if self.alerts:
+            await self.channel_layer.group_discard(ALERT_GROUP, self.channel_name)
+
+    # Receive message from WebSocket
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message = json.loads(text_data or '{}')
+        except json.JSONDecodeError:
+            await self.send_error('Invalid JSON')
+            return
+
+        if not isinstance(message, dict):
+            await self.send_error('Invalid message')
+            return
+
+        if message.get('interval') is not None:
+            try:
+                self.interval = max(float(message['interval']), settings.SENSOR_WS_MIN_INTERVAL)
+            except (TypeError, ValueError):
+                await self.send_error('interval must be a number')
+                return
+
+        action = message.get('action')
+        if action == 'subscribe':
+            sensor_ids = [str(sensor_id) for sensor_id in message.get('sensor_ids') or []]
+            if message.get('model_urn'):
+                sensor_ids += await self.get_model_sensor_ids(message['model_urn'])
+            await self.subscribe(sensor_ids)
+        elif action == 'unsubscribe':
+            sensor_ids = message.get('sensor_ids')
+            await self.unsubscribe([str(s) for s in sensor_ids] if sensor_ids else list(self.sensor_ids))
+        elif action == 'subscribe_alerts':
+            await self.channel_layer.group_add(ALERT_GROUP, self.channel_name)
+            self.alerts = True
+            alarms = await sync_to_async(get_active_alarms)()
+            await self.send(text_data=json.dumps({'type': 'sensor.alarms', 'data': alarms}))
+        elif action == 'unsubscribe_alerts':
+            await self.channel_layer.group_discard(ALERT_GROUP, self.channel_name)
+            self.alerts = False
+        else:
+            await self.send_error(f'Unknown action: {action}')
+
+    async def subscribe(self, sensor_ids):
+        new_ids = [sensor_id for sensor_id in dict.fromkeys(sensor_ids) if sensor_id not in self.sensor_ids]
+        if len(self.sensor_ids) + len(new_ids) > self.MAX_SUBSCRIPTIONS:
+            await self.send_error(f'Too many subscriptions (max {self.MAX_SUBSCRIPTIONS})')
+            return
+        for sensor_id in new_ids:
+            await self.channel_layer.group_add(sensor_group_name(sensor_id), self.channel_name)
+            self.sensor_ids.add(sensor_id)
+
+        snapshot = await sync_to_async(get_latest_values)(new_ids) if new_ids else {}
+        await self.send(text_data=json.dumps({'type': 'sensor.snapshot', 'data': snapshot}))
+
+    async def unsubscribe(self, sensor_ids):
+        for sensor_id in sensor_ids:
+            if sensor_id not in self.sensor_ids:
+                continue
+            await self.channel_layer.group_discard(sensor_group_name(sensor_id), self.channel_name)
+            self.sensor_ids.discard(sensor_id)
+            self.pending.pop(sensor_id, None)
+            task = self.flush_tasks.pop(sensor_id, None)
+            if task:
+                task.cancel()
+
+    @database_sync_to_async
+    def get_model_sensor_ids(self, model_urn):
+        from ..models import SensorBimBinding
+
+        return list(SensorBimBinding.objects.filter(
+            model_urn=model_urn,
+            is_active=True,
+            sensor__is_active=True,
+        ).values_list('sensor__sensor_id', flat=True))
+
+    # Receive message from group (SensorBroadcaster)
+    async def sensor_update(self, event):
+        data = event['data']
+        sensor_id = data['sensor_id']
+        if sensor_id not in self.sensor_ids:
+            return
+
+        wait = self.last_sent.get(sensor_id, 0) + self.interval - time.monotonic()
+        if wait <= 0:
+            await self.send_update(data)
+            return
+        # 間隔內的更新只保留最後一筆，時間到再送出
+        self.pending[sensor_id] = data
+        if sensor_id not in self.flush_tasks:
+            self.flush_tasks[sensor_id] = asyncio.create_task(self.send_later(sensor_id, wait))
+
+    # Receive message from group (SensorAlertEngine)
+    async def sensor_alert(self, event):
+        # 狀態轉換不做合併，逐筆送出
+        await self.send(text_data=json.dumps({'type': 'sensor.alert', 'data': event['data']}))
+
+    async def send_later(self, sensor_id, wait):
+        await asyncio.sleep(wait)
+        self.flush_tasks.pop(sensor_id, None)
+        data = self.pending.pop(sensor_id, None)
+        if data is not None:
+            await self.send_update(data)
+
+    async def send_update(self, data):
+        self.last_sent[data['sensor_id']] = time.monotonic()
+        await self.send(text_data=json.dumps({'type': 'sensor.update', 'data': data}))
+
+    async def send_error(self, message):
+        await self.send(text_data=json.dumps({'type': 'error', 'message': message}))
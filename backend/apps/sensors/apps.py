@@ -12,6 +12,7 @@ class SensorsConfig(AppConfig):
     def ready(self):
         """App 準備好時執行"""
         import os
+        import apps.sensors.signals
 
         # 只在主進程中啟動 MQTT Client (避免在 migration 時執行)
         if os.environ.get('RUN_MAIN') == 'true' or os.environ.get('DJANGO_SETTINGS_MODULE'):
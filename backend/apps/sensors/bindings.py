@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.forge.models import BimObject
+from .models import Sensor, SensorBimBinding
+from .overlay import invalidate_overlay
+
+# 批次匯入可寫入的綁定欄位（sensor 為唯一鍵）
+BINDING_FIELDS = [
+    'model_urn', 'element_dbid', 'element_external_id', 'element_name',
+    'position_type', 'position_offset', 'label_visible', 'icon_type',
+    'color', 'priority', 'notes', 'is_active',
+]
+
+POSITION_TYPES = {choice for choice, _ in SensorBimBinding.POSITION_TYPE_CHOICES}
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', ''}
+
+
+def normalize_urn(urn):
+    """Viewer 的 URN 可能帶 urn: 前綴，BimModel.urn 則無"""
+    urn = (urn or '').strip()
+    return urn[4:] if urn.startswith('urn:') else urn
+
+
+def read_binding_csv(file):
+    """
+    讀取綁定 CSV，欄位同 API（sensor 可改用 sensor_id 欄位指定感測器代碼），
+    position_offset 可為 JSON 或以 offset_x / offset_y / offset_z 三欄表示
+    """
+    content = file.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    rows = []
+    for row in csv.DictReader(io.StringIO(content)):
+        row = {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        offsets = {axis: row.pop(f'offset_{axis}', '') for axis in ('x', 'y', 'z')}
+        if any(offsets.values()) and not row.get('position_offset'):
+            row['position_offset'] = {axis: value or 0 for axis, value in offsets.items()}
+        rows.append({key: value for key, value in row.items() if value != ''})
+    return rows
+
+
+def _clean_row(row):
+    """驗證單筆的欄位格式（不查詢資料庫），回傳 (values, errors)"""
+    values = {}
+    errors = {}
+
+    if not row.get('sensor') and not row.get('sensor_id'):
+        errors['sensor'] = ['此欄位為必填']
+
+    model_urn = row.get('model_urn') or ''
+    if not isinstance(model_urn, str):
+        errors['model_urn'] = ['必須是字串']
+        model_urn = ''
+    elif not model_urn.strip():
+        errors['model_urn'] = ['此欄位為必填']
+    values['model_urn'] = model_urn.strip()
+
+    try:
+        values['element_dbid'] = int(row['element_dbid'])
+    except KeyError:
+        errors['element_dbid'] = ['此欄位為必填']
+    except (TypeError, ValueError):
+        errors['element_dbid'] = ['必須是整數']
+
+    for field in ('element_external_id', 'element_name', 'icon_type', 'color', 'notes'):
+        values[field] = str(row.get(field) or '')
+
+    position_type = row.get('position_type') or 'center'
+    if not isinstance(position_type, str) or position_type not in POSITION_TYPES:
+        errors['position_type'] = [f'無效的位置類型 {position_type}']
+    values['position_type'] = position_type
+
+    position_offset = row.get('position_offset')
+    try:
+        if isinstance(position_offset, str):
+            position_offset = json.loads(position_offset)
+        if position_offset is not None:
+            position_offset = {axis: float(position_offset.get(axis) or 0) for axis in ('x', 'y', 'z')}
+    except (AttributeError, TypeError, ValueError):
+        errors['position_offset'] = ['格式應為 {"x": 0, "y": 0, "z": 0}']
+    values['position_offset'] = position_offset
+
+    try:
+        values['priority'] = int(row.get('priority') or 0)
+    except (TypeError, ValueError):
+        errors['priority'] = ['必須是整數']
+
+    for field in ('label_visible', 'is_active'):
+        value = row.get(field, True)
+        if isinstance(value, str):
+            if value.lower() in TRUE_VALUES:
+                value = True
+            elif value.lower() in FALSE_VALUES:
+                value = False
+        if not isinstance(value, bool):
+            errors[field] = ['必須是布林值']
+        values[field] = value
+
+    return values, errors
+
+
+def bulk_upsert_bindings(rows):
+    """
+    批次建立或更新綁定（以 sensor 為唯一鍵）
+    感測器與元件各以一次查詢驗證，全部有效的資料列在同一交易內以 upsert 寫入；
+    有錯誤的資料列不寫入並逐筆回報
+    :return: dict(bindings, created, updated, errors)
+    """
+    cleaned = []
+    errors = []
+    for index, row in enumerate(rows):
+        values, row_errors = _clean_row(row)
+        cleaned.append((index, row, values, row_errors))
+
+    # 感測器：支援主鍵 (sensor) 或代碼 (sensor_id)
+    sensor_pks = set()
+    sensor_codes = set()
+    for _, row, _, _ in cleaned:
+        if row.get('sensor') not in (None, ''):
+            try:
+                sensor_pks.add(int(row['sensor']))
+            except (TypeError, ValueError):
+                pass
+        elif row.get('sensor_id'):
+            sensor_codes.add(str(row['sensor_id']))
+    sensors = Sensor.objects.filter(
+        Q(pk__in=sensor_pks) | Q(sensor_id__in=sensor_codes)
+    ).values_list('pk', 'sensor_id')
+    pks = {pk for pk, _ in sensors}
+    pk_by_code = {code: pk for pk, code in sensors}
+
+    # 元件：(model urn, dbid) 需存在於 BimObject
+    urns = {normalize_urn(values['model_urn']) for _, _, values, _ in cleaned if values['model_urn']}
+    dbids = {values['element_dbid'] for _, _, values, _ in cleaned if 'element_dbid' in values}
+    elements = set(
+        BimObject.objects.filter(
+            bim_model__urn__in=urns,
+            dbid__in=dbids
+        ).values_list('bim_model__urn', 'dbid').distinct()
+    ) if urns and dbids else set()
+
+    valid = {}
+    for index, row, values, row_errors in cleaned:
+        sensor_pk = None
+        if row.get('sensor') not in (None, ''):
+            try:
+                sensor_pk = int(row['sensor'])
+            except (TypeError, ValueError):
+                row_errors['sensor'] = ['必須是整數']
+            else:
+                if sensor_pk not in pks:
+                    row_errors['sensor'] = [f'感測器 {sensor_pk} 不存在']
+        elif row.get('sensor_id'):
+            sensor_pk = pk_by_code.get(str(row['sensor_id']))
+            if sensor_pk is None:
+                row_errors['sensor_id'] = [f"感測器 {row['sensor_id']} 不存在"]
+
+        if values['model_urn'] and 'element_dbid' in values:
+            if (normalize_urn(values['model_urn']), values['element_dbid']) not in elements:
+                row_errors['element_dbid'] = [f"元件 {values['element_dbid']} 不存在於模型中"]
+
+        if sensor_pk is not None and sensor_pk in valid and not row_errors:
+            row_errors['sensor'] = ['同一感測器在此批次中重複綁定']
+
+        if row_errors:
+            errors.append({'index': index, 'data': row, 'errors': row_errors})
+        else:
+            valid[sensor_pk] = values
+
+    existing = dict(
+        SensorBimBinding.objects.filter(sensor_id__in=valid).values_list('sensor_id', 'model_urn')
+    )
+    bindings = [SensorBimBinding(sensor_id=sensor_pk, **values) for sensor_pk, values in valid.items()]
+
+    with transaction.atomic():
+        SensorBimBinding.objects.bulk_create(
+            bindings,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['sensor'],
+            update_fields=BINDING_FIELDS + ['updated_at'],
+        )
+        model_urns = set(existing.values()) | {values['model_urn'] for values in valid.values()}
+        transaction.on_commit(lambda: invalidate_overlay(*model_urns))
+
+    return {
+        'bindings': list(valid),
+        'created': len(valid) - len(existing),
+        'updated': len(existing),
+        'errors': errors,
+    }
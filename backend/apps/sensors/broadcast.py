@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_GROUP_NAME_RE = re.compile(r'^[A-Za-z0-9_.-]{1,80}$')
+
+
+def sensor_group_name(sensor_id):
+    """感測器的 Channels group 名稱，group 名稱只允許英數字、-、_、.，其他字元改用雜湊"""
+    sensor_id = str(sensor_id)
+    if _GROUP_NAME_RE.match(sensor_id):
+        return f'sensor.{sensor_id}'
+    return f'sensor.h{hashlib.md5(sensor_id.encode("utf-8")).hexdigest()}'
+
+
+class SensorBroadcaster:
+    """
+    將感測器即時數據推送到 Channels group
+    同一感測器在一個推送週期內只送出最後一筆，每次更新只需一次 group_send，
+    不論有多少 WebSocket 訂閱
+    """
+
+    def __init__(self, interval=None, channel_layer=None):
+        self.interval = interval if interval is not None else settings.SENSOR_WS_PUBLISH_INTERVAL
+        self.channel_layer = channel_layer
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+        self.published = 0
+
+    def add(self, sensor_data):
+        """放入一筆最新數據，覆蓋同一感測器尚未送出的數據"""
+        with self._lock:
+            self._pending[sensor_data['sensor_id']] = sensor_data
+
+    def flush(self, force=False):
+        """推送週期到了才送出，回傳送出的感測器數量"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending:
+                return 0
+            if not force and now - self._flushed_at < self.interval:
+                return 0
+            pending, self._pending = self._pending, {}
+            self._flushed_at = now
+
+        channel_layer = self.channel_layer or get_channel_layer()
+        if channel_layer is None:
+            return 0
+        try:
+            async_to_sync(self._send)(channel_layer, list(pending.values()))
+        except Exception as e:
+            logger.error(f"Error broadcasting sensor updates: {e}")
+            return 0
+        self.published += len(pending)
+        return len(pending)
+
+    @staticmethod
+    async def _send(channel_layer, updates):
+        await asyncio.gather(*[
+            channel_layer.group_send(sensor_group_name(data['sensor_id']), {
+                'type': 'sensor.update',
+                'data': data,
+            })
+            for data in updates
+        ])
@@ -0,0 +1,323 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from . import timeseries
+from .alerts import SensorAlertEngine
+from .broadcast import SensorBroadcaster
+from .redis_client import LATEST_TTL, latest_key
+from .routing import SensorRoutingTable
+
+logger = logging.getLogger(__name__)
+
+
+class SensorIngestionPipeline:
+    """
+    感測器數據寫入管線
+    MQTT 回調只負責將訊息放入有界佇列，由背景 worker 批次處理：
+    以進程內路由表解析 topic（不查詢資料庫）、Redis pipeline 寫入即時數據、bulk_create 寫入歷史，
+    last_seen 則每個 flush 週期以一次 UPDATE 更新；最新數據合併後推送到 WebSocket 訂閱者，
+    門檻整批判斷後交由 SensorAlertEngine 記錄狀態轉換
+    """
+
+    STATS_KEY_PREFIX = 'sensor:ingest:stats'
+    MAINTENANCE_LOCK_KEY = 'sensor:data:maintenance:lock'
+    # last_seen 每個 UPDATE 的感測器數 (CASE 分支數)
+    LAST_SEEN_CHUNK_SIZE = 500
+
+    def __init__(self, redis_client, routing=None, queue_size=None, workers=None, batch_size=None,
+                 batch_timeout=None, last_seen_interval=None, name='default'):
+        self.redis_client = redis_client
+        self.routing = routing or SensorRoutingTable()
+        self.broadcaster = SensorBroadcaster()
+        self.alerts = SensorAlertEngine(redis_client)
+        self.name = name
+        self.queue = queue.Queue(maxsize=queue_size or settings.SENSOR_INGEST_QUEUE_SIZE)
+        self.worker_count = workers or settings.SENSOR_INGEST_WORKERS
+        self.batch_size = batch_size or settings.SENSOR_INGEST_BATCH_SIZE
+        self.batch_timeout = batch_timeout if batch_timeout is not None else settings.SENSOR_INGEST_BATCH_TIMEOUT
+        self.last_seen_interval = (last_seen_interval if last_seen_interval is not None
+                                   else settings.SENSOR_LAST_SEEN_FLUSH_SECONDS)
+        # 佇列使用率超過此比例時計為背壓事件
+        self.high_watermark = int(self.queue.maxsize * 0.8)
+
+        self._stop_event = threading.Event()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._pending_last_seen = {}
+        self._last_seen_flushed_at = time.monotonic()
+        self._maintenance_at = 0.0
+        self._counters = {
+            'received': 0,
+            'processed': 0,
+            'dropped': 0,
+            'backpressure': 0,
+            'unknown_topic': 0,
+            'invalid': 0,
+            'batches': 0,
+            'errors': 0,
+        }
+        self._last_batch_seconds = 0.0
+
+    # ---- 生命週期 ----
+
+    def start(self):
+        """啟動 worker 執行緒"""
+        if self._workers:
+            return
+        self._stop_event.clear()
+        for i in range(self.worker_count):
+            worker = threading.Thread(target=self._run, name=f'sensor-ingest-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"Sensor ingestion pipeline started with {self.worker_count} workers")
+
+    def stop(self, timeout=5.0):
+        """停止 worker，佇列中剩餘的訊息會先處理完"""
+        if not self._workers:
+            return
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        self._flush_last_seen(force=True)
+        self.broadcaster.flush(force=True)
+        logger.info("Sensor ingestion pipeline stopped")
+
+    # ---- 生產端 ----
+
+    def submit(self, topic, payload, received_at=None):
+        """
+        放入一筆 MQTT 訊息，不會阻塞回調執行緒
+        佇列已滿時丟棄訊息並回傳 False
+        """
+        self._increment('received')
+        item = (topic, payload, received_at or timezone.now())
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            dropped = self._increment('dropped')
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"Sensor ingestion queue is full, {dropped} messages dropped so far")
+            return False
+        if self.queue.qsize() >= self.high_watermark:
+            self._increment('backpressure')
+        return True
+
+    def stats(self):
+        """取得管線計數器與佇列深度"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update({
+            'queue_depth': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'workers': len(self._workers),
+            'last_batch_ms': round(self._last_batch_seconds * 1000, 3),
+            'broadcast': self.broadcaster.published,
+            'alerts': self.alerts.transitions,
+        })
+        return stats
+
+    # ---- 消費端 ----
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self.process_batch(batch)
+                except Exception as e:
+                    self._increment('errors', len(batch))
+                    logger.error(f"Error processing sensor batch: {e}")
+                finally:
+                    close_old_connections()
+            elif self._stop_event.is_set():
+                break
+            self._flush_last_seen()
+            self.broadcaster.flush()
+            self._run_maintenance()
+
+    def _next_batch(self):
+        """取出一批訊息：等待第一筆，之後在 batch_timeout 內盡量湊滿 batch_size"""
+        try:
+            batch = [self.queue.get(timeout=self.batch_timeout or 0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def process_batch(self, batch):
+        """
+        處理一批 (topic, payload, received_at)
+        :return: 成功處理的筆數
+        """
+        from .models import SensorDataLog
+
+        started = time.perf_counter()
+        messages = []
+        for topic, payload, received_at in batch:
+            data = self.parse_payload(payload)
+            if data is None:
+                self._increment('invalid')
+                continue
+            messages.append((topic, data, received_at))
+
+        readings = []
+        for topic, data, received_at in messages:
+            sensor = self.routing.resolve(topic)
+            if sensor is None:
+                self._increment('unknown_topic')
+                logger.debug(f"No active sensor found for topic: {topic}")
+                continue
+            try:
+                value = data.get('value')
+                if value is None:
+                    self._increment('invalid')
+                    logger.warning(f"No 'value' field in data for topic: {topic}")
+                    continue
+                readings.append((sensor, data, received_at, value, float(sensor.transform(value))))
+            except Exception as e:
+                self._increment('invalid')
+                logger.error(f"Error processing sensor data for topic {topic}: {e}")
+
+        # 整批一次判斷門檻
+        statuses, clear_statuses = self.alerts.evaluate(
+            [sensor for sensor, *_ in readings],
+            [value for *_, value in readings]
+        )
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        logs = []
+        alert_readings = []
+        seen = {}
+        for (sensor, data, received_at, raw_value, value), status, clear_status in zip(
+                readings, statuses.tolist(), clear_statuses.tolist()):
+            sensor_data = {
+                'sensor_id': sensor.sensor_id,
+                'value': round(value, sensor.decimal_places),
+                'unit': sensor.unit,
+                'status': status,
+                'timestamp': data.get('timestamp', received_at.isoformat()),
+            }
+            pipe.setex(latest_key(sensor.sensor_id), LATEST_TTL, json.dumps(sensor_data))
+            self.broadcaster.add(sensor_data)
+            alert_readings.append((sensor, value, status, clear_status, received_at))
+
+            if settings.SENSOR_DATA_SAVE_TO_DB:
+                logs.append(SensorDataLog(
+                    sensor_id=sensor.pk,
+                    value=value,
+                    raw_value=raw_value if sensor.has_transform else None,
+                    status=status,
+                    timestamp=received_at,
+                ))
+            seen[sensor.pk] = max(received_at, seen.get(sensor.pk, received_at))
+        handled = len(readings)
+
+        pipe.hset(f"{self.STATS_KEY_PREFIX}:{self.name}", mapping=self.stats())
+        pipe.expire(f"{self.STATS_KEY_PREFIX}:{self.name}", 300)
+        pipe.execute()
+
+        try:
+            self.alerts.process(alert_readings)
+        except Exception as e:
+            logger.error(f"Error processing sensor alerts: {e}")
+
+        if logs:
+            SensorDataLog.objects.bulk_create(logs, batch_size=1000)
+            timeseries.update_rollups(logs)
+
+        with self._lock:
+            for pk, received_at in seen.items():
+                if pk not in self._pending_last_seen or received_at > self._pending_last_seen[pk]:
+                    self._pending_last_seen[pk] = received_at
+            self._counters['processed'] += handled
+            self._counters['batches'] += 1
+        self._last_batch_seconds = time.perf_counter() - started
+        return handled
+
+    @staticmethod
+    def parse_payload(payload):
+        """解析 JSON 或純數字 payload，無法解析時回傳 None"""
+        if isinstance(payload, (bytes, bytearray)):
+            payload = payload.decode('utf-8', errors='replace')
+        if isinstance(payload, dict):
+            return payload
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            # 如果不是 JSON，嘗試解析為數字
+            try:
+                return {'value': float(payload)}
+            except ValueError:
+                logger.warning(f"Unable to parse payload: {payload}")
+                return None
+        if isinstance(data, dict):
+            return data
+        if isinstance(data, (int, float)) and not isinstance(data, bool):
+            return {'value': data}
+        return None
+
+    def _flush_last_seen(self, force=False):
+        """每個 flush 週期以一次 UPDATE (CASE) 更新 last_seen，每個感測器寫入自己最後收到數據的時間"""
+        from .models import Sensor
+
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending_last_seen:
+                return
+            if not force and now - self._last_seen_flushed_at < self.last_seen_interval:
+                return
+            pending, self._pending_last_seen = self._pending_last_seen, {}
+            self._last_seen_flushed_at = now
+        try:
+            pks = list(pending)
+            for i in range(0, len(pks), self.LAST_SEEN_CHUNK_SIZE):
+                chunk = pks[i:i + self.LAST_SEEN_CHUNK_SIZE]
+                Sensor.objects.filter(pk__in=chunk).update(last_seen=Case(
+                    *[When(pk=pk, then=Value(pending[pk])) for pk in chunk],
+                    output_field=DateTimeField()
+                ))
+        except Exception as e:
+            logger.error(f"Error updating sensor last_seen: {e}")
+        finally:
+            close_old_connections()
+
+    def _run_maintenance(self):
+        """
+        定期建立未來分區並刪除過期分區
+        多個進程以 Redis 鎖確保同一週期只執行一次
+        """
+        if not settings.SENSOR_DATA_SAVE_TO_DB:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._maintenance_at < settings.SENSOR_DATA_MAINTENANCE_SECONDS:
+                return
+            self._maintenance_at = now
+        try:
+            if self.redis_client.set(self.MAINTENANCE_LOCK_KEY, self.name, nx=True,
+                                     ex=int(settings.SENSOR_DATA_MAINTENANCE_SECONDS)):
+                timeseries.run_maintenance()
+        except Exception as e:
+            logger.error(f"Error running sensor data maintenance: {e}")
+        finally:
+            close_old_connections()
+
+    def _increment(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+            return self._counters[counter]
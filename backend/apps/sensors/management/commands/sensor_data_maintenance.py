@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.sensors import timeseries
+
+
+class Command(BaseCommand):
+    help = '建立感測器歷史數據的未來分區，並依 SENSOR_DATA_RETENTION_HOURS 刪除過期分區'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-hours', type=int, default=None,
+                            help='保留時數，預設為 SENSOR_DATA_RETENTION_HOURS')
+        parser.add_argument('--days-ahead', type=int, default=None,
+                            help='預先建立的天數，預設為 SENSOR_PARTITION_PREMAKE_DAYS')
+
+    def handle(self, *args, **options):
+        if not timeseries.is_partitioned():
+            self.stdout.write(self.style.WARNING('sensor_data_logs is not partitioned, nothing to do'))
+            return
+
+        created = timeseries.ensure_partitions(options['days_ahead'])
+        dropped = timeseries.drop_expired_partitions(options['retention_hours'])
+
+        for name in created:
+            self.stdout.write(self.style.SUCCESS(f'Created partition: {name}'))
+        for name in dropped:
+            self.stdout.write(self.style.WARNING(f'Dropped partition: {name}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'\nPartitions created: {len(created)}, dropped: {len(dropped)}'
+        ))
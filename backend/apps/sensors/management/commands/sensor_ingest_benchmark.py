@@ -0,0 +1,344 @@
+import json
+import random
+import statistics
+import threading
+import time
+from datetime import datetime
+
+import paho.mqtt.client as mqtt
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.sensors.ingestion import SensorIngestionPipeline
+from apps.sensors.models import Sensor
+from apps.sensors.mqtt_client import MQTTClient
+from apps.sensors.redis_client import get_redis_client, latest_key
+
+
+class FakeMessage:
+    """模擬 paho MQTTMessage，供 in-process 模式直接呼叫 on_message"""
+    __slots__ = ('topic', 'payload')
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = ('感測器寫入管線效能測試：以指定速率、topic 數與 payload 格式發送訊息給 MQTTClient，'
+            '量測端到端延遲百分位、吞吐量、佇列深度與丟棄數')
+
+    SENSOR_PREFIX = 'BENCH_'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['fake', 'broker'], default='fake',
+                            help='fake: 不經 Broker 直接呼叫 on_message；broker: 經由 MQTT Broker (預設 fake)')
+        parser.add_argument('--broker', type=str, default='localhost',
+                            help='broker 模式的 MQTT Broker (預設 localhost)')
+        parser.add_argument('--port', type=int, default=1883,
+                            help='broker 模式的 MQTT Broker port (預設 1883)')
+        parser.add_argument('--rate', type=float, default=1000,
+                            help='每秒發送訊息數，0 為不限速 (預設 1000)')
+        parser.add_argument('--duration', type=float, default=10,
+                            help='發送秒數 (預設 10)')
+        parser.add_argument('--topics', type=int, default=100,
+                            help='感測器 / topic 數量 (預設 100)')
+        parser.add_argument('--topic-prefix', type=str, default='bench/sensors',
+                            help='topic 前綴 (預設 bench/sensors)')
+        parser.add_argument('--payload', choices=['json', 'number'], default='json',
+                            help='payload 格式，number 無法攜帶發送時間，只量測寫入延遲 (預設 json)')
+        parser.add_argument('--payload-bytes', type=int, default=0,
+                            help='json payload 額外填充的位元組數')
+        parser.add_argument('--qos', type=int, choices=[0, 1, 2], default=0,
+                            help='broker 模式的 QoS (預設 0)')
+        parser.add_argument('--queue-size', type=int, default=None, help='預設 SENSOR_INGEST_QUEUE_SIZE')
+        parser.add_argument('--workers', type=int, default=None, help='預設 SENSOR_INGEST_WORKERS')
+        parser.add_argument('--batch-size', type=int, default=None, help='預設 SENSOR_INGEST_BATCH_SIZE')
+        parser.add_argument('--batch-timeout', type=float, default=None, help='預設 SENSOR_INGEST_BATCH_TIMEOUT')
+        parser.add_argument('--save-to-db', action='store_true',
+                            help='寫入歷史數據 (SENSOR_DATA_SAVE_TO_DB)')
+        parser.add_argument('--drain-timeout', type=float, default=30,
+                            help='發送結束後等待佇列清空的秒數 (預設 30)')
+        parser.add_argument('--keep-sensors', action='store_true',
+                            help='結束後保留測試感測器')
+        parser.add_argument('--json', action='store_true',
+                            help='以 JSON 輸出結果，便於比對迴歸')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.sensors = self.create_sensors(options['topics'], options['topic_prefix'])
+        try:
+            with override_settings(SENSOR_DATA_SAVE_TO_DB=options['save_to_db']):
+                result = self.run_benchmark()
+        finally:
+            if not options['keep_sensors']:
+                self.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+        else:
+            self.report(result)
+
+    # ---- 準備 ----
+
+    def create_sensors(self, count, topic_prefix):
+        """建立 (或沿用) 測試感測器"""
+        sensors = [
+            Sensor(
+                sensor_id=f'{self.SENSOR_PREFIX}{i:05d}',
+                name=f'Benchmark {i}',
+                sensor_type='temperature',
+                unit='°C',
+                mqtt_topic=f'{topic_prefix}/{i}',
+                is_active=True,
+            )
+            for i in range(count)
+        ]
+        Sensor.objects.bulk_create(
+            sensors,
+            update_conflicts=True,
+            unique_fields=['sensor_id'],
+            update_fields=['mqtt_topic', 'is_active'],
+        )
+        return [(sensor.sensor_id, sensor.mqtt_topic) for sensor in sensors]
+
+    def cleanup(self):
+        sensors = Sensor.objects.filter(sensor_id__startswith=self.SENSOR_PREFIX)
+        sensor_ids = list(sensors.values_list('sensor_id', flat=True))
+        sensors.delete()
+        if sensor_ids:
+            get_redis_client().delete(*[latest_key(sensor_id) for sensor_id in sensor_ids])
+
+    def build_client(self):
+        options = self.options
+        client = MQTTClient()
+        client.pipeline = SensorIngestionPipeline(
+            client.redis_client,
+            routing=client.routing,
+            queue_size=options['queue_size'],
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            batch_timeout=options['batch_timeout'],
+            name=f'benchmark_{int(time.time())}',
+        )
+
+        # 記錄每批處理完成的時間，延遲在測試結束後才計算，避免影響 worker
+        self.completed = []
+        process_batch = client.pipeline.process_batch
+
+        def measured_process_batch(batch):
+            handled = process_batch(batch)
+            self.completed.append((time.time(), batch))
+            return handled
+
+        client.pipeline.process_batch = measured_process_batch
+        return client
+
+    def make_payload(self, seq):
+        value = round(random.uniform(20.0, 26.0), 2)
+        if self.options['payload'] == 'number':
+            return str(value).encode()
+        data = {
+            'value': value,
+            'timestamp': datetime.now().isoformat(),
+            'seq': seq,
+            'sent_at': time.time(),
+        }
+        if self.options['payload_bytes']:
+            data['padding'] = 'x' * self.options['payload_bytes']
+        return json.dumps(data).encode()
+
+    # ---- 執行 ----
+
+    def run_benchmark(self):
+        options = self.options
+        self.client = client = self.build_client()
+        client.routing.load()
+        publisher = None
+
+        if options['mode'] == 'broker':
+            with override_settings(MQTT_BROKER_HOST=options['broker'], MQTT_BROKER_PORT=options['port']):
+                client.connect()
+            publisher = mqtt.Client(client_id=f'{client.client_id}_publisher')
+            publisher.connect(options['broker'], options['port'], 60)
+            publisher.loop_start()
+            if not self.wait_for(lambda: client.connected and client.subscribed_topics, 10):
+                raise CommandError(f"Unable to subscribe via MQTT Broker {options['broker']}:{options['port']}")
+            # 等待 SUBACK
+            time.sleep(1)
+
+            def publish(topic, payload):
+                publisher.publish(topic, payload, qos=options['qos'])
+        else:
+            client.pipeline.start()
+
+            def publish(topic, payload):
+                client.on_message(None, None, FakeMessage(topic, payload))
+
+        depth_samples = []
+        sampling = threading.Event()
+
+        def sample_queue_depth():
+            while not sampling.wait(0.05):
+                depth_samples.append(client.pipeline.queue.qsize())
+
+        sampler = threading.Thread(target=sample_queue_depth, daemon=True)
+        sampler.start()
+
+        sent = 0
+        rate = options['rate']
+        topics = [topic for _, topic in self.sensors]
+        started = time.time()
+        try:
+            while True:
+                elapsed = time.time() - started
+                if elapsed >= options['duration']:
+                    break
+                # 依目標速率補發落後的訊息
+                target = int(elapsed * rate) + 1 if rate else sent + 100
+                while sent < target:
+                    publish(topics[sent % len(topics)], self.make_payload(sent))
+                    sent += 1
+                if rate:
+                    time.sleep(min(0.005, max(0.0, (sent / rate) - (time.time() - started))))
+            publish_seconds = time.time() - started
+
+            pipeline = client.pipeline
+
+            def drained():
+                stats = pipeline.stats()
+                handled = (stats['processed'] + stats['dropped'] + stats['invalid']
+                           + stats['unknown_topic'] + stats['errors'])
+                return stats['received'] >= sent and handled >= stats['received']
+
+            drained_ok = self.wait_for(drained, options['drain_timeout'])
+            total_seconds = time.time() - started
+        finally:
+            sampling.set()
+            sampler.join()
+            if publisher is not None:
+                publisher.loop_stop()
+                publisher.disconnect()
+            if options['mode'] == 'broker':
+                client.disconnect()
+            else:
+                client.pipeline.stop()
+
+        return self.summarize(sent, publish_seconds, total_seconds, drained_ok, depth_samples)
+
+    @staticmethod
+    def wait_for(condition, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return True
+            time.sleep(0.05)
+        return bool(condition())
+
+    # ---- 結果 ----
+
+    def summarize(self, sent, publish_seconds, total_seconds, drained, depth_samples):
+        stats = self.client.pipeline.stats()
+
+        ingest_latencies = []
+        e2e_latencies = []
+        batch_sizes = []
+        for done, batch in self.completed:
+            batch_sizes.append(len(batch))
+            for _, payload, received_at in batch:
+                ingest_latencies.append(done - received_at.timestamp())
+                if self.options['payload'] == 'json':
+                    try:
+                        e2e_latencies.append(done - json.loads(payload)['sent_at'])
+                    except (ValueError, KeyError, TypeError):
+                        pass
+
+        def latency_summary(values):
+            if not values:
+                return None
+            return {
+                'p50_ms': round(percentile(values, 50) * 1000, 3),
+                'p90_ms': round(percentile(values, 90) * 1000, 3),
+                'p99_ms': round(percentile(values, 99) * 1000, 3),
+                'max_ms': round(max(values) * 1000, 3),
+                'mean_ms': round(statistics.fmean(values) * 1000, 3),
+            }
+
+        return {
+            'config': {
+                key: self.options[key] for key in (
+                    'mode', 'rate', 'duration', 'topics', 'payload', 'payload_bytes', 'qos', 'save_to_db'
+                )
+            } | {
+                'queue_size': self.client.pipeline.queue.maxsize,
+                'workers': self.client.pipeline.worker_count,
+                'batch_size': self.client.pipeline.batch_size,
+                'batch_timeout': self.client.pipeline.batch_timeout,
+            },
+            'sent': sent,
+            'received': stats['received'],
+            'processed': stats['processed'],
+            'dropped': stats['dropped'],
+            'backpressure': stats['backpressure'],
+            'invalid': stats['invalid'],
+            'unknown_topic': stats['unknown_topic'],
+            'errors': stats['errors'],
+            'lost_in_transit': max(0, sent - stats['received']),
+            'drained': drained,
+            'publish_rate': round(sent / publish_seconds, 1) if publish_seconds else None,
+            'throughput': round(stats['processed'] / total_seconds, 1) if total_seconds else None,
+            'batches': stats['batches'],
+            'avg_batch_size': round(statistics.fmean(batch_sizes), 1) if batch_sizes else None,
+            'queue_depth_max': max(depth_samples, default=0),
+            'queue_depth_mean': round(statistics.fmean(depth_samples), 1) if depth_samples else 0,
+            'queue_depth_p99': percentile(depth_samples, 99) or 0,
+            'ingest_latency': latency_summary(ingest_latencies),
+            'e2e_latency': latency_summary(e2e_latencies),
+        }
+
+    def report(self, result):
+        config = result['config']
+        self.stdout.write('=' * 70)
+        self.stdout.write(self.style.NOTICE('Sensor Ingestion Benchmark'))
+        self.stdout.write('=' * 70)
+        self.stdout.write(
+            f"Mode: {config['mode']}  Rate: {config['rate'] or 'unlimited'} msg/s  "
+            f"Duration: {config['duration']}s  Topics: {config['topics']}  Payload: {config['payload']}"
+        )
+        self.stdout.write(
+            f"Queue: {config['queue_size']}  Workers: {config['workers']}  "
+            f"Batch: {config['batch_size']} / {config['batch_timeout']}s  Save to DB: {config['save_to_db']}"
+        )
+        self.stdout.write('-' * 70)
+        self.stdout.write(f"Sent: {result['sent']}  Received: {result['received']}  "
+                          f"Processed: {result['processed']}")
+        self.stdout.write(f"Publish rate: {result['publish_rate']} msg/s  "
+                          f"Throughput: {result['throughput']} msg/s")
+        self.stdout.write(f"Batches: {result['batches']}  Avg batch size: {result['avg_batch_size']}")
+        self.stdout.write(f"Queue depth: max {result['queue_depth_max']}  "
+                          f"mean {result['queue_depth_mean']}  p99 {result['queue_depth_p99']}")
+
+        for name, key in (('Ingest latency', 'ingest_latency'), ('End-to-end latency', 'e2e_latency')):
+            latency = result[key]
+            if latency:
+                self.stdout.write(
+                    f"{name}: p50 {latency['p50_ms']}ms  p90 {latency['p90_ms']}ms  "
+                    f"p99 {latency['p99_ms']}ms  max {latency['max_ms']}ms"
+                )
+
+        problems = {k: result[k] for k in ('dropped', 'lost_in_transit', 'invalid', 'unknown_topic', 'errors')
+                    if result[k]}
+        if problems or not result['drained']:
+            self.stdout.write(self.style.WARNING(
+                f"Dropped / lost: {problems}" + ('' if result['drained'] else '  (queue not drained)')
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('No messages dropped'))
@@ -0,0 +1,140 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# sensor_data_logs 改為依 timestamp 每日分區 (PARTITION BY RANGE)，Django 模型狀態不變；
+# 主鍵需包含分區鍵，資料庫端改為 (id, timestamp)，索引名稱沿用原本的名稱
+PARTITION_SQL = """
+ALTER TABLE sensor_data_logs RENAME TO sensor_data_logs_legacy;
+ALTER TABLE sensor_data_logs_legacy RENAME CONSTRAINT sensor_data_logs_pkey TO sensor_data_logs_legacy_pkey;
+ALTER TABLE sensor_data_logs_legacy
+    RENAME CONSTRAINT sensor_data_logs_sensor_id_6da225bb_fk_sensors_id TO sensor_data_logs_legacy_sensor_fk;
+DROP INDEX sensor_data_sensor__518ab2_idx, sensor_data_status_feb5da_idx,
+    sensor_data_logs_timestamp_daa9426e, sensor_data_logs_sensor_id_6da225bb;
+
+CREATE SEQUENCE sensor_data_logs_partitioned_id_seq;
+CREATE TABLE sensor_data_logs (
+    id bigint NOT NULL DEFAULT nextval('sensor_data_logs_partitioned_id_seq'),
+    value double precision NOT NULL,
+    raw_value double precision NULL,
+    status varchar(20) NOT NULL,
+    "timestamp" timestamp with time zone NOT NULL,
+    sensor_id bigint NOT NULL,
+    CONSTRAINT sensor_data_logs_pkey PRIMARY KEY (id, "timestamp"),
+    CONSTRAINT sensor_data_logs_sensor_id_6da225bb_fk_sensors_id FOREIGN KEY (sensor_id)
+        REFERENCES sensors (id) DEFERRABLE INITIALLY DEFERRED
+) PARTITION BY RANGE ("timestamp");
+CREATE INDEX sensor_data_sensor__518ab2_idx ON sensor_data_logs (sensor_id, "timestamp" DESC);
+CREATE INDEX sensor_data_status_feb5da_idx ON sensor_data_logs (status, "timestamp" DESC);
+CREATE INDEX sensor_data_logs_timestamp_daa9426e ON sensor_data_logs ("timestamp");
+CREATE INDEX sensor_data_logs_sensor_id_6da225bb ON sensor_data_logs (sensor_id);
+CREATE TABLE sensor_data_logs_default PARTITION OF sensor_data_logs DEFAULT;
+
+-- 既有資料所在的日期與未來兩天各建立一個分區
+DO $$
+DECLARE
+    day date;
+BEGIN
+    FOR day IN
+        SELECT DISTINCT ("timestamp" AT TIME ZONE 'UTC')::date FROM sensor_data_logs_legacy
+        UNION
+        SELECT generate_series(0, 2) + (now() AT TIME ZONE 'UTC')::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF sensor_data_logs FOR VALUES FROM (%L) TO (%L)',
+            'sensor_data_logs_p' || to_char(day, 'YYYYMMDD'),
+            day::timestamp AT TIME ZONE 'UTC',
+            (day + 1)::timestamp AT TIME ZONE 'UTC'
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO sensor_data_logs (id, value, raw_value, status, "timestamp", sensor_id)
+SELECT id, value, raw_value, status, "timestamp", sensor_id FROM sensor_data_logs_legacy;
+SELECT setval('sensor_data_logs_partitioned_id_seq', COALESCE((SELECT max(id) FROM sensor_data_logs), 0) + 1, false);
+
+DROP TABLE sensor_data_logs_legacy;
+ALTER SEQUENCE sensor_data_logs_partitioned_id_seq RENAME TO sensor_data_logs_id_seq;
+ALTER SEQUENCE sensor_data_logs_id_seq OWNED BY sensor_data_logs.id;
+"""
+
+UNPARTITION_SQL = """
+ALTER TABLE sensor_data_logs RENAME TO sensor_data_logs_partitioned;
+ALTER TABLE sensor_data_logs_partitioned RENAME CONSTRAINT sensor_data_logs_pkey TO sensor_data_logs_partitioned_pkey;
+ALTER TABLE sensor_data_logs_partitioned
+    RENAME CONSTRAINT sensor_data_logs_sensor_id_6da225bb_fk_sensors_id TO sensor_data_logs_partitioned_sensor_fk;
+DROP INDEX sensor_data_sensor__518ab2_idx, sensor_data_status_feb5da_idx,
+    sensor_data_logs_timestamp_daa9426e, sensor_data_logs_sensor_id_6da225bb;
+ALTER SEQUENCE sensor_data_logs_id_seq RENAME TO sensor_data_logs_partitioned_id_seq;
+
+CREATE TABLE sensor_data_logs (
+    id bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    value double precision NOT NULL,
+    raw_value double precision NULL,
+    status varchar(20) NOT NULL,
+    "timestamp" timestamp with time zone NOT NULL,
+    sensor_id bigint NOT NULL
+);
+INSERT INTO sensor_data_logs (id, value, raw_value, status, "timestamp", sensor_id)
+SELECT id, value, raw_value, status, "timestamp", sensor_id FROM sensor_data_logs_partitioned;
+SELECT setval(pg_get_serial_sequence('sensor_data_logs', 'id'),
+              COALESCE((SELECT max(id) FROM sensor_data_logs), 0) + 1, false);
+CREATE INDEX sensor_data_sensor__518ab2_idx ON sensor_data_logs (sensor_id, "timestamp" DESC);
+CREATE INDEX sensor_data_status_feb5da_idx ON sensor_data_logs (status, "timestamp" DESC);
+CREATE INDEX sensor_data_logs_timestamp_daa9426e ON sensor_data_logs ("timestamp");
+CREATE INDEX sensor_data_logs_sensor_id_6da225bb ON sensor_data_logs (sensor_id);
+ALTER TABLE sensor_data_logs ADD CONSTRAINT sensor_data_logs_sensor_id_6da225bb_fk_sensors_id
+    FOREIGN KEY (sensor_id) REFERENCES sensors (id) DEFERRABLE INITIALLY DEFERRED;
+
+DROP TABLE sensor_data_logs_partitioned;
+"""
+
+
+def backfill_rollups(apps, schema_editor):
+    """以既有歷史資料建立 1 分鐘 / 1 小時 / 1 天彙總"""
+    schema_editor.execute("""
+        INSERT INTO sensor_data_rollups (sensor_id, resolution, bucket, count, sum, min, max)
+        SELECT sensor_id, '1m', date_trunc('minute', "timestamp"), count(*), sum(value), min(value), max(value)
+        FROM sensor_data_logs GROUP BY sensor_id, 3
+        UNION ALL
+        SELECT sensor_id, '1h', date_trunc('hour', "timestamp"), count(*), sum(value), min(value), max(value)
+        FROM sensor_data_logs GROUP BY sensor_id, 3
+        UNION ALL
+        SELECT sensor_id, '1d', date_trunc('day', "timestamp" AT TIME ZONE %s) AT TIME ZONE %s,
+               count(*), sum(value), min(value), max(value)
+        FROM sensor_data_logs GROUP BY sensor_id, 3
+    """, params=[settings.TIME_ZONE, settings.TIME_ZONE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensors', '0004_alter_sensorbimbinding_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorDataRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('1m', '1 分鐘'), ('1h', '1 小時'), ('1d', '1 天')], max_length=2, verbose_name='解析度')),
+                ('bucket', models.DateTimeField(verbose_name='區間起始時間')),
+                ('count', models.IntegerField(default=0, verbose_name='筆數')),
+                ('sum', models.FloatField(default=0, verbose_name='總和')),
+                ('min', models.FloatField(verbose_name='最小值')),
+                ('max', models.FloatField(verbose_name='最大值')),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='data_rollups', to='sensors.sensor', verbose_name='感測器')),
+            ],
+            options={
+                'verbose_name': '感測器數據彙總',
+                'verbose_name_plural': '感測器數據彙總',
+                'db_table': 'sensor_data_rollups',
+                'ordering': ['bucket'],
+                'constraints': [models.UniqueConstraint(fields=('sensor', 'resolution', 'bucket'), name='sensor_data_rollup_unique')],
+            },
+        ),
+        migrations.RunSQL(PARTITION_SQL, reverse_sql=UNPARTITION_SQL),
+        migrations.RunPython(backfill_rollups, reverse_code=migrations.RunPython.noop),
+    ]
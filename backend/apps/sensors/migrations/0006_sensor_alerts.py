@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensors', '0005_sensor_data_timeseries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_status', models.CharField(choices=[('normal', '正常'), ('warning', '警告'), ('error', '錯誤')], max_length=20, verbose_name='原狀態')),
+                ('status', models.CharField(choices=[('normal', '正常'), ('warning', '警告'), ('error', '錯誤')], max_length=20, verbose_name='狀態')),
+                ('value', models.FloatField(blank=True, null=True, verbose_name='數值')),
+                ('timestamp', models.DateTimeField(verbose_name='時間戳')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='建立時間')),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='sensors.sensor', verbose_name='感測器')),
+            ],
+            options={
+                'verbose_name': '感測器警報紀錄',
+                'verbose_name_plural': '感測器警報紀錄',
+                'db_table': 'sensor_alerts',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['sensor', '-timestamp'], name='sensor_aler_sensor__163cbe_idx'), models.Index(fields=['status', '-timestamp'], name='sensor_aler_status_00e9e6_idx')],
+            },
+        ),
+    ]
@@ -181,3 +181,69 @@ class SensorDataLog(models.Model):
 
     def __str__(self):
         return f"{self.sensor.sensor_id} - {self.value} at {self.timestamp}"
+
+
+class SensorDataRollup(models.Model):
+    """感測器數據彙總 (1 分鐘 / 1 小時 / 1 天)，寫入歷史時同步累加"""
+
+    RESOLUTION_CHOICES = [
+        ('1m', '1 分鐘'),
+        ('1h', '1 小時'),
+        ('1d', '1 天'),
+    ]
+
+    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE,
+                               related_name='data_rollups', verbose_name='感測器')
+    resolution = models.CharField(max_length=2, choices=RESOLUTION_CHOICES, verbose_name='解析度')
+    bucket = models.DateTimeField(verbose_name='區間起始時間')
+    count = models.IntegerField(default=0, verbose_name='筆數')
+    sum = models.FloatField(default=0, verbose_name='總和')
+    min = models.FloatField(verbose_name='最小值')
+    max = models.FloatField(verbose_name='最大值')
+
+    class Meta:
+        db_table = 'sensor_data_rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['sensor', 'resolution', 'bucket'], name='sensor_data_rollup_unique'),
+        ]
+        ordering = ['bucket']
+        verbose_name = '感測器數據彙總'
+        verbose_name_plural = '感測器數據彙總'
+
+    def __str__(self):
+        return f"{self.sensor.sensor_id} [{self.resolution}] {self.bucket}"
+
+    @property
+    def avg(self):
+        return self.sum / self.count if self.count else None
+
+
+class SensorAlert(models.Model):
+    """感測器狀態轉換紀錄（經防抖與遲滯判斷後，只記錄狀態改變）"""
+
+    STATUS_CHOICES = [
+        ('normal', '正常'),
+        ('warning', '警告'),
+        ('error', '錯誤'),
+    ]
+
+    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE,
+                               related_name='alerts', verbose_name='感測器')
+    previous_status = models.CharField(max_length=20, choices=STATUS_CHOICES, verbose_name='原狀態')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, verbose_name='狀態')
+    value = models.FloatField(null=True, blank=True, verbose_name='數值')
+    timestamp = models.DateTimeField(verbose_name='時間戳')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='建立時間')
+
+    class Meta:
+        db_table = 'sensor_alerts'
+        indexes = [
+            models.Index(fields=['sensor', '-timestamp']),
+            models.Index(fields=['status', '-timestamp']),
+        ]
+        ordering = ['-timestamp']
+        verbose_name = '感測器警報紀錄'
+        verbose_name_plural = '感測器警報紀錄'
+
+    def __str__(self):
+        return f"{self.sensor.sensor_id} {self.previous_status} → {self.status} at {self.timestamp}"
@@ -4,7 +4,9 @@ import logging
 from datetime import datetime
 from django.conf import settings
 from django.utils import timezone
-import redis
+from .ingestion import SensorIngestionPipeline
+from .redis_client import get_redis_client
+from .routing import ROUTING_INVALIDATE_CHANNEL, SensorRoutingTable
 
 logger = logging.getLogger(__name__)
 
@@ -14,20 +16,20 @@ class MQTTClient:
 
     def __init__(self):
         self.client = None
-        self.redis_client = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB,
-            decode_responses=True
-        )
+        self.redis_client = get_redis_client()
         self.connected = False
+        self.client_id = f"{settings.MQTT_CLIENT_ID_PREFIX}_backend_{datetime.now().timestamp()}"
+        # topic → 感測器設定，連線時載入，Sensor 異動時經 Redis pub/sub 通知重新載入
+        self.routing = SensorRoutingTable()
+        self.subscribed_topics = {}
+        self.invalidation_thread = None
+        # 訊息由背景 worker 批次寫入 Redis / 資料庫，回調只負責放入佇列
+        self.pipeline = SensorIngestionPipeline(self.redis_client, routing=self.routing, name=self.client_id)
 
     def connect(self):
         """連線到 MQTT Broker"""
         try:
-            self.client = mqtt.Client(
-                client_id=f"{settings.MQTT_CLIENT_ID_PREFIX}_backend_{datetime.now().timestamp()}"
-            )
+            self.client = mqtt.Client(client_id=self.client_id)
 
             # 設定回調函數
             self.client.on_connect = self.on_connect
@@ -49,6 +51,9 @@ class MQTTClient:
             )
 
             # 開始非阻塞式循環
+            self.routing.load()
+            self.start_invalidation_listener()
+            self.pipeline.start()
             self.client.loop_start()
 
             logger.info(f"Connecting to MQTT Broker at {settings.MQTT_BROKER_HOST}:{settings.MQTT_BROKER_PORT}")
@@ -62,6 +67,8 @@ class MQTTClient:
         if self.client:
             self.client.loop_stop()
             self.client.disconnect()
+            self.stop_invalidation_listener()
+            self.pipeline.stop()
             self.connected = False
             logger.info("Disconnected from MQTT Broker")
 
@@ -85,103 +92,63 @@ class MQTTClient:
             logger.info("Disconnected from MQTT Broker")
 
     def on_message(self, client, userdata, msg):
-        """接收到訊息的回調"""
-        try:
-            # 解析訊息
-            topic = msg.topic
-            payload = msg.payload.decode('utf-8')
-
-            logger.debug(f"Received message on topic '{topic}': {payload}")
-
-            # 解析 JSON 數據
-            try:
-                data = json.loads(payload)
-            except json.JSONDecodeError:
-                # 如果不是 JSON，嘗試解析為數字
-                try:
-                    data = {'value': float(payload)}
-                except ValueError:
-                    logger.warning(f"Unable to parse payload: {payload}")
-                    return
-
-            # 處理數據
-            self.process_sensor_data(topic, data)
-
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
+        """接收到訊息的回調，只放入寫入佇列，解析與寫入由 worker 處理"""
+        logger.debug(f"Received message on topic '{msg.topic}'")
+        self.pipeline.submit(msg.topic, msg.payload)
 
     def process_sensor_data(self, topic, data):
-        """處理感測器數據"""
-        from .models import Sensor
-
+        """同步處理單筆感測器數據"""
         try:
-            # 查找對應的感測器
-            sensor = Sensor.objects.get(mqtt_topic=topic, is_active=True)
-
-            # 提取數值
-            value = data.get('value')
-            if value is None:
-                logger.warning(f"No 'value' field in data for topic: {topic}")
-                return
-
-            # 數據轉換
-            if sensor.data_transform:
-                scale = sensor.data_transform.get('scale', 1.0)
-                offset = sensor.data_transform.get('offset', 0.0)
-                value = value * scale + offset
-
-            # 判斷狀態
-            status = sensor.get_status(value)
-
-            # 更新 Redis (即時數據)
-            sensor_data = {
-                'sensor_id': sensor.sensor_id,
-                'value': round(value, sensor.decimal_places),
-                'unit': sensor.unit,
-                'status': status,
-                'timestamp': data.get('timestamp', timezone.now().isoformat()),
-            }
-
-            redis_key = f"sensor:{sensor.sensor_id}:latest"
-            self.redis_client.setex(
-                redis_key,
-                3600,  # 1小時過期
-                json.dumps(sensor_data)
-            )
-
-            # 更新最後連線時間
-            sensor.last_seen = timezone.now()
-            sensor.save(update_fields=['last_seen'])
-
-            # (可選) 寫入資料庫歷史
-            if settings.SENSOR_DATA_SAVE_TO_DB:
-                from .models import SensorDataLog
-                SensorDataLog.objects.create(
-                    sensor=sensor,
-                    value=value,
-                    status=status,
-                    timestamp=timezone.now()
-                )
-
-            logger.debug(f"Processed data for sensor {sensor.sensor_id}: {value} {sensor.unit}")
-
-        except Sensor.DoesNotExist:
-            logger.warning(f"No active sensor found for topic: {topic}")
+            self.pipeline.process_batch([(topic, data, timezone.now())])
         except Exception as e:
             logger.error(f"Error processing sensor data: {e}")
 
+    def get_ingest_stats(self):
+        """取得寫入管線的佇列深度、背壓與丟棄計數"""
+        return self.pipeline.stats()
+
     def subscribe_all_sensors(self):
-        """訂閱所有啟用的感測器 topics"""
-        from .models import Sensor
+        """訂閱路由表中所有啟用的感測器 topics"""
+        self.subscribed_topics = {}
+        self.sync_subscriptions()
+
+    def sync_subscriptions(self):
+        """依路由表訂閱新增的 topics、取消已移除的 topics"""
+        if not self.client or not self.connected:
+            return
+        topics = self.routing.subscriptions()
 
-        sensors = Sensor.objects.filter(is_active=True).exclude(mqtt_topic='')
+        for topic in set(self.subscribed_topics) - set(topics):
+            try:
+                self.client.unsubscribe(topic)
+                logger.info(f"Unsubscribed from topic: {topic}")
+            except Exception as e:
+                logger.error(f"Failed to unsubscribe from topic {topic}: {e}")
 
-        for sensor in sensors:
+        for topic, qos in topics.items():
+            if self.subscribed_topics.get(topic) == qos:
+                continue
             try:
-                self.client.subscribe(sensor.mqtt_topic, qos=sensor.mqtt_qos)
-                logger.info(f"Subscribed to topic: {sensor.mqtt_topic}")
+                self.client.subscribe(topic, qos=qos)
+                logger.info(f"Subscribed to topic: {topic}")
             except Exception as e:
-                logger.error(f"Failed to subscribe to topic {sensor.mqtt_topic}: {e}")
+                logger.error(f"Failed to subscribe to topic {topic}: {e}")
+        self.subscribed_topics = topics
+
+    def start_invalidation_listener(self):
+        """監聽 Sensor 異動通知，重新載入路由表並同步訂閱"""
+        if self.invalidation_thread is not None:
+            return
+        pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{
+            ROUTING_INVALIDATE_CHANNEL: lambda message: self.routing.invalidate(on_reload=self.sync_subscriptions)
+        })
+        self.invalidation_thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def stop_invalidation_listener(self):
+        if self.invalidation_thread is not None:
+            self.invalidation_thread.stop()
+            self.invalidation_thread = None
 
     def publish(self, topic, payload, qos=1):
         """發布訊息 (用於控制感測器)"""
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+
+from .models import SensorBimBinding
+from .redis_client import get_latest_values, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+OVERLAY_KEY_PREFIX = 'sensor:overlay'
+# 綁定異動時會主動清除，TTL 僅作為保險
+OVERLAY_TTL = 86400
+
+
+def overlay_key(model_urn):
+    """模型疊加層設定的 Redis key"""
+    digest = hashlib.md5(model_urn.encode('utf-8')).hexdigest()
+    return f"{OVERLAY_KEY_PREFIX}:{digest}"
+
+
+def _load_bindings(model_urn):
+    """以一次查詢取得模型上所有啟用綁定的顯示設定"""
+    rows = SensorBimBinding.objects.filter(
+        model_urn=model_urn,
+        is_active=True
+    ).order_by('-priority', 'element_dbid').values_list(
+        'element_dbid',
+        'sensor__sensor_id',
+        'sensor__name',
+        'position_type',
+        'position_offset',
+        'sensor__unit',
+    )
+    return [
+        {
+            'dbid': dbid,
+            'sensor_id': sensor_id,
+            'name': name,
+            'position': {'type': position_type, 'offset': position_offset},
+            'unit': unit,
+        }
+        for dbid, sensor_id, name, position_type, position_offset, unit in rows
+    ]
+
+
+def get_overlay_bindings(model_urn, redis_client=None):
+    """
+    取得模型的綁定設定（Redis 快取，綁定或感測器異動時清除）
+    :return: (version, bindings)
+    """
+    redis_client = redis_client or get_redis_client()
+    key = overlay_key(model_urn)
+
+    try:
+        cached = redis_client.get(key)
+        if cached:
+            cached = json.loads(cached)
+            return cached['version'], cached['bindings']
+    except Exception as e:
+        logger.warning(f"Failed to read sensor overlay cache: {e}")
+
+    bindings = _load_bindings(model_urn)
+    payload = json.dumps(bindings, ensure_ascii=False, sort_keys=True)
+    version = hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+    try:
+        redis_client.setex(key, OVERLAY_TTL, json.dumps({'version': version, 'bindings': bindings}))
+    except Exception as e:
+        logger.warning(f"Failed to write sensor overlay cache: {e}")
+
+    return version, bindings
+
+
+def build_overlay(model_urn, redis_client=None):
+    """
+    組合模型疊加層：綁定設定 + 一次 MGET 的即時數據
+    :return: (etag, items)
+    """
+    redis_client = redis_client or get_redis_client()
+    version, bindings = get_overlay_bindings(model_urn, redis_client)
+    latest_values = get_latest_values([b['sensor_id'] for b in bindings], redis_client)
+
+    items = []
+    digest = hashlib.md5(version.encode('utf-8'))
+    for binding in bindings:
+        data = latest_values.get(binding['sensor_id']) or {}
+        value = data.get('value')
+        status = data.get('status', 'offline')
+        timestamp = data.get('timestamp')
+        items.append({
+            **binding,
+            'value': value,
+            'status': status,
+            'timestamp': timestamp,
+        })
+        digest.update(f"|{binding['sensor_id']}:{timestamp}:{value}:{status}".encode('utf-8'))
+
+    return digest.hexdigest(), items
+
+
+def invalidate_overlay(*model_urns):
+    """清除模型疊加層快取"""
+    keys = [overlay_key(urn) for urn in set(model_urns) if urn]
+    if not keys:
+        return
+    try:
+        get_redis_client().delete(*keys)
+    except Exception as e:
+        logger.error(f"Failed to invalidate sensor overlay cache: {e}")
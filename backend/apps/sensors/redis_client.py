@@ -0,0 +1,50 @@
+import json
+import threading
+
+import redis
+from django.conf import settings
+
+# 即時數據保存秒數
+LATEST_TTL = 3600
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client():
+    """取得感測器模組共用的 Redis client (同一進程共用連線池)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                pool = redis.ConnectionPool(
+                    host=settings.REDIS_HOST,
+                    port=settings.REDIS_PORT,
+                    db=settings.REDIS_DB,
+                    password=settings.REDIS_PASSWORD or None,
+                    decode_responses=True,
+                    max_connections=settings.SENSOR_REDIS_MAX_CONNECTIONS,
+                )
+                _client = redis.Redis(connection_pool=pool)
+    return _client
+
+
+def latest_key(sensor_id):
+    """感測器最新數據的 Redis key"""
+    return f"sensor:{sensor_id}:latest"
+
+
+def get_latest_values(sensor_ids, redis_client=None):
+    """
+    以一次 MGET 取得多個感測器的最新數據
+    :return: {sensor_id: dict 或 None}
+    """
+    sensor_ids = list(dict.fromkeys(sensor_ids))
+    if not sensor_ids:
+        return {}
+    redis_client = redis_client or get_redis_client()
+    values = redis_client.mget([latest_key(sensor_id) for sensor_id in sensor_ids])
+    return {
+        sensor_id: json.loads(value) if value else None
+        for sensor_id, value in zip(sensor_ids, values)
+    }
@@ -0,0 +1,158 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from paho.mqtt.client import topic_matches_sub
+
+logger = logging.getLogger(__name__)
+
+# Sensor 異動時發布的 Redis pub/sub 頻道，各進程收到後重新載入路由表
+ROUTING_INVALIDATE_CHANNEL = 'sensor:routing:invalidate'
+
+
+@dataclass(frozen=True)
+class SensorConfig:
+    """處理 MQTT 訊息所需的感測器設定（不可變快照）"""
+    pk: int
+    sensor_id: str
+    mqtt_topic: str
+    mqtt_qos: int
+    unit: str
+    decimal_places: int
+    scale: float
+    offset: float
+    has_transform: bool
+    warning_threshold_min: Optional[float]
+    warning_threshold_max: Optional[float]
+    error_threshold_min: Optional[float]
+    error_threshold_max: Optional[float]
+
+    @classmethod
+    def from_sensor(cls, sensor):
+        transform = sensor.data_transform or {}
+        return cls(
+            pk=sensor.pk,
+            sensor_id=sensor.sensor_id,
+            mqtt_topic=sensor.mqtt_topic,
+            mqtt_qos=sensor.mqtt_qos,
+            unit=sensor.unit,
+            decimal_places=sensor.decimal_places,
+            scale=transform.get('scale', 1.0),
+            offset=transform.get('offset', 0.0),
+            has_transform=bool(sensor.data_transform),
+            warning_threshold_min=sensor.warning_threshold_min,
+            warning_threshold_max=sensor.warning_threshold_max,
+            error_threshold_min=sensor.error_threshold_min,
+            error_threshold_max=sensor.error_threshold_max,
+        )
+
+    def transform(self, value):
+        """數據轉換"""
+        if not self.has_transform:
+            return value
+        return value * self.scale + self.offset
+
+    def get_status(self, value):
+        """根據數值判斷狀態（與 Sensor.get_status 相同）"""
+        if value is None:
+            return 'unknown'
+
+        if self.error_threshold_min is not None and value < self.error_threshold_min:
+            return 'error'
+        if self.error_threshold_max is not None and value > self.error_threshold_max:
+            return 'error'
+        if self.warning_threshold_min is not None and value < self.warning_threshold_min:
+            return 'warning'
+        if self.warning_threshold_max is not None and value > self.warning_threshold_max:
+            return 'warning'
+
+        return 'normal'
+
+
+class SensorRoutingTable:
+    """
+    進程內的 topic → 感測器設定路由表
+    精確 topic 以 dict 查找，含 MQTT 萬用字元 (+ / #) 的 topic 依序比對，比對結果會快取；
+    重新載入時整表替換，查詢端不需加鎖
+    """
+
+    def __init__(self, reload_delay=0.5):
+        self.reload_delay = reload_delay
+        self._exact = {}
+        self._wildcards = []
+        self._resolved = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        """從資料庫載入所有啟用且有 topic 的感測器"""
+        from .models import Sensor
+
+        exact = {}
+        wildcards = []
+        sensors = Sensor.objects.filter(is_active=True).exclude(mqtt_topic='').order_by('sensor_id')
+        for sensor in sensors:
+            config = SensorConfig.from_sensor(sensor)
+            if '+' in config.mqtt_topic or '#' in config.mqtt_topic:
+                wildcards.append(config)
+            else:
+                # 同一 topic 有多個感測器時取 sensor_id 最小者
+                exact.setdefault(config.mqtt_topic, config)
+
+        self._exact, self._wildcards, self._resolved = exact, wildcards, {}
+        self._loaded = True
+        logger.info(f"Sensor routing table loaded: {len(exact)} topics, {len(wildcards)} wildcard topics")
+        return self
+
+    def resolve(self, topic) -> Optional[SensorConfig]:
+        """取得 topic 對應的感測器設定，不查詢資料庫"""
+        if not self._loaded:
+            self.load()
+        config = self._exact.get(topic)
+        if config is not None:
+            return config
+        resolved = self._resolved
+        if topic in resolved:
+            return resolved[topic]
+        config = next((c for c in self._wildcards if topic_matches_sub(c.mqtt_topic, topic)), None)
+        resolved[topic] = config
+        return config
+
+    def subscriptions(self):
+        """取得需要訂閱的 {topic: qos}"""
+        topics = {}
+        for config in list(self._exact.values()) + self._wildcards:
+            topics[config.mqtt_topic] = max(config.mqtt_qos, topics.get(config.mqtt_topic, 0))
+        return topics
+
+    def invalidate(self, on_reload=None):
+        """
+        標記路由表需要重新載入
+        短時間內的多次異動（例如批次匯入）合併為一次載入
+        """
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.reload_delay, self._reload, args=(on_reload,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _reload(self, on_reload):
+        from django.db import close_old_connections
+
+        with self._lock:
+            self._timer = None
+        try:
+            self.load()
+            if on_reload:
+                on_reload()
+        except Exception as e:
+            logger.error(f"Failed to reload sensor routing table: {e}")
+        finally:
+            close_old_connections()
@@ -1,8 +1,31 @@
 from rest_framework import serializers
-from .models import Sensor, SensorBimBinding, SensorDataLog
-import redis
-import json
-from django.conf import settings
+from .models import Sensor, SensorBimBinding, SensorDataLog, SensorDataRollup, SensorAlert
+from .timeseries import get_rollup_status
+from .redis_client import get_latest_values
+
+
+class LatestValueListSerializer(serializers.ListSerializer):
+    """
+    列表序列化時以一次 MGET 預先取得整頁感測器的最新數據，放在 context['latest_values']
+    巢狀的 SensorSerializer 共用同一個 context
+    """
+
+    def get_sensor_id(self, obj):
+        return obj.sensor_id
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        try:
+            self.context['latest_values'] = get_latest_values([self.get_sensor_id(item) for item in items])
+        except Exception:
+            self.context['latest_values'] = {}
+        return super().to_representation(items)
+
+
+class BindingLatestValueListSerializer(LatestValueListSerializer):
+
+    def get_sensor_id(self, obj):
+        return obj.sensor.sensor_id
 
 
 class SensorSerializer(serializers.ModelSerializer):
@@ -13,6 +36,7 @@ class SensorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sensor
         fields = '__all__'
+        list_serializer_class = LatestValueListSerializer
 
     def get_bim_bindings_count(self, obj):
         """取得綁定數量（OneToOneField 只會是 0 或 1）"""
@@ -24,22 +48,12 @@ class SensorSerializer(serializers.ModelSerializer):
             return 0
 
     def get_latest_value(self, obj):
-        """從 Redis 取得最新數據"""
+        """從 Redis 取得最新數據，列表時使用預先取得的結果"""
+        latest_values = self.context.get('latest_values')
+        if latest_values is not None and obj.sensor_id in latest_values:
+            return latest_values[obj.sensor_id]
         try:
-            redis_client = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True
-            )
-
-            redis_key = f"sensor:{obj.sensor_id}:latest"
-            data = redis_client.get(redis_key)
-
-            if data:
-                return json.loads(data)
-            return None
-
+            return get_latest_values([obj.sensor_id])[obj.sensor_id]
         except Exception:
             return None
 
@@ -50,6 +64,7 @@ class SensorBimBindingSerializer(serializers.ModelSerializer):
     class Meta:
         model = SensorBimBinding
         fields = '__all__'
+        list_serializer_class = BindingLatestValueListSerializer
 
 
 class SensorDataLogSerializer(serializers.ModelSerializer):
@@ -58,3 +73,29 @@ class SensorDataLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = SensorDataLog
         fields = '__all__'
+
+
+class SensorAlertSerializer(serializers.ModelSerializer):
+    sensor_code = serializers.CharField(source='sensor.sensor_id', read_only=True)
+
+    class Meta:
+        model = SensorAlert
+        fields = '__all__'
+
+
+class SensorDataRollupSerializer(serializers.ModelSerializer):
+    """彙總資料，value 為平均值；感測器由 context['sensor'] 提供，避免逐筆查詢"""
+    timestamp = serializers.DateTimeField(source='bucket', read_only=True)
+    value = serializers.SerializerMethodField()
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SensorDataRollup
+        fields = ['sensor', 'resolution', 'timestamp', 'value', 'min', 'max', 'count', 'status']
+
+    def get_value(self, obj):
+        sensor = self.context['sensor']
+        return round(obj.avg, sensor.decimal_places) if obj.count else None
+
+    def get_status(self, obj):
+        return get_rollup_status(self.context['sensor'], obj.min, obj.max)
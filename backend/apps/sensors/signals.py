@@ -0,0 +1,59 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Sensor, SensorBimBinding
+from .overlay import invalidate_overlay
+from .redis_client import get_redis_client
+from .routing import ROUTING_INVALIDATE_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+def publish_routing_invalidation(sensor_id):
+    """通知所有 MQTT Client 進程重新載入 topic 路由表"""
+    try:
+        get_redis_client().publish(ROUTING_INVALIDATE_CHANNEL, sensor_id)
+    except Exception as e:
+        logger.error(f"Failed to publish sensor routing invalidation: {e}")
+
+
+@receiver(post_save, sender=Sensor)
+def sensor_saved(sender, instance, update_fields=None, **kwargs):
+    # 只更新 last_seen 不影響路由
+    if update_fields and set(update_fields) <= {'last_seen'}:
+        return
+    transaction.on_commit(lambda: publish_routing_invalidation(instance.sensor_id))
+
+    # 感測器名稱、單位等顯示於模型疊加層
+    model_urns = list(SensorBimBinding.objects.filter(sensor=instance).values_list('model_urn', flat=True))
+    if model_urns:
+        transaction.on_commit(lambda: invalidate_overlay(*model_urns))
+
+
+@receiver(post_delete, sender=Sensor)
+def sensor_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publish_routing_invalidation(instance.sensor_id))
+
+
+@receiver(pre_save, sender=SensorBimBinding)
+def binding_pre_save(sender, instance, **kwargs):
+    # 記錄原本的 model_urn，改綁到其他模型時兩邊的疊加層都要清除
+    instance._previous_model_urn = None
+    if instance.pk:
+        instance._previous_model_urn = SensorBimBinding.objects.filter(
+            pk=instance.pk
+        ).values_list('model_urn', flat=True).first()
+
+
+@receiver(post_save, sender=SensorBimBinding)
+def binding_saved(sender, instance, **kwargs):
+    model_urns = (instance.model_urn, getattr(instance, '_previous_model_urn', None))
+    transaction.on_commit(lambda: invalidate_overlay(*model_urns))
+
+
+@receiver(post_delete, sender=SensorBimBinding)
+def binding_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_overlay(instance.model_urn))
@@ -0,0 +1,309 @@
+"""
+感測器時間序列儲存
+- sensor_data_logs 依 timestamp 每日分區 (UTC)，保留期限由 SENSOR_DATA_RETENTION_HOURS 決定，過期時整個分區刪除
+- sensor_data_rollups 保存 1 分鐘 / 1 小時 / 1 天的 count / sum / min / max，寫入歷史時同步累加
+- downsample 將任意長度的時間範圍縮減為固定點數，供圖表使用
+"""
+import logging
+import numpy as np
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LOG_TABLE = 'sensor_data_logs'
+DEFAULT_PARTITION = 'sensor_data_logs_default'
+PARTITION_PREFIX = 'sensor_data_logs_p'
+
+# 由細到粗
+RESOLUTIONS = {
+    '1m': timedelta(minutes=1),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+
+STATUS_RANK = {'unknown': 0, 'normal': 1, 'warning': 2, 'error': 3}
+
+
+def bucket_start(timestamp, resolution):
+    """取得 timestamp 所在彙總區間的起始時間，1 天以 TIME_ZONE 的午夜為界"""
+    if resolution == '1m':
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == '1h':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    local = timezone.localtime(timestamp)
+    return timezone.make_aware(datetime.combine(local.date(), dt_time.min))
+
+
+def update_rollups(logs):
+    """
+    將一批歷史數據累加到各解析度的彙總
+    :param logs: 可迭代的 SensorDataLog (只使用 sensor_id, timestamp, value)
+    """
+    aggregates = {}
+    for log in logs:
+        for resolution in RESOLUTIONS:
+            key = (log.sensor_id, resolution, bucket_start(log.timestamp, resolution))
+            aggregate = aggregates.get(key)
+            if aggregate is None:
+                aggregates[key] = [1, log.value, log.value, log.value]
+            else:
+                aggregate[0] += 1
+                aggregate[1] += log.value
+                aggregate[2] = min(aggregate[2], log.value)
+                aggregate[3] = max(aggregate[3], log.value)
+    if not aggregates:
+        return 0
+
+    # 依鍵排序，避免多個 worker 同時累加時互相鎖死
+    rows = [(*key, *aggregate) for key, aggregate in sorted(aggregates.items())]
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), 1000):
+            chunk = rows[i:i + 1000]
+            placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(chunk))
+            cursor.execute(f"""
+                INSERT INTO sensor_data_rollups (sensor_id, resolution, bucket, count, sum, min, max)
+                VALUES {placeholders}
+                ON CONFLICT (sensor_id, resolution, bucket) DO UPDATE SET
+                    count = sensor_data_rollups.count + EXCLUDED.count,
+                    sum = sensor_data_rollups.sum + EXCLUDED.sum,
+                    min = LEAST(sensor_data_rollups.min, EXCLUDED.min),
+                    max = GREATEST(sensor_data_rollups.max, EXCLUDED.max)
+            """, [value for row in chunk for value in row])
+    return len(rows)
+
+
+# ---- 分區管理 ----
+
+def is_partitioned():
+    """sensor_data_logs 是否為分區表"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = %s
+        """, [LOG_TABLE])
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """取得每日分區 {日期: 分區名稱}"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = %s
+        """, [LOG_TABLE])
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        if name.startswith(PARTITION_PREFIX):
+            try:
+                partitions[datetime.strptime(name[len(PARTITION_PREFIX):], '%Y%m%d').date()] = name
+            except ValueError:
+                continue
+    return partitions
+
+
+def create_partition(day):
+    """
+    建立 day (UTC) 的分區
+    已落入預設分區的同日資料會先搬移，再掛載為分區
+    """
+    name = f"{PARTITION_PREFIX}{day:%Y%m%d}"
+    start = datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+    end = start + timedelta(days=1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE {LOG_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *
+            )
+            INSERT INTO "{name}" SELECT * FROM moved
+        """, [start, end])
+        cursor.execute(f'ALTER TABLE {LOG_TABLE} ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+                       [start, end])
+    return name
+
+
+def ensure_partitions(days_ahead=None):
+    """確保今天 (UTC) 起 days_ahead 天內的分區都已建立"""
+    if days_ahead is None:
+        days_ahead = settings.SENSOR_PARTITION_PREMAKE_DAYS
+    existing = list_partitions()
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    created = []
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        if day not in existing:
+            created.append(create_partition(day))
+    return created
+
+
+def drop_expired_partitions(retention_hours=None):
+    """
+    刪除整個區間都早於保留期限的分區，並清除預設分區與 1 分鐘彙總中的過期資料
+    1 小時 / 1 天彙總不受保留期限影響，作為長期趨勢
+    """
+    from .models import SensorDataRollup
+
+    if retention_hours is None:
+        retention_hours = settings.SENSOR_DATA_RETENTION_HOURS
+    cutoff = timezone.now() - timedelta(hours=retention_hours)
+    cutoff_day = cutoff.astimezone(dt_timezone.utc).date()
+
+    dropped = []
+    with connection.cursor() as cursor:
+        for day, name in sorted(list_partitions().items()):
+            if day + timedelta(days=1) <= cutoff_day:
+                cursor.execute(f'DROP TABLE "{name}"')
+                dropped.append(name)
+        cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" < %s', [cutoff])
+
+    SensorDataRollup.objects.filter(resolution='1m', bucket__lt=cutoff).delete()
+    return dropped
+
+
+def run_maintenance():
+    """建立未來分區並刪除過期分區"""
+    if not is_partitioned():
+        return {'created': [], 'dropped': []}
+    created = ensure_partitions()
+    dropped = drop_expired_partitions()
+    if created or dropped:
+        logger.info(f"Sensor data partitions created: {created}, dropped: {dropped}")
+    return {'created': created, 'dropped': dropped}
+
+
+# ---- 查詢 ----
+
+def choose_resolution(sensor, start, end, max_points):
+    """
+    選擇點數不超過 max_points 的最細解析度
+    :return: None 表示原始資料，否則為 RESOLUTIONS 的鍵
+    """
+    from .models import SensorDataRollup
+
+    window = end - start
+    # 以彙總的筆數估計原始資料點數
+    estimate_resolution = '1m' if window <= timedelta(days=1) else '1h'
+    raw_points = SensorDataRollup.objects.filter(
+        sensor=sensor,
+        resolution=estimate_resolution,
+        bucket__gte=bucket_start(start, estimate_resolution),
+        bucket__lt=end,
+    ).aggregate(total=Sum('count'))['total'] or 0
+    if raw_points <= max_points:
+        return None
+
+    for resolution, step in RESOLUTIONS.items():
+        if window / step <= max_points:
+            return resolution
+    return '1d'
+
+
+def get_rollups(sensor, resolution, start, end):
+    """取得時間範圍內指定解析度的彙總"""
+    from .models import SensorDataRollup
+
+    return SensorDataRollup.objects.filter(
+        sensor=sensor,
+        resolution=resolution,
+        bucket__gte=bucket_start(start, resolution),
+        bucket__lt=end,
+    ).order_by('bucket')
+
+
+def get_rollup_status(sensor, minimum, maximum):
+    """彙總區間的狀態取最小值與最大值中較嚴重者"""
+    return max(sensor.get_status(minimum), sensor.get_status(maximum), key=STATUS_RANK.get)
+
+
+# ---- 降採樣 ----
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降採樣
+    :param x: 遞增的時間 (float ndarray)
+    :param y: 數值 (float ndarray)
+    :param threshold: 輸出點數
+    :return: 選取的索引 (ndarray)，包含首尾兩點
+    """
+    count = len(x)
+    if threshold >= count:
+        return np.arange(count)
+    if threshold < 3:
+        return np.array([0, count - 1][:max(threshold, 0)], dtype=np.int64)
+
+    # 首尾之外的點平均分成 threshold - 2 個區間
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # 下一個區間的平均點（最後一個區間以尾點代替）
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[count - 1], y[count - 1]
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - avg_x) * (y[start:end] - py) - (px - x[start:end]) * (avg_y - py))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample(sensor, start, end, points):
+    """
+    取得最多 points 點的時間序列
+    原始資料量在 points 的 SENSOR_HISTORY_OVERSAMPLE 倍以內時以 LTTB 選點（保留峰值），
+    否則在資料庫以 width_bucket 將最適合的彙總再分成 points 個區間，查詢量不隨時間範圍增加
+    :return: (resolution, rows)，resolution 為 'lttb' 或來源彙總的解析度
+    """
+    from .models import SensorDataLog
+
+    source = choose_resolution(sensor, start, end, points * settings.SENSOR_HISTORY_OVERSAMPLE)
+    if source is None:
+        logs = list(SensorDataLog.objects.filter(
+            sensor=sensor,
+            timestamp__gte=start,
+            timestamp__lt=end,
+        ).order_by('timestamp').values_list('timestamp', 'value', 'status'))
+        if not logs:
+            return 'lttb', []
+        x = np.fromiter((log[0].timestamp() for log in logs), dtype=np.float64, count=len(logs))
+        y = np.fromiter((log[1] for log in logs), dtype=np.float64, count=len(logs))
+        rows = []
+        for index in lttb(x, y, points):
+            timestamp, value, status = logs[index]
+            rows.append({'timestamp': timezone.localtime(timestamp).isoformat(), 'value': round(value, sensor.decimal_places), 'status': status})
+        return 'lttb', rows
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT min(bucket), sum(sum) / sum(count), min(min), max(max), sum(count)
+            FROM sensor_data_rollups
+            WHERE sensor_id = %s AND resolution = %s AND bucket >= %s AND bucket < %s
+            GROUP BY LEAST(GREATEST(width_bucket(extract(epoch FROM bucket), %s, %s, %s), 1), %s)
+            ORDER BY 1
+        """, [sensor.pk, source, bucket_start(start, source), end,
+              start.timestamp(), end.timestamp(), points, points])
+        rows = [{
+            'timestamp': timezone.localtime(timestamp).isoformat(),
+            'value': round(value, sensor.decimal_places),
+            'min': minimum,
+            'max': maximum,
+            'count': count,
+            'status': get_rollup_status(sensor, minimum, maximum),
+        } for timestamp, value, minimum, maximum, count in cursor.fetchall()]
+    return source, rows
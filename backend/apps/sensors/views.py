@@ -1,23 +1,31 @@
+import csv
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
 from datetime import timedelta
 from django.db import transaction
-import redis
-import json
 from django.conf import settings
+from django.utils.http import parse_etags, quote_etag
 
-from .models import Sensor, SensorBimBinding, SensorDataLog
+from .models import Sensor, SensorBimBinding, SensorDataLog, SensorAlert
 from .serializers import (
     SensorSerializer,
     SensorBimBindingSerializer,
-    SensorDataLogSerializer
+    SensorDataLogSerializer,
+    SensorDataRollupSerializer,
+    SensorAlertSerializer
 )
+from . import timeseries
+from .alerts import get_active_alarms
+from .bindings import bulk_upsert_bindings, read_binding_csv
+from .overlay import build_overlay
+from .redis_client import get_latest_values, get_redis_client
 
 
 class SensorViewSet(viewsets.ModelViewSet):
-    queryset = Sensor.objects.all()
+    queryset = Sensor.objects.select_related('bim_binding')
     serializer_class = SensorSerializer
     filterset_fields = ['sensor_type', 'is_active']
     search_fields = ['sensor_id', 'name', 'mqtt_topic']
@@ -44,18 +52,10 @@ class SensorViewSet(viewsets.ModelViewSet):
         sensor = self.get_object()
 
         try:
-            redis_client = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True
-            )
-
-            redis_key = f"sensor:{sensor.sensor_id}:latest"
-            data = redis_client.get(redis_key)
+            data = get_latest_values([sensor.sensor_id])[sensor.sensor_id]
 
             if data:
-                return Response(json.loads(data))
+                return Response(data)
             else:
                 return Response({
                     'sensor_id': sensor.sensor_id,
@@ -85,21 +85,51 @@ class SensorViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            redis_client = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True
+            # 一次 MGET 取得所有感測器
+            return Response(get_latest_values(sensor_ids))
+
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'])
+    def alarms(self, request):
+        """取得目前處於警告 / 錯誤狀態的感測器（讀取 Redis，不查詢資料庫）"""
+        try:
+            return Response(get_active_alarms())
+
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-            result = {}
-            for sensor_id in sensor_ids:
-                redis_key = f"sensor:{sensor_id}:latest"
-                data = redis_client.get(redis_key)
-                if data:
-                    result[sensor_id] = json.loads(data)
-                else:
-                    result[sensor_id] = None
+    @action(detail=True, methods=['get'])
+    def alerts(self, request, pk=None):
+        """取得感測器的狀態轉換紀錄"""
+        sensor = self.get_object()
+        limit = int(request.query_params.get('limit', 100))
+
+        alerts = SensorAlert.objects.filter(sensor=sensor).select_related('sensor')[:limit]
+        serializer = SensorAlertSerializer(alerts, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def ingest_stats(self, request):
+        """取得各 MQTT 寫入管線的佇列深度、背壓與丟棄計數"""
+        from .ingestion import SensorIngestionPipeline
+
+        try:
+            redis_client = get_redis_client()
+            prefix = f"{SensorIngestionPipeline.STATS_KEY_PREFIX}:"
+            keys = list(redis_client.scan_iter(match=f"{prefix}*"))
+
+            pipe = redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hgetall(key)
+            result = {key[len(prefix):]: stats for key, stats in zip(keys, pipe.execute())}
 
             return Response(result)
 
@@ -111,24 +141,46 @@ class SensorViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def history(self, request, pk=None):
-        """取得歷史數據"""
+        """
+        取得歷史數據
+        依 max_points 點數上限自動選擇解析度：原始資料或 1 分鐘 / 1 小時 / 1 天彙總；
+        指定 points 時回傳最多 points 點的降採樣序列（供圖表使用）。
+        使用的解析度放在 X-Sensor-Resolution header (raw / lttb / 1m / 1h / 1d)
+        """
         sensor = self.get_object()
 
         # 時間範圍（支援小數，如 0.05 小時 = 3 分鐘）
         hours = float(request.query_params.get('hours', 24))
-        start_time = timezone.now() - timedelta(hours=hours)
-
-        logs = SensorDataLog.objects.filter(
-            sensor=sensor,
-            timestamp__gte=start_time
-        ).order_by('timestamp')
-
-        serializer = SensorDataLogSerializer(logs, many=True)
-        return Response(serializer.data)
+        max_points = int(request.query_params.get('max_points', settings.SENSOR_HISTORY_MAX_POINTS))
+        end_time = timezone.now()
+        start_time = end_time - timedelta(hours=hours)
+
+        points = request.query_params.get('points')
+        if points:
+            points = max(2, min(int(points), settings.SENSOR_HISTORY_MAX_POINTS))
+            resolution, rows = timeseries.downsample(sensor, start_time, end_time, points)
+            response = Response(rows)
+            response['X-Sensor-Resolution'] = resolution
+            return response
+
+        resolution = timeseries.choose_resolution(sensor, start_time, end_time, max_points)
+        if resolution is None:
+            logs = SensorDataLog.objects.filter(
+                sensor=sensor,
+                timestamp__gte=start_time
+            ).select_related('sensor').order_by('timestamp')
+            serializer = SensorDataLogSerializer(logs, many=True)
+        else:
+            rollups = timeseries.get_rollups(sensor, resolution, start_time, end_time)
+            serializer = SensorDataRollupSerializer(rollups, many=True, context={'sensor': sensor})
+
+        response = Response(serializer.data)
+        response['X-Sensor-Resolution'] = resolution or 'raw'
+        return response
 
 
 class SensorBimBindingViewSet(viewsets.ModelViewSet):
-    queryset = SensorBimBinding.objects.all()
+    queryset = SensorBimBinding.objects.select_related('sensor')
     serializer_class = SensorBimBindingSerializer
     filterset_fields = ['sensor', 'model_urn', 'is_active']
 
@@ -183,29 +235,84 @@ class SensorBimBindingViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(bindings, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def overlay(self, request):
+        """
+        取得模型疊加層：每個綁定一筆 (dbid, sensor_id, position, unit, value, status)
+        綁定設定快取於 Redis，即時數據以一次 MGET 取得；支援 ETag / If-None-Match
+        """
+        model_urn = request.query_params.get('model_urn')
+        if not model_urn:
+            return Response(
+                {'error': 'model_urn is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            etag, items = build_overlay(model_urn)
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        etag = quote_etag(etag)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(items)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
     @action(detail=False, methods=['post'])
     def batch_create(self, request):
-        """批次建立綁定"""
-        bindings_data = request.data.get('bindings', [])
-        created = []
-        errors = []
-
-        for idx, binding_data in enumerate(bindings_data):
-            serializer = self.get_serializer(data=binding_data)
-            if serializer.is_valid():
-                serializer.save()
-                created.append(serializer.data)
-            else:
-                errors.append({
-                    'index': idx,
-                    'data': binding_data,
-                    'errors': serializer.errors
-                })
+        """
+        批次建立或更新綁定（同一感測器已有綁定時覆寫）
+        接受 JSON {"bindings": [...]} 或 CSV 檔案 (file)；有效資料列於同一交易寫入，
+        無效資料列逐筆回報於 errors
+        """
+        if 'file' in request.FILES:
+            file = request.FILES['file']
+            if not file.name.lower().endswith('.csv'):
+                return Response(
+                    {'error': '請上傳有效的 CSV 檔案（.csv）'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                bindings_data = read_binding_csv(file)
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response(
+                    {'error': f'CSV 檔案格式錯誤：{e}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif isinstance(request.data, dict):
+            bindings_data = request.data.get('bindings', [])
+        else:
+            bindings_data = None
+
+        if not isinstance(bindings_data, list):
+            return Response(
+                {'error': 'bindings must be a list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        for index, row in enumerate(bindings_data):
+            if not isinstance(row, dict):
+                return Response(
+                    {'error': f'bindings[{index}] must be an object', 'index': index},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        result = bulk_upsert_bindings(bindings_data)
+        bindings = self.queryset.filter(sensor_id__in=result['bindings'])
 
         return Response({
-            'created': created,
-            'errors': errors
-        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+            'created': self.get_serializer(bindings, many=True).data,
+            'created_count': result['created'],
+            'updated_count': result['updated'],
+            'errors': result['errors']
+        }, status=status.HTTP_201_CREATED if result['bindings'] else status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['post'])
     def batch_delete(self, request):
@@ -1,8 +1,12 @@
 # your_project/management/commands/generate_cobie_report.py
+import multiprocessing
 import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from django.core.management.base import BaseCommand
-from django.db.models import Q, Exists, OuterRef, Case, When, Value, CharField
+from django.db import connections
+from django.db.models import Q, Count, Exists, OuterRef, Subquery, Case, When, Value, CharField
 from apps.forge.models import (
     BimCobie, BimObject, BimModel,
     BimRegion, ZoneCode, RoleCode, FileTypeCode, LevelCode
@@ -10,6 +14,9 @@ from apps.forge.models import (
 from openpyxl.styles import Font
 from datetime import datetime
 
+# 無值：NULL、空字串或只有空白
+EMPTY_VALUE = Q(value__isnull=True) | Q(value__regex=r'^\s*$')
+
 
 def parse_filename(value):
     if not value:
@@ -25,6 +32,29 @@ def parse_filename(value):
     }
 
 
+def write_excel(filepath, cobie_data, cobie_details, naming_summary, naming_details):
+    """寫出報表（模組層級函式，供多進程平行寫出各模型報表）"""
+    font_normal = Font(name='微軟正黑體', size=11)
+    font_bold = Font(name='微軟正黑體', size=11, bold=True)
+
+    with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        pd.DataFrame(cobie_data).to_excel(writer, sheet_name='COBie總表', index=False,
+            columns=['資料表類型','COBie欄位(英文)','COBie欄位(中文)','填寫狀態','範例','備註','有值筆數','無值筆數'])
+        pd.DataFrame(cobie_details or [{'訊息': '無必填欄位缺失'}]).to_excel(writer, sheet_name='COBie明細', index=False)
+        pd.DataFrame(naming_summary).to_excel(writer, sheet_name='命名規範總表', index=False)
+        pd.DataFrame(naming_details or [{'訊息': '無錯誤資料'}]).to_excel(writer, sheet_name='命名錯誤明細', index=False)
+
+        for ws in writer.book.worksheets:
+            # 表頭加粗
+            for cell in ws[1]:
+                cell.font = font_bold
+            # 內容正黑體
+            for row in ws.iter_rows(min_row=2):
+                for cell in row:
+                    cell.font = font_normal
+    return filepath
+
+
 class Command(BaseCommand):
     help = (
         "產生 COBie + 檔案命名規範整合報表\n\n"
@@ -45,6 +75,12 @@ class Command(BaseCommand):
             action='store_true',
             help='為每個模型產生獨立報表（同時保留全專案總表）'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='平行寫出各模型報表的進程數（預設 min(4, CPU 數)）'
+        )
 
     def handle(self, *args, **options):
         # 建立帶時間戳記的資料夾
@@ -55,90 +91,135 @@ class Command(BaseCommand):
         self.stdout.write(f"報表輸出目錄：{output_dir}")
 
         # 主檔代碼
-        valid_zones = set(ZoneCode.objects.filter(is_active=True).values_list('code', flat=True))
-        valid_levels = set(LevelCode.objects.filter(is_active=True).values_list('code', flat=True))
-        valid_types = set(FileTypeCode.objects.filter(is_active=True).values_list('code', flat=True))
-        valid_roles = set(RoleCode.objects.filter(is_active=True).values_list('code', flat=True))
+        self.valid_codes = {
+            'Zone': set(ZoneCode.objects.filter(is_active=True).values_list('code', flat=True)),
+            'Level': set(LevelCode.objects.filter(is_active=True).values_list('code', flat=True)),
+            'Type': set(FileTypeCode.objects.filter(is_active=True).values_list('code', flat=True)),
+            'Role': set(RoleCode.objects.filter(is_active=True).values_list('code', flat=True)),
+        }
+
+        cobie_fields = []
+        for cobie in BimCobie.objects.filter(is_active=True).order_by('name'):
+            parts = cobie.name.split('.')
+            if len(parts) == 3 and parts[0] == 'COBie':
+                cobie_fields.append((cobie, parts))
 
-        all_active_cobie = BimCobie.objects.filter(is_active=True).order_by('name')
-        all_models = BimModel.objects.prefetch_related('bim_objects', 'bim_regions').all()
+        # 整個報表所需的資料只查詢一次，總表與各模型報表都由此推導
+        model_names = dict(BimModel.objects.values_list('id', 'name'))
+        counts = self.collect_cobie_counts([cobie.name for cobie, _ in cobie_fields])
+        missing = self.collect_missing_required(
+            [(cobie, parts) for cobie, parts in cobie_fields if cobie.status == 'required'], model_names
+        )
+        regions = defaultdict(list)
+        for bim_model_id, value in BimRegion.objects.order_by('id').values_list('bim_model_id', 'value'):
+            regions[bim_model_id].append((model_names.get(bim_model_id), value))
 
         # ==================== 1. 產生全專案總表 ====================
-        total_report_data, total_error_details, total_naming_summary, total_naming_details = self.generate_full_report(
-            all_active_cobie=all_active_cobie,
-            regions_qs=BimRegion.objects.select_related('bim_model').all(),
-            valid_zones=valid_zones, valid_levels=valid_levels,
-            valid_types=valid_types, valid_roles=valid_roles
+        total_counts = defaultdict(lambda: [0, 0])
+        for (_, name), (total, filled) in counts.items():
+            total_counts[name][0] += total
+            total_counts[name][1] += filled
+
+        total_report = self._generate_report(
+            cobie_fields=cobie_fields,
+            counts=total_counts,
+            missing=[row for rows in missing.values() for row in rows],
+            regions=[region for rows in regions.values() for region in rows],
         )
 
         total_file = os.path.join(output_dir, "cobie_compliance_report.xlsx")
-        self.write_excel(total_file, total_report_data, total_error_details, total_naming_summary, total_naming_details)
+        write_excel(total_file, *total_report)
         self.stdout.write(self.style.SUCCESS(f"全專案總表產生完成：{total_file}"))
 
         # ==================== 2. 若有 --per-model，產生各模型報表 ====================
         if options['per_model']:
             self.stdout.write("開始產生各模型獨立報表...")
 
-            for model in all_models:
-                model_name = model.name.strip()
+            jobs = []
+            for model_id, name in model_names.items():
+                model_name = name.strip()
                 # 清理檔名（避免非法字元）
                 safe_filename = "".join(c for c in model_name if c.isalnum() or c in ('-', '_', ' ')).rstrip()
                 if not safe_filename:
-                    safe_filename = f"模型_{model.id}"
+                    safe_filename = f"模型_{model_id}"
 
-                model_report_data, model_error_details, model_naming_summary, model_naming_details = self.generate_model_report(
-                    model=model,
-                    all_active_cobie=all_active_cobie,
-                    valid_zones=valid_zones, valid_levels=valid_levels,
-                    valid_types=valid_types, valid_roles=valid_roles
+                model_report = self._generate_report(
+                    cobie_fields=cobie_fields,
+                    counts={n: counts.get((model_id, n), (0, 0)) for n in total_counts},
+                    missing=missing.get(model_id, []),
+                    regions=regions.get(model_id, []),
                 )
+                jobs.append((model_name, safe_filename, os.path.join(output_dir, f"{safe_filename}.xlsx"), model_report))
 
-                model_file = os.path.join(output_dir, f"{safe_filename}.xlsx")
-                self.write_excel(model_file, model_report_data, model_error_details, model_naming_summary, model_naming_details)
-                self.stdout.write(f"  {model_name} → {safe_filename}.xlsx")
-
-            self.stdout.write(self.style.SUCCESS(f"所有模型報表產生完成！共 {all_models.count()} 個"))
+            self.write_model_reports(jobs, options['workers'])
+            self.stdout.write(self.style.SUCCESS(f"所有模型報表產生完成！共 {len(jobs)} 個"))
 
         else:
             self.stdout.write("未使用 --per-model，僅產生全專案總表")
 
-    # —————————————————————— 報表產生邏輯 ——————————————————————
-    def generate_full_report(self, all_active_cobie, regions_qs, valid_zones, valid_levels, valid_types, valid_roles):
-        return self._generate_report(
-            cobie_qs=all_active_cobie,
-            objects_qs=BimObject.objects,
-            regions_qs=regions_qs,
-            valid_zones=valid_zones, valid_levels=valid_levels,
-            valid_types=valid_types, valid_roles=valid_roles
-        )
+    # —————————————————————— 資料收集 ——————————————————————
+    def collect_cobie_counts(self, cobie_names):
+        """
+        以一次分組彙總取得各模型、各 COBie 欄位的總筆數與有值筆數
+        :return: {(bim_model_id, display_name): (total, filled)}
+        """
+        if not cobie_names:
+            return {}
+        rows = BimObject.objects.filter(
+            display_name__in=cobie_names
+        ).values('bim_model_id', 'display_name').annotate(
+            total=Count('id'),
+            filled=Count('id', filter=~EMPTY_VALUE),
+        ).order_by()
+        return {(row['bim_model_id'], row['display_name']): (row['total'], row['filled']) for row in rows}
 
-    def generate_model_report(self, model, all_active_cobie, valid_zones, valid_levels, valid_types, valid_roles):
-        return self._generate_report(
-            cobie_qs=all_active_cobie,
-            objects_qs=model.bim_objects,
-            regions_qs=model.bim_regions,
-            model_name=model.name,
-            valid_zones=valid_zones, valid_levels=valid_levels,
-            valid_types=valid_types, valid_roles=valid_roles
-        )
+    def collect_missing_required(self, required_fields, model_names):
+        """
+        以一次查詢取得所有必填但無值的欄位，元件名稱取自同一元件的 COBie.<資料表>.Name
+        :return: {bim_model_id: [明細]}
+        """
+        missing = defaultdict(list)
+        if not required_fields:
+            return missing
 
-    def _generate_report(self, cobie_qs, objects_qs, regions_qs, model_name=None,
-                         valid_zones=None, valid_levels=None, valid_types=None, valid_roles=None):
+        descriptions = {cobie.name: cobie.description for cobie, _ in required_fields}
+        name_fields = {cobie.name: f"COBie.{parts[1]}.Name" for cobie, parts in required_fields}
+        # 依資料表分組，各自以對應的 Name 欄位取元件名稱
+        by_sheet = defaultdict(list)
+        for cobie, parts in required_fields:
+            by_sheet[name_fields[cobie.name]].append(cobie.name)
+
+        queryset = None
+        for name_field, names in by_sheet.items():
+            component_name = BimObject.objects.filter(
+                bim_model=OuterRef('bim_model'), dbid=OuterRef('dbid'), display_name=name_field
+            ).values('value')[:1]
+            qs = BimObject.objects.filter(EMPTY_VALUE, display_name__in=names).annotate(
+                component_name=Case(When(Exists(component_name), then=Subquery(component_name)),
+                                    default=Value('未知元件'), output_field=CharField())
+            ).values_list('bim_model_id', 'dbid', 'display_name', 'component_name')
+            queryset = qs if queryset is None else queryset.union(qs, all=True)
+
+        for bim_model_id, dbid, display_name, component_name in sorted(
+                queryset, key=lambda row: (row[2], row[0], row[1])):
+            missing[bim_model_id].append({
+                '模型名稱': model_names.get(bim_model_id),
+                '元件名稱': component_name,
+                '缺失欄位': descriptions[display_name],
+                'COBie欄位': display_name,
+                'dbid': dbid,
+            })
+        return missing
+
+    # —————————————————————— 報表產生邏輯 ——————————————————————
+    def _generate_report(self, cobie_fields, counts, missing, regions):
         report_data = []
-        error_details = []
         naming_summary = {k: {'total': 0, 'error': 0} for k in ['區域代碼', '樓層代碼', '檔案類型', '專業角色', '檔名格式']}
         naming_details = []
 
         # COBie 部分
-        for cobie in cobie_qs:
-            parts = cobie.name.split('.')
-            if len(parts) != 3 or parts[0] != 'COBie':
-                continue
-            objects = objects_qs.filter(display_name=cobie.name)
-            total = objects.count()
-            filled = objects.exclude(Q(value__isnull=True) | Q(value='') | Q(value__regex=r'^\s*$')).count()
-            empty = total - filled
-
+        for cobie, parts in cobie_fields:
+            total, filled = counts.get(cobie.name, (0, 0))
             report_data.append({
                 '資料表類型': parts[1],
                 'COBie欄位(英文)': parts[2],
@@ -147,32 +228,15 @@ class Command(BaseCommand):
                 '範例': cobie.example or '',
                 '備註': (cobie.note or '').replace('\n', ' ').strip(),
                 '有值筆數': filled,
-                '無值筆數': empty,
+                '無值筆數': total - filled,
             })
 
-            if cobie.status == 'required' and empty > 0:
-                error_objs = objects.filter(Q(value__isnull=True) | Q(value='') | Q(value__regex=r'^\s*$'))
-                base_field = f"COBie.{parts[1]}.Name"
-                name_subq = BimObject.objects.filter(bim_model=OuterRef('bim_model') if model_name is None else model_name,
-                                                   dbid=OuterRef('dbid'), display_name=base_field)
-                error_objs = error_objs.annotate(
-                    component_name=Case(When(Exists(name_subq), then=name_subq.values('value')[:1]), default=Value('未知元件'), output_field=CharField())
-                )
-                for obj in error_objs:
-                    error_details.append({
-                        '模型名稱': model_name or obj.bim_model.name,
-                        '元件名稱': obj.component_name,
-                        '缺失欄位': cobie.description,
-                        'COBie欄位': cobie.name,
-                        'dbid': obj.dbid,
-                    })
-
         # 命名規範部分
-        for region in regions_qs.select_related('bim_model') if model_name is None else regions_qs.all():
-            file_name = region.value.split('/')[-1].rsplit('.', 1)[0]
+        field_map = {'Zone': '區域代碼', 'Level': '樓層代碼', 'Type': '檔案類型', 'Role': '專業角色'}
+        for cur_model_name, value in regions:
+            file_name = value.split('/')[-1].rsplit('.', 1)[0]
             parts = file_name.split('-')
             total_parts = len(parts)
-            cur_model_name = model_name or region.bim_model.name
 
             naming_summary['檔名格式']['total'] += 1
             if total_parts != 9:
@@ -188,11 +252,9 @@ class Command(BaseCommand):
 
             parsed = {'Zone': parts[2], 'Level': parts[3], 'Type': parts[5], 'Role': parts[6]}
             for key, val in parsed.items():
-                field_map = {'Zone': '區域代碼', 'Level': '樓層代碼', 'Type': '檔案類型', 'Role': '專業角色'}
-                valid_map = {'Zone': valid_zones, 'Level': valid_levels, 'Type': valid_types, 'Role': valid_roles}
                 field = field_map[key]
                 naming_summary[field]['total'] += 1
-                if val not in valid_map[key]:
+                if val not in self.valid_codes[key]:
                     naming_summary[field]['error'] += 1
                     naming_details.append({
                         '模型名稱': cur_model_name,
@@ -211,24 +273,21 @@ class Command(BaseCommand):
                 '欄位名稱': field, '總筆數': total, '錯誤筆數': error, '符合率': rate
             })
 
-        return report_data, error_details, naming_summary_data, naming_details
-
-    def write_excel(self, filepath, cobie_data, cobie_details, naming_summary, naming_details):
-        font_normal = Font(name='微軟正黑體', size=11)
-        font_bold = Font(name='微軟正黑體', size=11, bold=True)
-
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            pd.DataFrame(cobie_data).to_excel(writer, sheet_name='COBie總表', index=False,
-                columns=['資料表類型','COBie欄位(英文)','COBie欄位(中文)','填寫狀態','範例','備註','有值筆數','無值筆數'])
-            pd.DataFrame(cobie_details or [{'訊息': '無必填欄位缺失'}]).to_excel(writer, sheet_name='COBie明細', index=False)
-            pd.DataFrame(naming_summary).to_excel(writer, sheet_name='命名規範總表', index=False)
-            pd.DataFrame(naming_details or [{'訊息': '無錯誤資料'}]).to_excel(writer, sheet_name='命名錯誤明細', index=False)
-
-            for ws in writer.book.worksheets:
-                # 表頭加粗
-                for cell in ws[1]:
-                    cell.font = font_bold
-                # 內容正黑體
-                for row in ws.iter_rows(min_row=2):
-                    for cell in row:
-                        cell.font = font_normal
\ No newline at end of file
+        return report_data, missing, naming_summary_data, naming_details
+
+    def write_model_reports(self, jobs, workers):
+        """各模型報表為獨立檔案，以多進程平行寫出（子進程不存取資料庫）"""
+        if workers <= 1 or len(jobs) <= 1:
+            for model_name, safe_filename, filepath, report in jobs:
+                write_excel(filepath, *report)
+                self.stdout.write(f"  {model_name} → {safe_filename}.xlsx")
+            return
+
+        # fork 前關閉資料庫連線，避免子進程共用連線
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+            futures = [(model_name, safe_filename, executor.submit(write_excel, filepath, *report))
+                       for model_name, safe_filename, filepath, report in jobs]
+            for model_name, safe_filename, future in futures:
+                future.result()
+                self.stdout.write(f"  {model_name} → {safe_filename}.xlsx")
@@ -0,0 +1,228 @@
+import json
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.api.serializers import NavigationSerializer
+from apps.core.models import Navigation
+from apps.core.services import build_navigation_tree, get_user_navigations, invalidate_navigation_cache
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def legacy_user_navigations(user):
+    """舊版實作：逐一以 has_perm 檢查導航權限，再以 get_children 與 NavigationSerializer 逐節點遞迴建立導航樹"""
+
+    def filter_navigation(navigation):
+        if navigation.type in ['collapsable', 'group', 'aside']:
+            children_with_permissions = [
+                filter_navigation(child) for child in navigation.get_children()
+                if child in (allowed_navigations or child.type in ['collapsable', 'group', 'aside'])
+            ]
+            children_with_permissions = [child for child in children_with_permissions if child is not None]
+            if children_with_permissions:
+                navigation_data = NavigationSerializer(navigation).data
+                navigation_data['children'] = children_with_permissions
+                return navigation_data
+        elif navigation.type == 'basic' and navigation in allowed_navigations:
+            return NavigationSerializer(navigation).data
+        return None
+
+    allowed_navigations = Navigation.objects.filter(is_active=True).distinct()
+    if not user.is_superuser:
+        allowed_navigations = [
+            navigation for navigation in allowed_navigations
+            if any(user.has_perm(f"{perm.content_type.app_label}.{perm.codename}")
+                   for perm in navigation.permissions.all())
+        ]
+
+    if not allowed_navigations:
+        return None
+
+    root_navigations = Navigation.objects.filter(parent__isnull=True, is_active=True).order_by('order')
+    filtered_navigations = [filter_navigation(nav) for nav in root_navigations]
+    return [nav for nav in filtered_navigations if nav is not None]
+
+
+class Command(BaseCommand):
+    help = ('導航樹效能測試：建立測試用導航、權限、群組與使用者（每位使用者屬於多個群組），'
+            '量測舊版逐節點檢查權限、不使用快取、快取未命中與快取命中時的延遲與查詢數')
+
+    PREFIX = 'BENCH_'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, default=10,
+                            help='collapsable 根節點數 (預設 10)')
+        parser.add_argument('--items', type=int, default=20,
+                            help='每個根節點下的 basic 導航數 (預設 20)')
+        parser.add_argument('--groups', type=int, default=50,
+                            help='群組數 (預設 50)')
+        parser.add_argument('--groups-per-user', type=int, default=30,
+                            help='每位使用者所屬群組數 (預設 30)')
+        parser.add_argument('--perms-per-group', type=int, default=5,
+                            help='每個群組的導航權限數 (預設 5)')
+        parser.add_argument('--users', type=int, default=20,
+                            help='使用者數 (預設 20)')
+        parser.add_argument('--iterations', type=int, default=5,
+                            help='每位使用者重複量測次數 (預設 5)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='隨機種子 (預設 0)')
+        parser.add_argument('--keep', action='store_true',
+                            help='保留測試資料')
+        parser.add_argument('--json', action='store_true',
+                            help='以 JSON 輸出結果')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self._cleanup()
+        try:
+            users = self._setup(options)
+            result = self._run(users, options)
+        finally:
+            if not options['keep']:
+                self._cleanup()
+            invalidate_navigation_cache()
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+        else:
+            self._report(result)
+
+    def _setup(self, options):
+        content_type = ContentType.objects.get_for_model(Navigation)
+        sections = options['sections']
+        items = options['items']
+
+        permissions = Permission.objects.bulk_create([
+            Permission(
+                content_type=content_type,
+                codename=f'{self.PREFIX.lower()}nav_{i}',
+                name=f'{self.PREFIX}navigation {i}'
+            )
+            for i in range(sections * items)
+        ])
+
+        # 以 create 建立才會維護 MPTT 欄位
+        for s in range(sections):
+            section = Navigation.objects.create(
+                title_locale=f'{self.PREFIX}section_{s}', type='collapsable', order=s
+            )
+            for i in range(items):
+                navigation = Navigation.objects.create(
+                    title_locale=f'{self.PREFIX}item_{s}_{i}', type='basic',
+                    link=f'/bench/{s}/{i}', parent=section, order=i
+                )
+                navigation.permissions.add(permissions[s * items + i])
+
+        groups = Group.objects.bulk_create([
+            Group(name=f'{self.PREFIX}group_{g}') for g in range(options['groups'])
+        ])
+        for group in groups:
+            group.permissions.set(random.sample(permissions, min(options['perms_per_group'], len(permissions))))
+
+        User = get_user_model()
+        users = []
+        for u in range(options['users']):
+            user = User.objects.create_user(
+                username=f'{self.PREFIX}user_{u}', email=f'bench_user_{u}@example.com', password=None
+            )
+            user.groups.set(random.sample(groups, min(options['groups_per_user'], len(groups))))
+            users.append(user.pk)
+        return users
+
+    def _cleanup(self):
+        User = get_user_model()
+        User.objects.filter(username__startswith=self.PREFIX).delete()
+        Group.objects.filter(name__startswith=self.PREFIX).delete()
+        Navigation.objects.filter(title_locale__startswith=self.PREFIX, parent__isnull=True).delete()
+        Permission.objects.filter(codename__startswith=self.PREFIX.lower()).delete()
+
+    def _measure(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        return elapsed, len(queries), result
+
+    def _run(self, users, options):
+        User = get_user_model()
+        samples = {'legacy': [], 'uncached': [], 'cold': [], 'warm': []}
+        queries = {'legacy': [], 'uncached': [], 'cold': [], 'warm': []}
+        nodes = []
+
+        for _ in range(options['iterations']):
+            for user_id in users:
+                # 每次重新取得使用者，避免 ModelBackend 的權限快取影響結果
+                user = User.objects.get(pk=user_id)
+                elapsed, count, legacy = self._measure(lambda: legacy_user_navigations(user))
+                samples['legacy'].append(elapsed)
+                queries['legacy'].append(count)
+
+                user = User.objects.get(pk=user_id)
+                elapsed, count, tree = self._measure(
+                    lambda: build_navigation_tree(user.get_all_permissions(), user.is_superuser)
+                )
+                samples['uncached'].append(elapsed)
+                queries['uncached'].append(count)
+                # 新版輸出需與舊版一致
+                if json.loads(json.dumps(tree)) != json.loads(json.dumps(legacy)):
+                    raise CommandError(f'使用者 {user_id} 的導航樹與舊版實作不一致')
+                nodes.append(sum(len(section.get('children', [])) for section in tree or []))
+
+                invalidate_navigation_cache()
+                user = User.objects.get(pk=user_id)
+                elapsed, count, _ = self._measure(lambda: get_user_navigations(user))
+                samples['cold'].append(elapsed)
+                queries['cold'].append(count)
+
+                user = User.objects.get(pk=user_id)
+                elapsed, count, _ = self._measure(lambda: get_user_navigations(user))
+                samples['warm'].append(elapsed)
+                queries['warm'].append(count)
+
+        return {
+            'navigations': options['sections'] * (options['items'] + 1),
+            'users': len(users),
+            'groups_per_user': min(options['groups_per_user'], options['groups']),
+            'visible_items_avg': round(statistics.mean(nodes), 1) if nodes else 0,
+            'results': {
+                name: {
+                    'requests': len(values),
+                    'mean_ms': round(statistics.mean(values) * 1000, 3),
+                    'p50_ms': round(percentile(values, 50) * 1000, 3),
+                    'p95_ms': round(percentile(values, 95) * 1000, 3),
+                    'queries_avg': round(statistics.mean(queries[name]), 2),
+                }
+                for name, values in samples.items() if values
+            },
+        }
+
+    def _report(self, result):
+        self.stdout.write('=' * 70)
+        self.stdout.write(self.style.NOTICE('Navigation Tree Benchmark'))
+        self.stdout.write('=' * 70)
+        self.stdout.write(
+            f"Navigations: {result['navigations']}  Users: {result['users']}  "
+            f"Groups per user: {result['groups_per_user']}  "
+            f"Visible items (avg): {result['visible_items_avg']}"
+        )
+        self.stdout.write('-' * 70)
+        self.stdout.write(f"{'':<10}{'requests':>10}{'mean ms':>12}{'p50 ms':>12}{'p95 ms':>12}{'queries':>10}")
+        for name, stats in result['results'].items():
+            self.stdout.write(
+                f"{name:<10}{stats['requests']:>10}{stats['mean_ms']:>12}{stats['p50_ms']:>12}"
+                f"{stats['p95_ms']:>12}{stats['queries_avg']:>10}"
+            )
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+PropDbReaderRevit 效能測試
+以合成的 Revit 屬性資料庫比較 get_all_data 舊版（逐筆 pd.concat 遞迴）與新版（迭代走訪一次建表）的耗時
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apps.forge.aps_toolkit.ProDbReaderRevit import PropDbReaderRevit  # noqa: E402
+from apps.forge.aps_toolkit.units.DisplayUnits import DisplayUnits  # noqa: E402
+
+CATEGORIES = 10
+FAMILIES_PER_CATEGORY = 5
+TYPES_PER_FAMILY = 4
+PARAMS_PER_ELEMENT = 12
+
+
+def build_reader(element_count: int) -> PropDbReaderRevit:
+    """建立含 element_count 個元件的合成屬性資料庫（root → _RC → _RFN → _RFT → 元件）"""
+    attrs = [0,
+             ["name", "__name__", 20, "", "", "", 0, 0, ""],
+             ["child", "__child__", 11, "", "", "", 0, 0, ""],
+             ["parent", "__parent__", 11, "", "", "", 0, 0, ""],
+             ["instanceof_objid", "__instanceof__", 11, "", "", "", 0, 0, ""],
+             ["_RC", "__category__", 20, "", "", "", 0, 0, ""],
+             ["_RFN", "__category__", 20, "", "", "", 0, 0, ""],
+             ["_RFT", "__category__", 20, "", "", "", 0, 0, ""]]
+    param_attrs = []
+    for i in range(PARAMS_PER_ELEMENT):
+        param_attrs.append(len(attrs))
+        attrs.append([f"Param {i}", "Dimensions", 3, "", "", f"Param {i}", 0, 0, ""])
+    vals = []
+    val_index = {}
+
+    def val(value):
+        if value not in val_index:
+            val_index[value] = len(vals)
+            vals.append(value)
+        return val_index[value]
+
+    # entities: list of (attr, value) pairs, index 0 is unused
+    entities = [[], []]
+
+    def add_entity(pairs):
+        entities.append(pairs)
+        return len(entities) - 1
+
+    type_ids = []
+    for c in range(CATEGORIES):
+        category = add_entity([(1, val(f"Category {c}")), (5, val(f"Category {c}"))])
+        entities[1].append((2, val(category)))
+        for f in range(FAMILIES_PER_CATEGORY):
+            family = add_entity([(1, val(f"Family {c}-{f}")), (5, val(f"Category {c}")),
+                                 (6, val(f"Family {c}-{f}"))])
+            entities[category].append((2, val(family)))
+            for t in range(TYPES_PER_FAMILY):
+                family_type = add_entity([(1, val(f"Type {c}-{f}-{t}")), (5, val(f"Category {c}")),
+                                          (6, val(f"Family {c}-{f}")), (7, val(f"Type {c}-{f}-{t}"))])
+                entities[family].append((2, val(family_type)))
+                type_ids.append(family_type)
+    symbols = [add_entity([(1, val(f"Symbol {i}"))] + [(a, val(i * 0.5)) for a in param_attrs[:4]])
+               for i in range(len(type_ids))]
+    entities[1].insert(0, (1, val("Model")))
+    for e in range(element_count):
+        type_index = e % len(type_ids)
+        pairs = [(1, val(f"Element [{e}]")), (3, val(type_ids[type_index])), (4, val(symbols[type_index]))]
+        pairs += [(a, val(e % 97 + i)) for i, a in enumerate(param_attrs)]
+        element = add_entity(pairs)
+        entities[type_ids[type_index]].append((2, val(element)))
+
+    offsets, avs = [], []
+    for pairs in entities:
+        offsets.append(len(avs) // 2)
+        for attr, value in pairs:
+            avs += [attr, value]
+    reader = PropDbReaderRevit.__new__(PropDbReaderRevit)
+    reader.ids = [f"ext-{i}" for i in range(len(entities))]
+    reader.offsets = offsets
+    reader.avs = avs
+    reader.attrs = attrs
+    reader.vals = vals
+    reader.units = DisplayUnits()
+    return reader
+
+
+def legacy_get_recursive_ids(reader, db_ids, get_sub_family=False):
+    """舊版實作：每個元件建立單列 DataFrame 並遞迴 pd.concat"""
+    dataframe = pd.DataFrame()
+    props_ignore = ['parent', 'instanceof_objid', 'child', "viewable_in"]
+    for id in db_ids:
+        props = reader.enumerate_properties(id)
+        if len([prop for prop in props if prop.name in ["_RC", "_RFN", "_RFT"]]) > 0:
+            dataframe = pd.concat([dataframe, legacy_get_recursive_ids(reader, reader.get_children(id))],
+                                  ignore_index=True)
+            continue
+        properties = {}
+        for prop in props:
+            if prop.name not in props_ignore:
+                properties["Name" if prop.name == "name" else prop.name] = prop.value
+        properties['dbId'] = id
+        properties['external_id'] = reader.ids[id]
+        for instance in reader.get_instance(id):
+            properties = {**properties, **reader.get_properties(instance)}
+        dataframe = pd.concat([dataframe, pd.DataFrame(properties, index=[0])], ignore_index=True)
+        dataframe = pd.concat([dataframe, legacy_get_recursive_ids(reader, reader.get_children(id))],
+                              ignore_index=True)
+    if 'dbId' in dataframe.columns and 'external_id' in dataframe.columns:
+        dataframe = dataframe[
+            ['dbId', 'external_id'] + [col for col in dataframe.columns if col not in ['dbId', 'external_id']]]
+    return dataframe
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PropDbReaderRevit.get_all_data")
+    parser.add_argument("--sizes", default="1000,2000,4000,8000", help="元件數量，以逗號分隔")
+    parser.add_argument("--skip-legacy-above", type=int, default=8000, help="超過此元件數不執行舊版")
+    args = parser.parse_args()
+
+    print(f"{'elements':>10} {'rows':>8} {'new (s)':>10} {'legacy (s)':>12} {'speedup':>9}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        reader = build_reader(size)
+        category_ids = list(reader.get_all_categories().keys())
+
+        start = time.perf_counter()
+        df_new = reader._get_recursive_ids(category_ids, False)
+        new_elapsed = time.perf_counter() - start
+
+        legacy_elapsed = None
+        if size <= args.skip_legacy_above:
+            start = time.perf_counter()
+            df_legacy = legacy_get_recursive_ids(reader, category_ids)
+            legacy_elapsed = time.perf_counter() - start
+            pd.testing.assert_frame_equal(df_new, df_legacy, check_dtype=False)
+
+        legacy_text = f"{legacy_elapsed:12.3f}" if legacy_elapsed is not None else f"{'-':>12}"
+        speedup = f"{legacy_elapsed / new_elapsed:8.1f}x" if legacy_elapsed is not None else f"{'-':>9}"
+        print(f"{size:>10} {len(df_new):>8} {new_elapsed:10.3f} {legacy_text} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,9 +12,10 @@ import os
 
 import apps.core.api.routing
 import apps.forge.api.routing
+import apps.sensors.api.routing
+from apps.core.api.middleware import JWTAuthMiddlewareStack
 
 from django.core.asgi import get_asgi_application
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
 
@@ -27,9 +28,10 @@ django_asgi_app = get_asgi_application()
 application = ProtocolTypeRouter({
     "http": django_asgi_app,  # default HTTP routing (Django)
     "websocket": AllowedHostsOriginValidator(
-        AuthMiddlewareStack(URLRouter(
+        JWTAuthMiddlewareStack(URLRouter(
             apps.core.api.routing.websocket_urlpatterns +
-            apps.forge.api.routing.websocket_urlpatterns
+            apps.forge.api.routing.websocket_urlpatterns +
+            apps.sensors.api.routing.websocket_urlpatterns
         ))
     ),
 })
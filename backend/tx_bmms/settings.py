@@ -66,10 +66,46 @@ REDIS_HOST = os.getenv('REDIS_HOST', REDIS['HOST'])
 REDIS_PORT = int(os.getenv('REDIS_PORT', REDIS['PORT']))
 REDIS_DB = int(os.getenv('REDIS_DB', REDIS['DB']))
 REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
+# 感測器模組共用連線池的最大連線數
+SENSOR_REDIS_MAX_CONNECTIONS = int(os.getenv('SENSOR_REDIS_MAX_CONNECTIONS', 50))
+
+# 共用快取（跨 daphne / celery 進程，匯入等背景工作才能清除 API 的快取）
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}',
+        'KEY_PREFIX': 'tx_bmms',
+        'OPTIONS': {'password': REDIS_PASSWORD} if REDIS_PASSWORD else {},
+    }
+}
 
 # Sensor Data 設定
 SENSOR_DATA_SAVE_TO_DB = os.getenv('SENSOR_DATA_SAVE_TO_DB', 'False').lower() == 'true'
 SENSOR_DATA_RETENTION_HOURS = int(os.getenv('SENSOR_DATA_RETENTION_HOURS', 168))
+# 歷史數據每日分區：預先建立的天數、分區維護週期秒數；history 未指定 max_points 時的點數上限
+SENSOR_PARTITION_PREMAKE_DAYS = int(os.getenv('SENSOR_PARTITION_PREMAKE_DAYS', 2))
+SENSOR_DATA_MAINTENANCE_SECONDS = int(os.getenv('SENSOR_DATA_MAINTENANCE_SECONDS', 3600))
+SENSOR_HISTORY_MAX_POINTS = int(os.getenv('SENSOR_HISTORY_MAX_POINTS', 2000))
+# history?points=N 時，原始資料在 N 的此倍數以內以 LTTB 降採樣，超過則改用彙總分桶
+SENSOR_HISTORY_OVERSAMPLE = int(os.getenv('SENSOR_HISTORY_OVERSAMPLE', 10))
+# MQTT 數據寫入管線 (佇列容量、worker 數、批次大小、批次等待秒數、last_seen 更新週期秒數)
+SENSOR_INGEST_QUEUE_SIZE = int(os.getenv('SENSOR_INGEST_QUEUE_SIZE', 10000))
+SENSOR_INGEST_WORKERS = int(os.getenv('SENSOR_INGEST_WORKERS', 2))
+SENSOR_INGEST_BATCH_SIZE = int(os.getenv('SENSOR_INGEST_BATCH_SIZE', 500))
+SENSOR_INGEST_BATCH_TIMEOUT = float(os.getenv('SENSOR_INGEST_BATCH_TIMEOUT', 0.2))
+SENSOR_LAST_SEEN_FLUSH_SECONDS = float(os.getenv('SENSOR_LAST_SEEN_FLUSH_SECONDS', 5))
+# WebSocket 推送：同一感測器最短推送間隔秒數、訂閱端可要求的最短間隔秒數
+SENSOR_WS_PUBLISH_INTERVAL = float(os.getenv('SENSOR_WS_PUBLISH_INTERVAL', 0.5))
+SENSOR_WS_MIN_INTERVAL = float(os.getenv('SENSOR_WS_MIN_INTERVAL', 0.5))
+# 警報狀態機：新狀態需連續出現的次數，以及降級時需離開門檻的距離佔門檻範圍的比例 (遲滯)
+SENSOR_ALERT_DEBOUNCE = int(os.getenv('SENSOR_ALERT_DEBOUNCE', 3))
+SENSOR_ALERT_HYSTERESIS = float(os.getenv('SENSOR_ALERT_HYSTERESIS', 0.02))
+
+# 使用者操作紀錄：非同步批次寫入開關、緩衝區容量、批次大小、批次等待秒數
+USER_ACTIVITY_LOG_ASYNC = os.getenv('USER_ACTIVITY_LOG_ASYNC', 'True').lower() == 'true'
+USER_ACTIVITY_QUEUE_SIZE = int(os.getenv('USER_ACTIVITY_QUEUE_SIZE', 10000))
+USER_ACTIVITY_BATCH_SIZE = int(os.getenv('USER_ACTIVITY_BATCH_SIZE', 200))
+USER_ACTIVITY_FLUSH_SECONDS = float(os.getenv('USER_ACTIVITY_FLUSH_SECONDS', 1.0))
 
 # CORS definition
 CORS_ALLOW_ALL_ORIGINS = True
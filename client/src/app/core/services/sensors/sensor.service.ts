@@ -14,7 +14,9 @@ import {
     BatchCreateBindingsResponse,
     BatchDeleteBindingsRequest,
     BatchDeleteBindingsResponse,
-    RealtimeDataResult
+    RealtimeDataResult,
+    SensorOverlayItem,
+    SensorAlarm
 } from './sensor.types';
 
 @Injectable({
@@ -112,11 +114,22 @@ export class SensorService {
         );
     }
 
+    /**
+     * 取得目前處於警告 / 錯誤狀態的感測器
+     */
+    getActiveAlarms(): Observable<SensorAlarm[]> {
+        return this.http.get<SensorAlarm[]>(`${this.apiUrl}/sensors/alarms/`);
+    }
+
     /**
      * 取得感測器歷史數據
+     * 指定 points 時由後端降採樣為最多 points 點
      */
-    getSensorHistory(sensorId: number, hours: number = 24): Observable<SensorDataLog[]> {
-        const params = new HttpParams().set('hours', hours.toString());
+    getSensorHistory(sensorId: number, hours: number = 24, points?: number): Observable<SensorDataLog[]> {
+        let params = new HttpParams().set('hours', hours.toString());
+        if (points) {
+            params = params.set('points', points.toString());
+        }
 
         return this.http.get<SensorDataLog[]>(
             `${this.apiUrl}/sensors/${sensorId}/history/`,
@@ -145,6 +158,18 @@ export class SensorService {
         );
     }
 
+    /**
+     * 取得模型疊加層（綁定位置 + 即時數據）
+     */
+    getModelOverlay(modelUrn: string): Observable<SensorOverlayItem[]> {
+        const params = new HttpParams().set('model_urn', modelUrn);
+
+        return this.http.get<SensorOverlayItem[]>(
+            `${this.apiUrl}/bindings/overlay/`,
+            { params }
+        );
+    }
+
     /**
      * 取得所有綁定
      */
@@ -185,7 +210,7 @@ export class SensorService {
     }
 
     /**
-     * 批次建立綁定
+     * 批次建立或更新綁定（同一感測器已有綁定時覆寫）
      */
     batchCreateBindings(request: BatchCreateBindingsRequest): Observable<BatchCreateBindingsResponse> {
         return this.http.post<BatchCreateBindingsResponse>(
@@ -194,6 +219,19 @@ export class SensorService {
         );
     }
 
+    /**
+     * 以 CSV 檔案批次匯入綁定
+     */
+    importBindingsCsv(file: File): Observable<BatchCreateBindingsResponse> {
+        const formData = new FormData();
+        formData.append('file', file);
+
+        return this.http.post<BatchCreateBindingsResponse>(
+            `${this.apiUrl}/bindings/batch_create/`,
+            formData
+        );
+    }
+
     /**
      * 批次刪除綁定
      */
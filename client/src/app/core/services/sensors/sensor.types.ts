@@ -139,6 +139,37 @@ export interface SensorBimBinding {
     updated_at: string;
 }
 
+/**
+ * 模型疊加層項目 (bindings/overlay)
+ */
+export interface SensorOverlayItem {
+    dbid: number;
+    sensor_id: string;
+    name: string;
+    position: {
+        type: PositionType;
+        offset?: {
+            x: number;
+            y: number;
+            z: number;
+        } | null;
+    };
+    unit: string;
+    value: number | null;
+    status: SensorDataStatus;
+    timestamp: string | null;
+}
+
+/**
+ * 目前的感測器警報 (sensors/alarms)
+ */
+export interface SensorAlarm {
+    sensor_id: string;
+    status: SensorDataStatus;
+    value: number;
+    since: string;
+}
+
 /**
  * 感測器歷史數據日誌
  */
@@ -188,7 +219,7 @@ export interface BindingQueryParams {
  * 批次建立綁定請求
  */
 export interface BatchCreateBindingsRequest {
-    bindings: Partial<SensorBimBinding>[];
+    bindings: Array<Partial<SensorBimBinding> & { sensor_id?: string }>;
 }
 
 /**
@@ -196,6 +227,8 @@ export interface BatchCreateBindingsRequest {
  */
 export interface BatchCreateBindingsResponse {
     created: SensorBimBinding[];
+    created_count: number;
+    updated_count: number;
     errors: Array<{
         index: number;
         data: any;
@@ -1,6 +1,7 @@
 import { Injectable, NgZone } from '@angular/core';
 import { webSocket, WebSocketSubject } from 'rxjs/webSocket';
 import { environment } from 'environments/environment';
+import { AuthService } from 'app/core/auth/auth.service';
 import { Observable } from 'rxjs';
 
 @Injectable({
@@ -9,7 +10,10 @@ import { Observable } from 'rxjs';
 export class WebsocketService {
     private _sockets: Map<string, WebSocketSubject<any>> = new Map();
 
-    constructor(private _ngZone: NgZone) {}
+    constructor(
+        private _ngZone: NgZone,
+        private _authService: AuthService
+    ) {}
 
     // 建立指定通道的 WebSocket 連線
     connect(channel: string = 'progress'): void {
@@ -19,11 +23,13 @@ export class WebsocketService {
 
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
         const baseUrl = environment.websocket || `${protocol}//${window.location.host}`;
-        const url = `${baseUrl}/ws/${channel}`;
+        // WebSocket 無法帶 Authorization 標頭，以 query string 傳遞 JWT
+        const token = this._authService.accessToken;
+        const url = `${baseUrl}/ws/${channel}/` + (token ? `?token=${encodeURIComponent(token)}` : '');
 
         const socket = webSocket(url);
         this._sockets.set(channel, socket);
-        console.log(url, 'connected');
+        console.log(`${baseUrl}/ws/${channel}/`, 'connected');
     }
 
     // 監聽指定通道的消息
@@ -21,7 +21,6 @@ import { GtsConfirmationService } from '@gts/services/confirmation';
 import { WebsocketService } from 'app/core/services/websocket/websocket.service';
 import { BreadcrumbService } from 'app/core/services/breadcrumb/breadcrumb.service';
 import { Subject, Subscription, takeUntil } from 'rxjs';
-import * as XLSX from 'xlsx';
 
 
 @Component({
@@ -407,89 +406,35 @@ export class BimModelViewerComponent implements OnInit, OnDestroy {
                 this.isLoading = true;
                 this._changeDetectorRef.markForCheck();
 
-                // 獲取 COBie JSON 數據
-                this._bimModelViewerService.getCobieData(fileName).subscribe({
-                    next: (data: any[]) => {
-                        this._generateCobieExcel(data, fileName);
+                // 由後端逐列產生多 sheet Excel（每個元件在每個 COBie 分類一列）
+                this._bimModelViewerService.downloadCobieExcel(fileName).subscribe({
+                    next: (blob: Blob) => {
+                        const downloadUrl = window.URL.createObjectURL(blob);
+                        const link = document.createElement('a');
+                        link.href = downloadUrl;
+                        link.download = `${fileName.split('.')[0]}_COBie.xlsx`;
+                        document.body.appendChild(link);
+                        link.click();
+                        document.body.removeChild(link);
+                        window.URL.revokeObjectURL(downloadUrl);
                         this.isLoading = false;
                         this._changeDetectorRef.markForCheck();
                     },
                     error: (error) => {
                         this.isLoading = false;
                         this._changeDetectorRef.markForCheck();
-                        this._toastService.open({ message: error?.error?.message || '下載失敗，請稍後再試' });
+                        error.error.text().then((errorMessage: string) => {
+                            const errorJson = JSON.parse(errorMessage);
+                            this._toastService.open({ message: errorJson.error || errorJson.message || '下載失敗，請稍後再試' });
+                        }).catch(() => {
+                            this._toastService.open({ message: '下載失敗，請稍後再試' });
+                        });
                     }
                 });
             }
         });
     }
 
-    /**
-     * 根據 COBie 數據生成多 sheet 的 Excel 文件
-     * display_name 格式: COBie.Category.PropertyName
-     * 根據 Category 分類到不同的 sheet
-     */
-    private _generateCobieExcel(data: any[], fileName: string): void {
-        // 根據 display_name 分類數據
-        const sheetDataMap: { [category: string]: any[] } = {};
-
-        data.forEach(item => {
-            const displayName = item.display_name || '';
-            const parts = displayName.split('.');
-
-            // 檢查是否為有效的 COBie 格式 (至少要有 COBie.Category.xxx)
-            if (parts.length < 3 || parts[0] !== 'COBie') {
-                return; // 忽略無法分類的項目
-            }
-
-            const category = parts[1]; // 取得分類名稱 (Space, Component, Type 等)
-
-            if (!sheetDataMap[category]) {
-                sheetDataMap[category] = [];
-            }
-
-            sheetDataMap[category].push(item);
-        });
-
-        // 如果沒有任何有效數據
-        if (Object.keys(sheetDataMap).length === 0) {
-            this._toastService.open({ message: '沒有可匯出的 COBie 數據' });
-            return;
-        }
-
-        // 創建 workbook
-        const workbook = XLSX.utils.book_new();
-
-        // 為每個分類創建 sheet
-        Object.keys(sheetDataMap).sort().forEach(category => {
-            const categoryData = sheetDataMap[category];
-
-            // 轉換數據為 worksheet 格式
-            const worksheetData = categoryData.map(item => ({
-                'DBID': item.dbid,
-                'Display Name': item.display_name,
-                'Value': item.value
-            }));
-
-            const worksheet = XLSX.utils.json_to_sheet(worksheetData);
-
-            // 設定欄寬
-            worksheet['!cols'] = [
-                { wch: 10 },  // DBID
-                { wch: 40 },  // Display Name
-                { wch: 30 }   // Value
-            ];
-
-            // 將 sheet 加入 workbook（sheet 名稱最長 31 字元）
-            const sheetName = category.substring(0, 31);
-            XLSX.utils.book_append_sheet(workbook, worksheet, sheetName);
-        });
-
-        // 生成 Excel 文件並下載
-        const excelFileName = `${fileName.split('.')[0]}_COBie.xlsx`;
-        XLSX.writeFile(workbook, excelFileName);
-    }
-
     onDownloadBim(fileName: string, version: string = null): void {
         let dialogRef = this._gtsConfirmationService.open({
             title: this._translocoService.translate('confirm-action'),
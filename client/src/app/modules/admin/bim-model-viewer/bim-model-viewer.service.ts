@@ -13,10 +13,11 @@ export class BimModelViewerService {
         return this._appService.get('forge/bim-model', params);
     }
 
-    // 獲取 COBie 數據（JSON 格式，用於生成多 sheet Excel）
-    getCobieData(fileName: string): Observable<any> {
+    // 下載後端產生的多 sheet COBie Excel
+    downloadCobieExcel(fileName: string) {
         return this._appService.get('forge/bim-cobie-objects',
-            { file_name: encodeURIComponent(fileName) }
+            { file_name: encodeURIComponent(fileName), output: 'xlsx' },
+            { responseType: 'blob' }
         );
     }
 